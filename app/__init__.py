@@ -7,6 +7,8 @@ from flask_login import LoginManager
 from authlib.integrations.flask_client import OAuth
 from dotenv import load_dotenv
 
+from .sessao import SessaoRoteada
+
 # Carrega variáveis de ambiente
 load_dotenv()
 
@@ -14,7 +16,7 @@ load_dotenv()
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 # Inicializa extensões (sem app ainda)
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 migrate = Migrate()
 login_manager = LoginManager()
 oauth = OAuth()
@@ -46,12 +48,45 @@ def create_app():
     print("DB URI:", database_uri)
 
     # Configuração da aplicação
+    from .replicas import binds_de_replica
+    from .shards import binds_de_shard
     app.config.from_mapping(
         SECRET_KEY=os.getenv("SECRET_KEY", "dev"),
         SQLALCHEMY_DATABASE_URI=database_uri,
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        # Réplicas de leitura para os relatórios - ver app/replicas.py
+        SQLALCHEMY_BINDS={
+            **binds_de_replica(os.getenv("DATABASE_REPLICA_URLS")),
+            **binds_de_shard(os.getenv("SHARD_URLS")),
+        },
+        REPLICA_JANELA_SEGUNDOS=int(os.getenv("REPLICA_JANELA_SEGUNDOS", 10)),
+        # Shards por usuário (o banco principal fica como global) - ver app/shards.py
+        SHARD_ESPERA_MOVIMENTO=int(os.getenv("SHARD_ESPERA_MOVIMENTO", 5)),
         GOOGLE_CLIENT_ID=os.getenv("GOOGLE_CLIENT_ID"),
         GOOGLE_CLIENT_SECRET=os.getenv("GOOGLE_CLIENT_SECRET"),
+        # Descoberta OIDC do Google (aponte para um provedor local nos testes) - ver app/oidc.py
+        GOOGLE_DISCOVERY_URL=os.getenv("GOOGLE_DISCOVERY_URL", "https://accounts.google.com/.well-known/openid-configuration"),
+        OIDC_CACHE_PADRAO_SEGUNDOS=int(os.getenv("OIDC_CACHE_PADRAO_SEGUNDOS", 3600)),
+        OIDC_TIMEOUT_SEGUNDOS=int(os.getenv("OIDC_TIMEOUT_SEGUNDOS", 5)),
+        # Hash de senhas (formato do werkzeug) - ver app/senhas.py
+        SENHA_METODO=os.getenv("SENHA_METODO", "scrypt:32768:8:1"),
+        SENHA_SALT=int(os.getenv("SENHA_SALT", 16)),
+        # Limite de tentativas de login/cadastro - ver app/limites.py
+        LIMITE_IP_RAJADA=int(os.getenv("LIMITE_IP_RAJADA", 20)),
+        LIMITE_IP_POR_MINUTO=float(os.getenv("LIMITE_IP_POR_MINUTO", 10)),
+        LIMITE_EMAIL_RAJADA=int(os.getenv("LIMITE_EMAIL_RAJADA", 5)),
+        LIMITE_EMAIL_POR_MINUTO=float(os.getenv("LIMITE_EMAIL_POR_MINUTO", 2)),
+        LIMITE_MAX_CHAVES=int(os.getenv("LIMITE_MAX_CHAVES", 10000)),
+        PROXIES_CONFIAVEIS=int(os.getenv("PROXIES_CONFIAVEIS", 0)),
+        # Compressão de respostas (HTML/JSON) - ver app/compression.py
+        COMPRESS_MIN_SIZE=int(os.getenv("COMPRESS_MIN_SIZE", 500)),
+        COMPRESS_GZIP_LEVEL=6,
+        COMPRESS_BR_QUALITY=4,
+        # Cache em memória dos lançamentos por usuário - ver app/razao.py
+        RAZAO_MAX_USUARIOS=int(os.getenv("RAZAO_MAX_USUARIOS", 128)),
+        # Fechamento mensal e arquivo dos lançamentos antigos (0 desliga o arquivo) - ver app/fechamento.py
+        FECHAMENTO_CARENCIA_DIAS=int(os.getenv("FECHAMENTO_CARENCIA_DIAS", 10)),
+        ARQUIVO_RETENCAO_MESES=int(os.getenv("ARQUIVO_RETENCAO_MESES", 12)),
     )
 
     # Cria a pasta 'instance' se não existir
@@ -66,6 +101,23 @@ def create_app():
     login_manager.init_app(app)
     oauth.init_app(app)
 
+    from . import assets, compression, busca, autocompletar, razao, metas, previsao, alertas, exclusao, limites, replicas, shards, fechamento, frota, exportacao
+    assets.init_app(app)
+    compression.init_app(app)
+    busca.init_app(app)
+    autocompletar.init_app(app)
+    razao.init_app(app)
+    metas.init_app(app)
+    previsao.init_app(app)
+    alertas.init_app(app)
+    exclusao.init_app(app)
+    limites.init_app(app)
+    replicas.init_app(app)
+    shards.init_app(app)
+    fechamento.init_app(app)
+    frota.init_app(app)
+    exportacao.init_app(app)
+
     login_manager.login_view = "main.login"
     login_manager.login_message = "Por favor, faça o login para acessar esta página."
     login_manager.login_message_category = "info"
@@ -86,11 +138,13 @@ def create_app():
     domain = os.getenv("APP_DOMAIN", f"http://localhost:{os.environ.get('PORT', 8080)}")
     google_redirect_uri = f"{domain}/authorize"
 
+    from .oidc import ClienteOIDC
     oauth.register(
         name="google",
         client_id=app.config["GOOGLE_CLIENT_ID"],
         client_secret=app.config["GOOGLE_CLIENT_SECRET"],
-        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+        server_metadata_url=app.config["GOOGLE_DISCOVERY_URL"],
+        client_cls=ClienteOIDC,
         client_kwargs={"scope": "openid email profile"},
         redirect_uri=google_redirect_uri,
     )
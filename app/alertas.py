@@ -0,0 +1,140 @@
+"""
+Alertas de contas a vencer.
+
+Um custo fixo em aberto (RegistroCusto não pago, de definição ativa) entra em
+alerta quando faltam `Custo.alerta_dias` dias ou menos para o vencimento,
+inclusive depois de vencido. A lista de cada usuário fica materializada em
+`alerta_vencimento`, que o dashboard lê numa consulta só.
+
+O job (`flask alertas escanear`) varre todos os usuários pelo índice parcial
+dos registros em aberto, em lotes ordenados por (vencimento, id), e refaz a
+tabela: é ele que faz as contas "entrarem" na janela conforme os dias passam.
+Entre uma varredura e outra, pagar, criar, alterar ou excluir um registro ou
+uma definição reavalia só as linhas afetadas, na mesma transação: no flush,
+para o que passa pelo ORM, e com `reavaliar` para os UPDATEs em lote.
+"""
+import time
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, select, tuple_
+
+from . import db, shards
+from .models import AlertaVencimento, Custo, RegistroCusto
+
+ALERTA_PADRAO = 7
+TAMANHO_LOTE = 1000
+
+alertas_cli = AppGroup('alertas', help='Alertas de contas a vencer.')
+
+
+def _consulta(*filtros):
+    registro, custo = RegistroCusto.__table__, Custo.__table__
+    return select(
+        registro.c.id, registro.c.user_id, registro.c.custo_id, custo.c.nome, registro.c.valor,
+        registro.c.data_vencimento, func.coalesce(custo.c.alerta_dias, ALERTA_PADRAO)
+    ).select_from(registro.join(custo, registro.c.custo_id == custo.c.id)).where(
+        registro.c.pago == False, custo.c.is_active == True, *filtros
+    )
+
+
+def _alertas(linhas, hoje, agora):
+    """Linhas de alerta_vencimento das que já entraram na janela de alerta."""
+    return [
+        {'user_id': user_id, 'registro_custo_id': registro_id, 'custo_id': custo_id, 'nome': nome,
+         'valor': valor, 'data_vencimento': vencimento, 'gerado_em': agora}
+        for registro_id, user_id, custo_id, nome, valor, vencimento, alerta_dias in linhas
+        if (vencimento - hoje).days <= alerta_dias
+    ]
+
+
+def escanear(hoje=None, tamanho_lote=TAMANHO_LOTE):
+    """Refaz os alertas de todos os usuários; devolve quantos foram gerados."""
+    hoje = hoje or date.today()
+    agora = datetime.utcnow()
+    conexao = db.session.connection()
+    tabela = AlertaVencimento.__table__
+    registro = RegistroCusto.__table__
+
+    # Nenhum registro vencendo depois de hoje + maior alerta interessa: o resto do índice nem é lido
+    maior_alerta = db.session.query(func.max(func.coalesce(Custo.alerta_dias, ALERTA_PADRAO))).filter(
+        Custo.is_active == True
+    ).scalar() or 0
+    limite = hoje + timedelta(days=maior_alerta)
+
+    conexao.execute(tabela.delete())
+    total = 0
+    ultimo = None
+    while True:
+        consulta = _consulta(registro.c.data_vencimento <= limite)
+        if ultimo is not None:
+            consulta = consulta.where(tuple_(registro.c.data_vencimento, registro.c.id) > ultimo)
+        linhas = conexao.execute(
+            consulta.order_by(registro.c.data_vencimento, registro.c.id).limit(tamanho_lote)
+        ).all()
+        if not linhas:
+            break
+        alertas = _alertas(linhas, hoje, agora)
+        if alertas:
+            conexao.execute(tabela.insert(), alertas)
+            total += len(alertas)
+        ultimo = (linhas[-1].data_vencimento, linhas[-1].id)
+    db.session.commit()
+    return total
+
+
+def do_usuario(user_id):
+    """Contas a vencer (e vencidas) do usuário, da mais urgente para a menos."""
+    return AlertaVencimento.query.filter_by(user_id=user_id).order_by(
+        AlertaVencimento.data_vencimento, AlertaVencimento.id
+    ).all()
+
+
+def _ao_flush(session, flush_context):
+    # UPDATEs em lote (Query.update) não passam por aqui: quem os faz chama `reavaliar`
+    registros, custos = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, (RegistroCusto, Custo)):
+            continue
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        (registros if isinstance(obj, RegistroCusto) else custos).add(obj.id)
+    registros.discard(None)
+    custos.discard(None)
+    if registros or custos:
+        reavaliar(session.connection(), registros, custos)
+
+
+def reavaliar(conexao, registros=(), custos=()):
+    """Refaz os alertas dos registros e das definições informados (ids), na transação de `conexao`."""
+    tabela = AlertaVencimento.__table__
+    registro = RegistroCusto.__table__
+    if registros:
+        conexao.execute(tabela.delete().where(tabela.c.registro_custo_id.in_(registros)))
+    if custos:
+        conexao.execute(tabela.delete().where(tabela.c.custo_id.in_(custos)))
+    # Registros excluídos ou pagos simplesmente não voltam
+    filtro = registro.c.id.in_(registros)
+    if custos:
+        filtro = filtro | registro.c.custo_id.in_(custos)
+    alertas = _alertas(conexao.execute(_consulta(filtro)).all(), date.today(), datetime.utcnow())
+    if alertas:
+        conexao.execute(tabela.insert(), alertas)
+
+
+@alertas_cli.command('escanear')
+@click.option('--data', 'data_str', default=None, help='Dia de referência (AAAA-MM-DD); padrão: hoje.')
+@click.option('--lote', default=TAMANHO_LOTE, show_default=True, help='Registros lidos por consulta.')
+def escanear_command(data_str, lote):
+    """Refaz a lista de contas a vencer de todos os usuários."""
+    hoje = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else date.today()
+    inicio = time.perf_counter()
+    total = sum(escanear(hoje, lote) for _ in shards.em_cada_banco())
+    click.echo(f'{total} alertas gerados para {hoje.isoformat()} em {time.perf_counter() - inicio:.2f}s.')
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _ao_flush):
+        event.listen(db.session, 'after_flush', _ao_flush)
+    app.cli.add_command(alertas_cli)
@@ -0,0 +1,247 @@
+"""
+Pipeline de assets estáticos.
+
+Vendoriza as dependências que vinham da CDN para dentro de `app/static/vendor`,
+gera cópias com hash de conteúdo no nome (e irmãos .gz/.br pré-comprimidos) em
+`app/static/dist` e as serve com `Cache-Control` imutável. Os pedidos de
+`/assets/` não abrem o cookie de sessão: se ele fosse lido (Flask-Login lê em
+todo after_request), a resposta ganharia `Vary: Cookie` e, como o cookie muda
+a cada escrita (app/replicas.py), o navegador e a CDN buscariam de novo os
+arquivos "imutáveis".
+
+Uso:
+    flask assets vendor   # baixa Bootstrap, Bootstrap Icons e Chart.js
+    flask assets build    # gera app/static/dist + manifest.json
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import shutil
+import urllib.request
+from pathlib import Path
+
+import click
+from flask import current_app, request, send_from_directory, url_for, abort
+from flask.cli import AppGroup
+from flask.sessions import SecureCookieSessionInterface
+
+try:
+    import brotli
+except ImportError:  # Sem brotli, apenas os irmãos .gz são gerados
+    brotli = None
+
+# Caminho lógico (relativo a app/static) -> URL de origem na CDN.
+# A URL também é usada como fallback enquanto o asset não foi vendorizado.
+VENDOR_ASSETS = {
+    'vendor/bootstrap/bootstrap.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/css/bootstrap.min.css',
+    'vendor/bootstrap/bootstrap.bundle.min.js':
+        'https://cdn.jsdelivr.net/npm/bootstrap@5.3.3/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons/bootstrap-icons.min.css':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff2':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff2',
+    'vendor/bootstrap-icons/fonts/bootstrap-icons.woff':
+        'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/fonts/bootstrap-icons.woff',
+    'vendor/chart.js/chart.umd.min.js':
+        'https://cdn.jsdelivr.net/npm/chart.js@4.4.1/dist/chart.umd.min.js',
+}
+
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.json', '.svg', '.txt', '.map'}
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+ASSETS_PREFIX = '/assets/'
+
+CSS_URL_RE = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+assets_cli = AppGroup('assets', help='Vendoriza e gera os assets estáticos.')
+
+
+def _dist_folder(app):
+    return os.path.join(app.static_folder, DIST_DIRNAME)
+
+
+def _load_manifest(app):
+    manifest_path = os.path.join(_dist_folder(app), MANIFEST_NAME)
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _hashed_name(logical_path, content):
+    """Insere o hash do conteúdo antes da extensão: css/a.css -> css/a.<hash>.css"""
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    path = Path(logical_path)
+    return path.with_name(f'{path.stem}.{digest}{path.suffix}').as_posix()
+
+
+def _rewrite_css_urls(css_path, content, manifest):
+    """Aponta os url(...) relativos de um CSS para as versões com hash."""
+    base_dir = Path(css_path).parent
+    text = content.decode('utf-8')
+
+    def replace(match):
+        quote, ref = match.group(1), match.group(2)
+        if ref.startswith(('data:', 'http:', 'https:', '//', '/')):
+            return match.group(0)
+        target, suffix = re.match(r'([^?#]*)(.*)', ref).groups()
+        logical = os.path.normpath(base_dir / target).replace(os.sep, '/')
+        if logical not in manifest:
+            return match.group(0)
+        # O hash já está no nome; a query string de cache-busting do autor é descartada
+        fragment = suffix if suffix.startswith('#') else ''
+        # O CSS com hash fica no mesmo diretório lógico do original
+        hashed = os.path.relpath(manifest[logical], base_dir).replace(os.sep, '/')
+        return f'url({quote}{hashed}{fragment}{quote})'
+
+    return CSS_URL_RE.sub(replace, text).encode('utf-8')
+
+
+def _write_compressed(output_path, content):
+    if Path(output_path).suffix not in COMPRESSIBLE_EXTENSIONS:
+        return
+    gz = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(gz) < len(content):
+        with open(output_path + '.gz', 'wb') as f:
+            f.write(gz)
+    if brotli is not None:
+        br = brotli.compress(content, quality=11)
+        if len(br) < len(content):
+            with open(output_path + '.br', 'wb') as f:
+                f.write(br)
+
+
+def build_assets(app):
+    """
+    Gera app/static/dist com nomes fingerprinted e irmãos pré-comprimidos.
+    Retorna o manifesto {caminho lógico: caminho com hash}.
+    """
+    static_folder = app.static_folder
+    dist_folder = _dist_folder(app)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+
+    sources = []
+    for root, dirs, files in os.walk(static_folder):
+        if os.path.abspath(root) == os.path.abspath(static_folder) and DIST_DIRNAME in dirs:
+            dirs.remove(DIST_DIRNAME)
+        for name in files:
+            full_path = os.path.join(root, name)
+            sources.append(os.path.relpath(full_path, static_folder).replace(os.sep, '/'))
+
+    # Fontes e imagens primeiro, para que os CSS possam referenciar seus nomes finais
+    sources.sort(key=lambda p: (p.endswith('.css'), p))
+
+    manifest = {}
+    for logical_path in sources:
+        with open(os.path.join(static_folder, logical_path), 'rb') as f:
+            content = f.read()
+        if logical_path.endswith('.css'):
+            content = _rewrite_css_urls(logical_path, content, manifest)
+
+        hashed_path = _hashed_name(logical_path, content)
+        output_path = os.path.join(dist_folder, hashed_path)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, 'wb') as f:
+            f.write(content)
+        _write_compressed(output_path, content)
+        manifest[logical_path] = hashed_path
+
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    app.extensions['assets'] = {'manifest': manifest, 'local': {}}
+    return manifest
+
+
+def asset_url(filename):
+    """
+    URL de um asset em app/static: versão com hash se o build existir,
+    arquivo local se não houver build, ou a CDN se ainda não foi vendorizado.
+    """
+    state = current_app.extensions['assets']
+    hashed = state['manifest'].get(filename)
+    if hashed:
+        return url_for('assets', filename=hashed)
+
+    is_local = state['local'].get(filename)
+    if is_local is None:
+        is_local = os.path.isfile(os.path.join(current_app.static_folder, filename))
+        state['local'][filename] = is_local
+    if not is_local and filename in VENDOR_ASSETS:
+        return VENDOR_ASSETS[filename]
+    return url_for('static', filename=filename)
+
+
+def versao():
+    """Identificador do build dos assets (muda a cada `flask assets build`); 'dev' sem build."""
+    state = current_app.extensions['assets']
+    if 'versao' not in state:
+        manifest = json.dumps(state['manifest'], sort_keys=True).encode()
+        state['versao'] = hashlib.sha256(manifest).hexdigest()[:12] if state['manifest'] else 'dev'
+    return state['versao']
+
+
+def serve_asset(filename):
+    """Serve um arquivo de dist escolhendo o irmão .br/.gz conforme Accept-Encoding."""
+    dist_folder = _dist_folder(current_app)
+    if filename == MANIFEST_NAME:
+        abort(404)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    for encoding, extension in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.isfile(os.path.join(dist_folder, filename + extension)):
+            response = send_from_directory(dist_folder, filename + extension, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            del response.headers['Content-Disposition']
+            break
+    else:
+        response = send_from_directory(dist_folder, filename, mimetype=mimetype)
+
+    response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+class AssetsSessionInterface(SecureCookieSessionInterface):
+    """Sessão por cookie que não abre o cookie nos pedidos de /assets/ (resposta sem Vary: Cookie)."""
+
+    def open_session(self, app, request):
+        if request.path.startswith(ASSETS_PREFIX):
+            # Sessão nula: leitura vazia e nada gravado na resposta
+            return None
+        return super().open_session(app, request)
+
+
+@assets_cli.command('vendor')
+def vendor_command():
+    """Baixa os assets de terceiros da CDN para app/static/vendor."""
+    for logical_path, source_url in VENDOR_ASSETS.items():
+        destination = os.path.join(current_app.static_folder, logical_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        with urllib.request.urlopen(source_url, timeout=30) as resp, open(destination, 'wb') as f:
+            shutil.copyfileobj(resp, f)
+        click.echo(f'{logical_path} <- {source_url}')
+
+
+@assets_cli.command('build')
+def build_command():
+    """Gera as versões com hash e pré-comprimidas em app/static/dist."""
+    manifest = build_assets(current_app)
+    click.echo(f'{len(manifest)} assets gerados em {_dist_folder(current_app)}')
+
+
+def init_app(app):
+    app.extensions['assets'] = {'manifest': _load_manifest(app), 'local': {}}
+    app.add_url_rule(ASSETS_PREFIX + '<path:filename>', endpoint='assets', view_func=serve_asset)
+    app.session_interface = AssetsSessionInterface()
+    app.cli.add_command(assets_cli)
+
+    @app.context_processor
+    def inject_asset_url():
+        return dict(asset_url=asset_url)
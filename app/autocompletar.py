@@ -0,0 +1,187 @@
+"""
+Autocompletar das fontes de faturamento e descrições de custos.
+
+A frequência de cada termo por usuário fica persistida em `autocompletar_termo`
+e é atualizada de forma incremental (upsert) a cada lançamento inserido. Para
+responder rápido, cada worker mantém em memória, por usuário, uma lista
+ordenada de chaves normalizadas onde a busca por prefixo é um bisect.
+"""
+import heapq
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from sqlalchemy import case, event, func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db
+from .models import AutocompletarTermo, Faturamento, CustoVariavel
+from .replicas import no_primario
+
+CAMPOS = ('fonte', 'descricao')
+# Fontes que já são opções fixas do formulário não precisam de sugestão
+FONTES_FIXAS = {'Uber', '99', 'Outro', 'Dinheiro', 'N/A'}
+MAX_SUGESTOES = 10
+MAX_USUARIOS_EM_MEMORIA = 256
+# Outros workers também gravam termos: o índice em memória é recarregado periodicamente
+VALIDADE_SEGUNDOS = 300
+
+
+def _normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto.strip().lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+class IndiceUsuario:
+    """Termos de um usuário por campo, ordenados pela chave normalizada."""
+
+    def __init__(self, termos=()):
+        self.carregado_em = time.monotonic()
+        self._chaves = {campo: [] for campo in CAMPOS}
+        self._dados = {campo: {} for campo in CAMPOS}
+        for t in termos:
+            self._dados[t.campo][t.termo] = [t.usos, t.ultimo_uso, t.categoria_id]
+            self._chaves[t.campo].append((_normalizar(t.termo), t.termo))
+        for chaves in self._chaves.values():
+            chaves.sort()
+
+    def registrar(self, campo, termo, usos, ultimo_uso, categoria_id=None):
+        dados = self._dados[campo].get(termo)
+        if dados is None:
+            self._dados[campo][termo] = [usos, ultimo_uso, categoria_id]
+            insort(self._chaves[campo], (_normalizar(termo), termo))
+            return
+        dados[0] += usos
+        dados[1] = max(dados[1], ultimo_uso)
+        dados[2] = categoria_id or dados[2]
+
+    def sugerir(self, campo, prefixo, limite=MAX_SUGESTOES):
+        """Termos que começam com `prefixo`, dos mais usados para os menos usados."""
+        chave = _normalizar(prefixo)
+        chaves = self._chaves[campo]
+        candidatos = []
+        for i in range(bisect_left(chaves, (chave,)), len(chaves)):
+            if not chaves[i][0].startswith(chave):
+                break
+            candidatos.append(chaves[i][1])
+        dados = self._dados[campo]
+        melhores = heapq.nlargest(limite, candidatos, key=lambda t: (dados[t][0], dados[t][1]))
+        return [{'termo': t, 'categoria_id': dados[t][2]} for t in melhores]
+
+
+_indices = OrderedDict()
+_trava = threading.Lock()
+
+
+def indice_do_usuario(user_id):
+    """Índice em memória do usuário (LRU por worker), carregado do banco se preciso."""
+    with _trava:
+        indice = _indices.get(user_id)
+        if indice is not None and time.monotonic() - indice.carregado_em < VALIDADE_SEGUNDOS:
+            _indices.move_to_end(user_id)
+            return indice
+
+    # Compartilhado entre requisições: lido do primário, mesmo numa rota @somente_leitura
+    with no_primario():
+        indice = IndiceUsuario(AutocompletarTermo.query.filter_by(user_id=user_id).all())
+    with _trava:
+        _indices[user_id] = indice
+        _indices.move_to_end(user_id)
+        while len(_indices) > MAX_USUARIOS_EM_MEMORIA:
+            _indices.popitem(last=False)
+    return indice
+
+
+def sugerir(user_id, campo, prefixo, limite=MAX_SUGESTOES):
+    return indice_do_usuario(user_id).sugerir(campo, prefixo, max(1, min(limite, MAX_SUGESTOES)))
+
+
+def invalidar(user_id):
+    with _trava:
+        _indices.pop(user_id, None)
+
+
+def _termos_do_flush(session):
+    """Agrega os termos dos lançamentos novos: {(user_id, campo, termo): [usos, ultimo_uso, categoria_id]}"""
+    termos = {}
+
+    def contar(user_id, campo, termo, data, categoria_id=None):
+        termo = (termo or '').strip()[:200]
+        if not termo:
+            return
+        dados = termos.setdefault((user_id, campo, termo), [0, data, None])
+        dados[0] += 1
+        if data >= dados[1]:
+            dados[1] = data
+            dados[2] = categoria_id or dados[2]
+
+    for obj in session.new:
+        if isinstance(obj, Faturamento) and obj.fonte not in FONTES_FIXAS:
+            contar(obj.user_id, 'fonte', obj.fonte, obj.data)
+        elif isinstance(obj, CustoVariavel):
+            contar(obj.user_id, 'descricao', obj.descricao, obj.data, obj.categoria_id)
+    return termos
+
+
+def _gravar(conexao, termos):
+    tabela = AutocompletarTermo.__table__
+    linhas = [
+        {'user_id': user_id, 'campo': campo, 'termo': termo,
+         'usos': usos, 'ultimo_uso': ultimo_uso, 'categoria_id': categoria_id}
+        for (user_id, campo, termo), (usos, ultimo_uso, categoria_id) in termos.items()
+    ]
+    dialeto = conexao.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialeto == 'sqlite' else postgresql).insert
+        stmt = insert(tabela).values(linhas)
+        conexao.execute(stmt.on_conflict_do_update(
+            index_elements=['user_id', 'campo', 'termo'],
+            set_={
+                'usos': tabela.c.usos + stmt.excluded.usos,
+                'ultimo_uso': case(
+                    (stmt.excluded.ultimo_uso > tabela.c.ultimo_uso, stmt.excluded.ultimo_uso),
+                    else_=tabela.c.ultimo_uso
+                ),
+                'categoria_id': func.coalesce(stmt.excluded.categoria_id, tabela.c.categoria_id),
+            }
+        ))
+        return
+    for linha in linhas:
+        atualizados = conexao.execute(tabela.update().where(
+            tabela.c.user_id == linha['user_id'], tabela.c.campo == linha['campo'], tabela.c.termo == linha['termo']
+        ).values(
+            usos=tabela.c.usos + linha['usos'], ultimo_uso=linha['ultimo_uso'],
+            categoria_id=func.coalesce(linha['categoria_id'], tabela.c.categoria_id)
+        )).rowcount
+        if not atualizados:
+            conexao.execute(tabela.insert(), linha)
+
+
+def _ao_flush(session, flush_context):
+    termos = _termos_do_flush(session)
+    if termos:
+        _gravar(session.connection(), termos)
+        session.info.setdefault('autocompletar', []).append(termos)
+
+
+def _ao_commit(session):
+    # Só depois do commit os termos novos entram nos índices em memória já carregados
+    for termos in session.info.pop('autocompletar', []):
+        with _trava:
+            for (user_id, campo, termo), (usos, ultimo_uso, categoria_id) in termos.items():
+                indice = _indices.get(user_id)
+                if indice is not None:
+                    indice.registrar(campo, termo, usos, ultimo_uso, categoria_id)
+
+
+def _ao_rollback(session):
+    session.info.pop('autocompletar', None)
+
+
+def init_app(app):
+    for nome, listener in (('after_flush', _ao_flush), ('after_commit', _ao_commit),
+                           ('after_rollback', _ao_rollback)):
+        if not event.contains(db.session, nome, listener):
+            event.listen(db.session, nome, listener)
@@ -0,0 +1,174 @@
+"""
+Busca full-text nas descrições e observações de custos e receitas.
+
+Cada registro pesquisável vira uma linha em `busca_documento`, mantida em
+sincronia por um listener de flush da sessão. O índice em si depende do banco:
+- SQLite: tabela virtual FTS5 `busca_fts`, alimentada por triggers, com o
+  usuário como um token próprio (a consulta só percorre os documentos dele);
+- Postgres: índice GIN sobre to_tsvector('portuguese', texto).
+
+Uso:
+    flask busca reindexar   # reconstrói o índice a partir das tabelas de origem
+"""
+import re
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Date, Integer, String, Text, event, inspect, text, tuple_
+
+from . import db, shards
+from .models import BuscaDocumento, CustoVariavel, Custo, RegistroCusto, Receita
+
+MAX_TERMOS = 8
+MAX_RESULTADOS = 50
+
+busca_cli = AppGroup('busca', help='Manutenção do índice de busca.')
+
+
+def _juntar(*partes):
+    return ' '.join(p.strip() for p in partes if p and p.strip())
+
+
+# Modelo -> (tipo, atributos que alteram o documento, texto, data)
+FONTES = {
+    CustoVariavel: ('custo_variavel', ('descricao', 'data'),
+                    lambda o: _juntar(o.descricao), lambda o: o.data),
+    Custo: ('custo', ('nome', 'observacao'),
+            lambda o: _juntar(o.nome, o.observacao), lambda o: None),
+    RegistroCusto: ('registro_custo', ('observacao', 'data_vencimento'),
+                    lambda o: _juntar(o.observacao), lambda o: o.data_vencimento),
+    Receita: ('receita', ('nome', 'observacao'),
+              lambda o: _juntar(o.nome, o.observacao), lambda o: None),
+}
+
+
+def _documento(obj):
+    tipo, _, texto_de, data_de = FONTES[type(obj)]
+    texto = texto_de(obj)
+    if not texto:
+        return None
+    return {'user_id': obj.user_id, 'tipo': tipo, 'ref_id': obj.id, 'data': data_de(obj), 'texto': texto}
+
+
+def _alterado(obj):
+    estado = inspect(obj)
+    return any(estado.attrs[attr].history.has_changes() for attr in FONTES[type(obj)][1])
+
+
+def _sincronizar(session, flush_context):
+    """Reflete no índice os objetos pesquisáveis inseridos/alterados/removidos neste flush."""
+    remover, gravar = [], []
+    for obj in session.new:
+        if type(obj) in FONTES:
+            gravar.append(obj)
+    for obj in session.dirty:
+        if type(obj) in FONTES and _alterado(obj):
+            remover.append(obj)
+            gravar.append(obj)
+    for obj in session.deleted:
+        if type(obj) in FONTES:
+            remover.append(obj)
+    if not remover and not gravar:
+        return
+
+    tabela = BuscaDocumento.__table__
+    conexao = session.connection()
+    if remover:
+        conexao.execute(tabela.delete().where(
+            tuple_(tabela.c.tipo, tabela.c.ref_id).in_([(FONTES[type(o)][0], o.id) for o in remover])
+        ))
+    documentos = [d for d in map(_documento, gravar) if d]
+    if documentos:
+        conexao.execute(tabela.insert(), documentos)
+
+
+def _termos(consulta):
+    return re.findall(r'\w+', (consulta or '').lower())[:MAX_TERMOS]
+
+
+def buscar(user_id, consulta, inicio=None, fim=None, limite=20):
+    """
+    Documentos do usuário que contêm todos os termos (também como prefixo),
+    do mais relevante para o menos relevante; empates pelo mais recente.
+    """
+    termos = _termos(consulta)
+    if not termos:
+        return []
+    limite = max(1, min(limite, MAX_RESULTADOS))
+    params = {'user_id': user_id, 'inicio': inicio, 'fim': fim, 'limite': limite}
+    filtros_data = ''
+    if inicio:
+        filtros_data += ' AND d.data >= :inicio'
+    if fim:
+        filtros_data += ' AND d.data <= :fim'
+
+    dialeto = db.engine.dialect.name
+    if dialeto == 'sqlite':
+        termos_fts = ' AND '.join('"{}"*'.format(t.replace('"', '""')) for t in termos)
+        params['consulta'] = f'usuario:"u{user_id}" AND texto:({termos_fts})'
+        sql = f"""
+            SELECT d.tipo, d.ref_id, d.data, d.texto FROM busca_fts
+            JOIN busca_documento d ON d.id = busca_fts.rowid
+            WHERE busca_fts MATCH :consulta{filtros_data}
+            ORDER BY bm25(busca_fts, 1.0, 0.0), d.data DESC
+            LIMIT :limite
+        """
+    elif dialeto == 'postgresql':
+        params['consulta'] = ' & '.join(f'{t}:*' for t in termos)
+        sql = f"""
+            SELECT d.tipo, d.ref_id, d.data, d.texto FROM busca_documento d
+            WHERE d.user_id = :user_id
+              AND to_tsvector('portuguese', d.texto) @@ to_tsquery('portuguese', :consulta){filtros_data}
+            ORDER BY ts_rank(to_tsvector('portuguese', d.texto), to_tsquery('portuguese', :consulta)) DESC,
+                     d.data DESC NULLS LAST
+            LIMIT :limite
+        """
+    else:
+        # Sem índice full-text conhecido: varredura com LIKE, correta porém lenta
+        condicoes = []
+        for i, termo in enumerate(termos):
+            params[f'termo{i}'] = f'%{termo}%'
+            condicoes.append(f'lower(d.texto) LIKE :termo{i}')
+        sql = f"""
+            SELECT d.tipo, d.ref_id, d.data, d.texto FROM busca_documento d
+            WHERE d.user_id = :user_id AND {' AND '.join(condicoes)}{filtros_data}
+            ORDER BY d.data DESC
+            LIMIT :limite
+        """
+
+    return [
+        {'tipo': tipo, 'id': ref_id, 'data': data, 'texto': texto}
+        for tipo, ref_id, data, texto in db.session.execute(
+            text(sql).columns(tipo=String, ref_id=Integer, data=Date, texto=Text), params
+        )
+    ]
+
+
+def reindexar():
+    """Reconstrói busca_documento (e, por consequência, o índice) do zero."""
+    db.session.execute(BuscaDocumento.__table__.delete())
+    total = 0
+    for modelo in FONTES:
+        documentos = []
+        for obj in modelo.query.yield_per(1000):
+            documento = _documento(obj)
+            if documento:
+                documentos.append(documento)
+        if documentos:
+            db.session.execute(BuscaDocumento.__table__.insert(), documentos)
+        total += len(documentos)
+    db.session.commit()
+    return total
+
+
+@busca_cli.command('reindexar')
+def reindexar_command():
+    """Reconstrói o índice de busca a partir das tabelas de origem."""
+    total = sum(reindexar() for _ in shards.em_cada_banco())
+    click.echo(f'{total} documentos indexados ({db.engine.dialect.name}).')
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _sincronizar):
+        event.listen(db.session, 'after_flush', _sincronizar)
+    app.cli.add_command(busca_cli)
@@ -0,0 +1,123 @@
+"""
+Calendário de metas: a meta de faturamento esperada em cada dia.
+
+Cada versão de `Parametros` é expandida em dias reais, respeitando os dias da
+semana trabalhados e a periodicidade da meta (diária, semanal ou mensal, esta
+dividida pelos dias de trabalho do mês). "Meta esperada entre a e b" é um
+bisect para achar as versões do intervalo e, em cada uma, uma conta fechada:
+semanas inteiras vezes os dias trabalhados por semana mais os até seis dias
+que sobram; na meta mensal, cada mês inteiro vale a meta e só os meses das
+pontas são proporcionais. O custo não depende do tamanho do intervalo e nada
+fica em memória entre requisições.
+"""
+from bisect import bisect_right
+from calendar import monthrange
+from datetime import date
+from functools import lru_cache
+
+from .models import Parametros
+
+
+def dia_de_trabalho(parametro, dia):
+    return dia.weekday() in parametro.dias_da_semana
+
+
+@lru_cache(maxsize=1024)
+def dias_de_trabalho_no_mes(dias_da_semana, ano, mes):
+    _, ultimo = monthrange(ano, mes)
+    return sum(date(ano, mes, d).weekday() in dias_da_semana for d in range(1, ultimo + 1))
+
+
+def _meta(meta, periodicidade, dias_da_semana, dia):
+    if not meta or dia.weekday() not in dias_da_semana:
+        return 0.0
+    if periodicidade == 'semanal':
+        return meta / len(dias_da_semana)
+    if periodicidade == 'mensal':
+        return meta / dias_de_trabalho_no_mes(dias_da_semana, dia.year, dia.month)
+    return meta
+
+
+def meta_do_dia(parametro, dia):
+    """Meta de faturamento esperada em `dia` segundo a versão de parâmetros em vigor."""
+    if not parametro:
+        return 0.0
+    return _meta(parametro.meta_faturamento, parametro.periodicidade_meta, parametro.dias_da_semana, dia)
+
+
+def dias_trabalhados(dias_da_semana, inicio, fim):
+    """Quantos dias entre os ordinais inicio e fim (inclusive) caem nos dias da semana dados."""
+    if fim < inicio:
+        return 0
+    semanas, resto = divmod(fim - inicio + 1, 7)
+    # O ordinal 1 (01/01/0001) é uma segunda-feira: weekday() == (ordinal + 6) % 7
+    return semanas * len(dias_da_semana) + sum(
+        (ordinal + 6) % 7 in dias_da_semana for ordinal in range(fim - resto + 1, fim + 1)
+    )
+
+
+def _fim_do_mes(dia):
+    return dia.replace(day=monthrange(dia.year, dia.month)[1])
+
+
+def soma_da_versao(parametro, inicio, fim):
+    """Soma das metas da versão entre os ordinais inicio e fim (inclusive, dentro da vigência)."""
+    meta, dias = parametro.meta_faturamento, parametro.dias_da_semana
+    if not meta or not dias or fim < inicio:
+        return 0.0
+    if parametro.periodicidade_meta != 'mensal':
+        por_dia = meta / len(dias) if parametro.periodicidade_meta == 'semanal' else meta
+        return por_dia * dias_trabalhados(dias, inicio, fim)
+
+    # Mensal: mês inteiro vale a meta; nas pontas, a fração dos dias de trabalho do mês
+    def parcial(de, ate):
+        return meta * dias_trabalhados(dias, de.toordinal(), ate.toordinal()) / \
+            dias_de_trabalho_no_mes(dias, de.year, de.month)
+
+    de, ate = date.fromordinal(inicio), date.fromordinal(fim)
+    if (de.year, de.month) == (ate.year, ate.month):
+        return parcial(de, ate)
+    meses_inteiros = (ate.year * 12 + ate.month) - (de.year * 12 + de.month) - 1
+    return parcial(de, _fim_do_mes(de)) + meta * meses_inteiros + parcial(ate.replace(day=1), ate)
+
+
+def vigencias(parametros):
+    """
+    [(inicio, fim, parametro)] em ordinais, sem sobreposição e em ordem: cada
+    versão vale até o fim dela ou até a próxima começar (fim None = em aberto).
+    Versões encerradas antes de começar (parâmetro trocado duas vezes no mesmo
+    dia) não valem em dia nenhum.
+    """
+    validas = sorted(
+        (p for p in parametros if p.end_date is None or p.end_date >= p.start_date),
+        key=lambda p: (p.start_date, p.id)
+    )
+    resultado = []
+    for atual, proxima in zip(validas, validas[1:] + [None]):
+        fim = atual.end_date.toordinal() if atual.end_date else None
+        if proxima is not None:
+            limite = proxima.start_date.toordinal() - 1
+            fim = limite if fim is None else min(fim, limite)
+        if fim is None or fim >= atual.start_date.toordinal():
+            resultado.append((atual.start_date.toordinal(), fim, atual))
+    return resultado
+
+
+def meta_do_periodo(parametros, inicio, fim):
+    """Meta esperada entre inicio e fim (inclusive) para as versões dadas."""
+    faixas = vigencias(parametros)
+    a, b = inicio.toordinal(), fim.toordinal()
+    total = 0.0
+    # Primeira versão que pode cobrir `inicio`: a última que começa até ele
+    i = max(0, bisect_right([f[0] for f in faixas], a) - 1)
+    for comeco, termino, parametro in faixas[i:]:
+        if comeco > b:
+            break
+        de, ate = max(a, comeco), b if termino is None else min(b, termino)
+        total += soma_da_versao(parametro, de, ate)
+    return total
+
+
+def meta_esperada(user_id, inicio, fim):
+    """Meta de faturamento esperada do usuário entre inicio e fim (inclusive)."""
+    return meta_do_periodo(Parametros.query.filter_by(user_id=user_id).all(), inicio, fim)
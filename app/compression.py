@@ -0,0 +1,186 @@
+"""
+Middleware WSGI de compressão de respostas (brotli/gzip).
+
+Negocia a codificação pelo `Accept-Encoding`, respeita um tamanho mínimo
+configurável e comprime de forma incremental, inclusive respostas geradas
+por generators (stream), que recebem um flush a cada chunk.
+"""
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import dump_header, parse_accept_header, parse_set_header
+
+try:
+    import brotli
+except ImportError:  # Sem brotli, apenas gzip é negociado
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    'text/html', 'text/css', 'text/plain', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'application/x-ndjson',
+    'application/jsonl', 'image/svg+xml',
+)
+
+
+class _GzipCompressor:
+    def __init__(self, level):
+        # wbits=31 gera o container gzip (cabeçalho + crc)
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    def __init__(self, quality):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=500, mimetypes=DEFAULT_MIMETYPES,
+                 gzip_level=6, brotli_quality=4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.mimetypes = set(mimetypes)
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def new_compressor(self, encoding):
+        if encoding == 'br':
+            return _BrotliCompressor(self.brotli_quality)
+        return _GzipCompressor(self.gzip_level)
+
+    def negotiate(self, accept_encoding):
+        """Escolhe 'br' ou 'gzip' pelo maior q-value; em empate, prefere brotli."""
+        accept = parse_accept_header(accept_encoding)
+        candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+        best, best_quality = None, 0
+        for encoding in candidates:
+            quality = accept[encoding]
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def __call__(self, environ, start_response):
+        state = {}
+
+        def capture_start_response(status, headers, exc_info=None):
+            if exc_info and state.get('started'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            state.update(status=status, headers=headers, exc_info=exc_info)
+            return state.setdefault('written', []).append
+
+        app_iter = self.app(environ, capture_start_response)
+        return self._iter_response(environ, start_response, app_iter, state)
+
+    def _is_compressible(self, environ, status, headers):
+        content_type = headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type not in self.mimetypes:
+            return False
+        code = int(status.split(' ', 1)[0])
+        if code < 200 or code in (204, 206, 304):
+            return False
+        if 'no-transform' in headers.get('Cache-Control', ''):
+            return False
+        return environ.get('REQUEST_METHOD') != 'HEAD'
+
+    def _iter_response(self, environ, start_response, app_iter, state):
+        chunks = iter(app_iter)
+        try:
+            buffered = []
+            exhausted = False
+            if not state:
+                # start_response pode ser adiado até o primeiro chunk
+                for chunk in chunks:
+                    buffered.append(chunk)
+                    if state:
+                        break
+                else:
+                    exhausted = True
+
+            headers = Headers(state['headers'])
+            buffered = state.get('written', []) + buffered
+            content_length = headers.get('Content-Length', type=int)
+            streamed = content_length is None
+
+            encoding = None
+            if 'Content-Encoding' not in headers and self._is_compressible(environ, state['status'], headers):
+                vary = parse_set_header(headers.get('Vary'))
+                vary.add('Accept-Encoding')
+                headers['Vary'] = dump_header(vary)
+                encoding = self.negotiate(environ.get('HTTP_ACCEPT_ENCODING', ''))
+
+            if encoding and streamed:
+                # Tamanho desconhecido: acumula até saber se passa do mínimo
+                size = sum(len(c) for c in buffered)
+                while not exhausted and size < self.minimum_size:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                    else:
+                        buffered.append(chunk)
+                        size += len(chunk)
+                if size < self.minimum_size:
+                    encoding = None
+            elif encoding and content_length < self.minimum_size:
+                encoding = None
+
+            if encoding:
+                headers['Content-Encoding'] = encoding
+                headers.remove('Content-Length')
+                etag = headers.get('ETag')
+                if etag and not etag.startswith('W/'):
+                    headers['ETag'] = 'W/' + etag
+
+            start_response(state['status'], headers.to_wsgi_list(), state['exc_info'])
+            state['started'] = True
+
+            if not encoding:
+                yield from buffered
+                if not exhausted:
+                    yield from chunks
+                return
+
+            compressor = self.new_compressor(encoding)
+            data = compressor.compress(b''.join(buffered))
+            if streamed and not exhausted:
+                data += compressor.flush()
+            if data:
+                yield data
+            if not exhausted:
+                for chunk in chunks:
+                    data = compressor.compress(chunk)
+                    if streamed:
+                        # Em stream, cada chunk precisa chegar ao cliente sem esperar o próximo
+                        data += compressor.flush()
+                    if data:
+                        yield data
+            yield compressor.finish()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+
+def init_app(app):
+    app.wsgi_app = CompressionMiddleware(
+        app.wsgi_app,
+        minimum_size=app.config['COMPRESS_MIN_SIZE'],
+        mimetypes=app.config.get('COMPRESS_MIMETYPES', DEFAULT_MIMETYPES),
+        gzip_level=app.config['COMPRESS_GZIP_LEVEL'],
+        brotli_quality=app.config['COMPRESS_BR_QUALITY'],
+    )
@@ -0,0 +1,106 @@
+"""
+Detalhamento dos relatórios: agregados agrupados por uma dimensão.
+
+Faturamento por fonte/tipo, custos variáveis por categoria, abastecimentos
+por tipo de combustível e qualquer uma dessas medidas por dia da semana.
+Cada detalhamento é uma única consulta GROUP BY sobre o período (apoiada nos
+índices user_id + data); o corte em top-N + "Outros" é feito em Python.
+Períodos que alcançam meses arquivados consultam também as tabelas do arquivo
+(app/fechamento.py).
+"""
+from sqlalchemy import cast, extract, func, Integer
+
+from . import db, fechamento
+from .models import Faturamento, CustoVariavel, CategoriaCusto, Abastecimento, TipoCombustivel
+
+TOP_PADRAO = 5
+TOP_MAXIMO = 20
+DIAS_DA_SEMANA = ('Domingo', 'Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado')
+
+# Medida -> (modelo, atributo de valor)
+MEDIDAS = {
+    'faturamento': (Faturamento, 'valor'),
+    'custos_variaveis': (CustoVariavel, 'valor'),
+    'abastecimento': (Abastecimento, 'valor_total'),
+}
+
+# Dimensão -> medidas em que ela existe (a primeira é a padrão)
+DIMENSOES = {
+    'fonte': ('faturamento',),
+    'tipo': ('faturamento',),
+    'categoria': ('custos_variaveis',),
+    'tipo_combustivel': ('abastecimento',),
+    'dia_semana': ('faturamento', 'custos_variaveis', 'abastecimento'),
+}
+
+
+class DetalhamentoInvalido(ValueError):
+    """Combinação de dimensão/medida que não existe."""
+
+
+def _dia_da_semana(coluna_data):
+    # 0 = domingo nos dois bancos
+    if db.engine.dialect.name == 'sqlite':
+        return cast(func.strftime('%w', coluna_data), Integer)
+    return cast(extract('dow', coluna_data), Integer)
+
+
+def _consulta(dimensao, medida, modelo):
+    # `modelo` é a classe da medida ou um alias dela sobre a união com o arquivo
+    agregados = (func.sum(getattr(modelo, MEDIDAS[medida][1])), func.count(modelo.id))
+    if dimensao == 'fonte':
+        return db.session.query(func.coalesce(modelo.fonte, 'N/A'), *agregados)
+    if dimensao == 'tipo':
+        return db.session.query(modelo.tipo, *agregados)
+    if dimensao == 'categoria':
+        return db.session.query(CategoriaCusto.nome, *agregados).join(
+            CategoriaCusto, modelo.categoria_id == CategoriaCusto.id
+        )
+    if dimensao == 'tipo_combustivel':
+        return db.session.query(func.coalesce(TipoCombustivel.nome, 'Não informado'), *agregados).outerjoin(
+            TipoCombustivel, modelo.tipo_combustivel_id == TipoCombustivel.id
+        )
+    return db.session.query(_dia_da_semana(modelo.data), *agregados)
+
+
+def detalhar(user_id, dimensao, inicio, fim, medida=None, top=TOP_PADRAO):
+    """
+    Total da medida no período agrupado pela dimensão, ordenado do maior para
+    o menor, com os grupos além do top-N somados em "outros".
+    """
+    if dimensao not in DIMENSOES:
+        raise DetalhamentoInvalido(f'Dimensão desconhecida: {dimensao}')
+    medida = medida or DIMENSOES[dimensao][0]
+    if medida not in DIMENSOES[dimensao]:
+        raise DetalhamentoInvalido(f'A dimensão {dimensao} não se aplica a {medida}.')
+    top = max(1, min(top, TOP_MAXIMO))
+
+    modelo = fechamento.com_arquivo(MEDIDAS[medida][0], user_id, inicio)
+    consulta = _consulta(dimensao, medida, modelo)
+    chave = consulta.column_descriptions[0]['expr']
+    linhas = consulta.filter(
+        modelo.user_id == user_id, modelo.data.between(inicio, fim)
+    ).group_by(chave).all()
+
+    grupos = sorted(
+        ({'chave': DIAS_DA_SEMANA[c] if dimensao == 'dia_semana' else c,
+          'valor': round(v or 0.0, 2), 'quantidade': q} for c, v, q in linhas),
+        key=lambda g: g['valor'], reverse=True
+    )
+    if dimensao == 'dia_semana':
+        # Os sete dias cabem sempre: mantém a ordem da semana em vez do ranking
+        grupos.sort(key=lambda g: DIAS_DA_SEMANA.index(g['chave']))
+        top = len(DIAS_DA_SEMANA)
+
+    restantes = grupos[top:]
+    return {
+        'dimensao': dimensao,
+        'medida': medida,
+        'total': round(sum(g['valor'] for g in grupos), 2),
+        'itens': grupos[:top],
+        'outros': {
+            'valor': round(sum(g['valor'] for g in restantes), 2),
+            'quantidade': sum(g['quantidade'] for g in restantes),
+            'grupos': len(restantes),
+        },
+    }
@@ -0,0 +1,143 @@
+"""
+Exclusão em massa de contas e de definições recorrentes.
+
+Em vez de `db.session.delete(obj)`, que faz o ORM carregar cada filho das
+relações com cascade para apagá-los um a um, cada tabela recebe um único
+`DELETE ... WHERE user_id/custo_id/receita_id = ?`, dos dependentes para os
+referenciados, na mesma transação. O custo fica proporcional ao número de
+tabelas, não de linhas, e a memória é constante. As chaves estrangeiras têm
+ON DELETE CASCADE no banco como segunda garantia: no SQLite elas só valem com
+`PRAGMA foreign_keys=ON`, ligado em cada conexão nova. As relações de User
+usam `passive_deletes`: um `db.session.delete(user)` deixa o banco apagar os
+dados em vez de carregá-los na sessão.
+
+Como as linhas não passam pela sessão, os caches em memória (razão e
+autocompletar) do usuário são invalidados explicitamente.
+"""
+import sqlite3
+import time
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, or_, select
+
+from . import db, razao, autocompletar, shards
+from .models import (
+    User, UsuarioShard, ResumoMensal, Custo, RegistroCusto, Receita, RegistroReceita, AlertaVencimento, BuscaDocumento,
+    RegistroCustoArquivo, RegistroReceitaArquivo
+)
+from .sessao import TABELAS_GLOBAIS
+
+contas_cli = AppGroup('contas', help='Manutenção de contas de usuário.')
+
+
+def tabelas_do_usuario():
+    """Tabelas de dados do usuário (com user_id, fora as globais), das que referenciam para as referenciadas."""
+    return [
+        tabela for tabela in reversed(db.metadata.sorted_tables)
+        if 'user_id' in tabela.c and tabela.name not in TABELAS_GLOBAIS
+    ]
+
+
+def apagar_dados(conexao, user_id):
+    """Apaga as linhas do usuário em todas as tabelas de dados; devolve {tabela: linhas apagadas}."""
+    return {
+        tabela.name: conexao.execute(tabela.delete().where(tabela.c.user_id == user_id)).rowcount
+        for tabela in tabelas_do_usuario()
+    }
+
+
+def excluir_usuario(user_id):
+    """Apaga a conta e tudo o que pertence a ela; devolve {tabela: linhas apagadas}."""
+    usuarios = User.__table__
+    with shards.do_usuario(user_id):
+        conexao = db.session.connection()
+        apagadas = apagar_dados(conexao, user_id)
+        if db.session.info.get('shard'):
+            # Cópia da linha do usuário que o shard guarda para as chaves estrangeiras
+            conexao.execute(usuarios.delete().where(usuarios.c.id == user_id))
+        conexao_global = db.session.connection(bind_arguments={'mapper': User})
+        for tabela in (UsuarioShard.__table__, ResumoMensal.__table__):
+            conexao_global.execute(tabela.delete().where(tabela.c.user_id == user_id))
+        apagadas[usuarios.name] = conexao_global.execute(usuarios.delete().where(usuarios.c.id == user_id)).rowcount
+        razao.invalidar(user_id)
+        db.session.commit()
+    autocompletar.invalidar(user_id)
+    return apagadas
+
+
+def _documentos_de(tipo, ids):
+    documentos = BuscaDocumento.__table__
+    return (documentos.c.tipo == tipo) & documentos.c.ref_id.in_(ids)
+
+
+def excluir_custo(user_id, custo_id):
+    """Apaga a definição de custo do usuário e os seus registros. False se não existir."""
+    custos = Custo.__table__
+    registros = RegistroCusto.__table__
+    conexao = db.session.connection()
+    if conexao.execute(select(custos.c.id).where(custos.c.id == custo_id, custos.c.user_id == user_id)).first() is None:
+        return False
+
+    ids_registros = select(registros.c.id).where(registros.c.custo_id == custo_id).scalar_subquery()
+    alertas = AlertaVencimento.__table__
+    conexao.execute(alertas.delete().where(alertas.c.custo_id == custo_id))
+    conexao.execute(BuscaDocumento.__table__.delete().where(or_(
+        _documentos_de('registro_custo', ids_registros), _documentos_de('custo', [custo_id])
+    )))
+    conexao.execute(registros.delete().where(registros.c.custo_id == custo_id))
+    arquivados = RegistroCustoArquivo.__table__
+    conexao.execute(arquivados.delete().where(arquivados.c.custo_id == custo_id))
+    conexao.execute(custos.delete().where(custos.c.id == custo_id))
+    db.session.commit()
+    return True
+
+
+def excluir_receita(user_id, receita_id):
+    """Apaga a definição de receita do usuário e os seus registros. False se não existir."""
+    receitas = Receita.__table__
+    registros = RegistroReceita.__table__
+    conexao = db.session.connection()
+    if conexao.execute(select(receitas.c.id).where(receitas.c.id == receita_id, receitas.c.user_id == user_id)).first() is None:
+        return False
+
+    conexao.execute(BuscaDocumento.__table__.delete().where(_documentos_de('receita', [receita_id])))
+    conexao.execute(registros.delete().where(registros.c.receita_id == receita_id))
+    arquivados = RegistroReceitaArquivo.__table__
+    conexao.execute(arquivados.delete().where(arquivados.c.receita_id == receita_id))
+    conexao.execute(receitas.delete().where(receitas.c.id == receita_id))
+    db.session.commit()
+    return True
+
+
+@contas_cli.command('excluir')
+@click.argument('email')
+@click.option('--sim', is_flag=True, help='Não pede confirmação.')
+def excluir_command(email, sim):
+    """Exclui a conta EMAIL e todos os dados dela."""
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'Usuário {email} não encontrado.')
+    if not sim:
+        click.confirm(f'Excluir a conta {email} e todos os lançamentos?', abort=True)
+    inicio = time.perf_counter()
+    apagadas = excluir_usuario(user.id)
+    for tabela, linhas in apagadas.items():
+        if linhas:
+            click.echo(f'{tabela}: {linhas}')
+    click.echo(f'Conta excluída em {time.perf_counter() - inicio:.3f}s.')
+
+
+def _ligar_chaves_estrangeiras(conexao_dbapi, registro):
+    if isinstance(conexao_dbapi, sqlite3.Connection):
+        cursor = conexao_dbapi.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def init_app(app):
+    app.cli.add_command(contas_cli)
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'connect', _ligar_chaves_estrangeiras):
+                event.listen(engine, 'connect', _ligar_chaves_estrangeiras)
@@ -0,0 +1,243 @@
+"""
+Exportação e importação dos dados de um usuário em JSON Lines.
+
+O export é a cópia de segurança de uma conta e o meio de levá-la para outra
+instalação. Cada linha do arquivo é um objeto JSON:
+
+- a primeira é o cabeçalho: formato, versão, data e os nomes das categorias e
+  dos tipos de combustível (tabelas compartilhadas, com ids diferentes em cada
+  instalação);
+- depois vêm as linhas de cada tabela de dados do usuário
+  (`{"tabela": ..., "linha": {...}}`), na ordem de
+  `transferencia.tabelas_em_ordem()`, das referenciadas para as que
+  referenciam;
+- a última traz o total de linhas por tabela: arquivo sem ela está cortado.
+
+As linhas saem em lotes de `yield_per`, numa só leitura consistente do banco
+do usuário, e a memória não cresce com o tamanho da conta: o endpoint manda
+cada lote para o cliente assim que ele é lido.
+
+A importação grava tudo numa transação do banco do usuário de destino com o
+Importador de app/transferencia.py (ids novos, chaves estrangeiras traduzidas,
+INSERTs de várias linhas por lote). Categorias e tipos de combustível são
+casados pelo nome e criados quando faltam.
+"""
+import json
+import time
+from datetime import date, datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select
+
+from . import db, razao, autocompletar, shards, transferencia, exclusao
+from .models import User, CategoriaCusto, TipoCombustivel, VersaoRazao
+
+FORMATO = 'meupossante'
+VERSAO = 1
+TAMANHO_LOTE = transferencia.TAMANHO_LOTE
+COMPARTILHADAS = (CategoriaCusto, TipoCombustivel)
+# Controle do cache do razão, não dado do usuário
+FORA_DO_EXPORT = {VersaoRazao.__tablename__}
+
+dados_cli = AppGroup('dados', help='Exportação e importação dos dados de um usuário.')
+
+
+class ArquivoInvalido(ValueError):
+    """Export que não pode ser importado (formato, ordem, referências ou arquivo cortado)."""
+
+
+def _json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f'Valor sem representação em JSON: {valor!r}')
+
+
+def _linha_json(objeto):
+    return json.dumps(objeto, default=_json, ensure_ascii=False) + '\n'
+
+
+def _tabelas():
+    return [tabela for tabela in transferencia.tabelas_em_ordem() if tabela.name not in FORA_DO_EXPORT]
+
+
+def _leitura_consistente(conexao):
+    # No PostgreSQL cada SELECT vê os próprios commits; o export inteiro precisa ver um só instante
+    if conexao.dialect.name == 'postgresql':
+        return conexao.execution_options(isolation_level='REPEATABLE READ')
+    return conexao
+
+
+# --- Exportação --------------------------------------------------------------
+
+def exportar(user_id, tamanho_lote=TAMANHO_LOTE):
+    """Gera as linhas (texto) do export de `user_id`; lê o banco só à medida que é consumido."""
+    with db.engines[shards.shard_do_usuario(user_id)].connect() as conexao:
+        conexao = _leitura_consistente(conexao)
+        with conexao.begin():
+            tabelas = _tabelas()
+            yield _linha_json({
+                'formato': FORMATO,
+                'versao': VERSAO,
+                'exportado_em': datetime.utcnow(),
+                'tabelas': [tabela.name for tabela in tabelas],
+                # Os shards têm cópia das compartilhadas: a mesma conexão serve
+                'compartilhadas': {
+                    modelo.__tablename__: dict(conexao.execute(select(modelo.id, modelo.nome)).all())
+                    for modelo in COMPARTILHADAS
+                },
+            })
+            linhas = {}
+            for tabela in tabelas:
+                resultado = conexao.execute(
+                    select(tabela).where(tabela.c.user_id == user_id).order_by(tabela.c.id)
+                    .execution_options(yield_per=tamanho_lote)
+                )
+                linhas[tabela.name] = 0
+                for lote in resultado.mappings().partitions():
+                    linhas[tabela.name] += len(lote)
+                    yield ''.join(_linha_json({'tabela': tabela.name, 'linha': dict(linha)}) for linha in lote)
+            yield _linha_json({'fim': True, 'linhas': linhas})
+
+
+# --- Importação --------------------------------------------------------------
+
+def _conversores(tabela):
+    """Coluna -> função que desfaz a serialização do JSON (datas voltam de texto)."""
+    conversores = {}
+    for coluna in tabela.c:
+        if isinstance(coluna.type, db.DateTime):
+            conversores[coluna.name] = datetime.fromisoformat
+        elif isinstance(coluna.type, db.Date):
+            conversores[coluna.name] = date.fromisoformat
+    return conversores
+
+
+def _converter(tabela, conversores, linha):
+    # Colunas que não existem mais neste schema ficam de fora; as que faltam usam o default
+    return {
+        chave: conversores[chave](valor) if valor is not None and chave in conversores else valor
+        for chave, valor in linha.items() if chave in tabela.c
+    }
+
+
+def _mapas_compartilhadas(cabecalho):
+    """{tabela: {id no export: id aqui}} casando pelo nome; cria no banco global os nomes que faltam."""
+    mapas = {}
+    for modelo in COMPARTILHADAS:
+        nomes = cabecalho.get('compartilhadas', {}).get(modelo.__tablename__, {})
+        existentes = dict(db.session.query(modelo.nome, modelo.id))
+        novos = {nome: modelo(nome=nome) for nome in set(nomes.values()) - set(existentes)}
+        db.session.add_all(novos.values())
+        # O flush copia as novas para os shards (app/shards.py)
+        db.session.flush()
+        existentes.update((nome, obj.id) for nome, obj in novos.items())
+        mapas[modelo.__tablename__] = {int(antigo): existentes[nome] for antigo, nome in nomes.items()}
+    db.session.commit()
+    return mapas
+
+
+def _ler_cabecalho(linhas):
+    try:
+        cabecalho = json.loads(next(linhas))
+    except (StopIteration, ValueError):
+        raise ArquivoInvalido('Arquivo vazio ou sem cabeçalho.')
+    if cabecalho.get('formato') != FORMATO:
+        raise ArquivoInvalido('O arquivo não é um export do app.')
+    if cabecalho.get('versao') != VERSAO:
+        raise ArquivoInvalido(f'Versão de export não suportada: {cabecalho.get("versao")}.')
+    return cabecalho
+
+
+def importar(linhas, user_id, substituir=False, tamanho_lote=TAMANHO_LOTE):
+    """
+    Grava em `user_id` um export (iterável de linhas de texto); devolve {tabela: linhas}.
+    A conta precisa estar vazia, a não ser com `substituir`, que apaga os dados dela antes.
+    """
+    linhas = iter(linhas)
+    cabecalho = _ler_cabecalho(linhas)
+    por_nome = {tabela.name: tabela for tabela in _tabelas()}
+    ordem = {nome: i for i, nome in enumerate(por_nome)}
+    mapas = _mapas_compartilhadas(cabecalho)
+
+    with db.engines[shards.shard_do_usuario(user_id)].begin() as conexao:
+        # A versão do razão não pode voltar para um número que outro worker já tem em cache
+        versao_antiga = razao.versao(conexao, user_id)
+        if substituir:
+            exclusao.apagar_dados(conexao, user_id)
+        elif any(conexao.execute(select(tabela.c.id).where(tabela.c.user_id == user_id).limit(1)).first()
+                 for tabela in por_nome.values()):
+            raise ArquivoInvalido('A conta de destino já tem dados; use a opção de substituir.')
+
+        importador = transferencia.Importador(conexao, user_id, mapas)
+        tabela, conversores, lote, fim = None, {}, [], None
+        for numero, texto in enumerate(linhas, start=2):
+            if not texto.strip():
+                continue
+            try:
+                objeto = json.loads(texto)
+            except ValueError:
+                raise ArquivoInvalido(f'Linha {numero}: JSON inválido.')
+            if objeto.get('fim'):
+                fim = objeto
+                break
+            nome = objeto.get('tabela')
+            if nome not in por_nome:
+                raise ArquivoInvalido(f'Linha {numero}: tabela desconhecida {nome!r}.')
+            if tabela is None or nome != tabela.name:
+                if tabela is not None and ordem[nome] < ordem[tabela.name]:
+                    raise ArquivoInvalido(f'Linha {numero}: {nome} fora de ordem (depois de {tabela.name}).')
+                if lote:
+                    importador.inserir(tabela, lote)
+                tabela, conversores, lote = por_nome[nome], _conversores(por_nome[nome]), []
+            lote.append(_converter(tabela, conversores, objeto['linha']))
+            if len(lote) >= tamanho_lote:
+                importador.inserir(tabela, lote)
+                lote = []
+        if lote:
+            importador.inserir(tabela, lote)
+        if fim is None:
+            raise ArquivoInvalido('Arquivo cortado: falta a linha final do export.')
+        razao.invalidar(user_id, conexao, inicial=versao_antiga + 1)
+
+    autocompletar.invalidar(user_id)
+    return importador.linhas
+
+
+def _usuario(email):
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'Usuário {email} não encontrado.')
+    return user
+
+
+@dados_cli.command('exportar')
+@click.argument('email')
+@click.option('-o', '--saida', type=click.File('w', encoding='utf-8'), default='-', help='Arquivo de saída; padrão: stdout.')
+def exportar_command(email, saida):
+    """Exporta os dados de EMAIL em JSON Lines."""
+    user = _usuario(email)
+    for parte in exportar(user.id):
+        saida.write(parte)
+
+
+@dados_cli.command('importar')
+@click.argument('arquivo', type=click.File('r', encoding='utf-8'))
+@click.argument('email')
+@click.option('--substituir', is_flag=True, help='Apaga os dados atuais da conta antes de importar.')
+def importar_command(arquivo, email, substituir):
+    """Importa em EMAIL um export em JSON Lines."""
+    user = _usuario(email)
+    inicio = time.perf_counter()
+    try:
+        linhas = importar(arquivo, user.id, substituir)
+    except ValueError as e:
+        # ArquivoInvalido ou referência que não existe no próprio export (Importador)
+        raise click.ClickException(str(e))
+    for tabela, total in linhas.items():
+        click.echo(f'{tabela}: {total}')
+    click.echo(f'Importação concluída em {time.perf_counter() - inicio:.2f}s.')
+
+
+def init_app(app):
+    app.cli.add_command(dados_cli)
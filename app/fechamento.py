@@ -0,0 +1,374 @@
+"""
+Fechamento mensal: totais imutáveis dos meses encerrados e arquivo dos
+lançamentos antigos.
+
+`flask fechamento fechar` (job diário) fecha, para cada usuário, os meses
+terminados há mais de FECHAMENTO_CARENCIA_DIAS, em ordem. Cada mês ganha uma
+linha em fechamento_mensal com todos os totais que o dashboard e os relatórios
+usam (lançamentos, custos e receitas fixos, km e meta esperada) mais os litros
+da visão da frota, e cada dia com movimento ganha uma linha em
+fechamento_diario. "Fechado até" é o último dia do último mês fechado.
+
+Depois disso o período não muda mais:
+
+- lançamentos e registros com data até ali são recusados (MesFechado), seja
+  pelo ORM (verificação no flush) ou pelos upserts de app/lancamentos.py;
+- as leituras por dia (`por_dia`) usam fechamento_diario nos dias fechados e as
+  tabelas de lançamentos só nos abertos. O razão (app/razao.py), o razão de
+  metas e os custos fixos de período (`fixos`) passam por aqui.
+
+Os totais refletem as definições de custo/receita ativas no dia do fechamento.
+
+Com `--arquivar`, os lançamentos dos meses fechados há mais de
+ARQUIVO_RETENCAO_MESES saem das tabelas quentes para as tabelas *_arquivo,
+com um INSERT ... SELECT e um DELETE por tabela. O arquivo continua valendo:
+
+- nos detalhamentos (`com_arquivo`);
+- na exclusão de contas;
+- na cópia entre bancos (app/transferencia.py).
+"""
+import calendar
+import time
+from datetime import date, datetime, timedelta
+from itertools import chain
+
+import click
+from flask import current_app, flash, jsonify, redirect, request, url_for
+from flask.cli import AppGroup
+from sqlalchemy import case, event, func, inspect, select, union_all
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import aliased
+
+from . import db, razao, calendario, shards
+from .models import (
+    Parametros, LancamentoDiario, Faturamento, CustoVariavel, Abastecimento, Custo, RegistroCusto,
+    Receita, RegistroReceita, AlertaVencimento, BuscaDocumento, FechamentoMensal, FechamentoDiario,
+    FaturamentoArquivo, CustoVariavelArquivo, AbastecimentoArquivo, RegistroCustoArquivo, RegistroReceitaArquivo
+)
+
+# Colunas de fechamento_diario/fechamento_mensal (as três primeiras são os tipos do razão)
+COLUNAS = (
+    'faturamento', 'abastecimento', 'custos_variaveis',
+    'custos_fixos_total', 'custos_fixos_pagos', 'receitas_fixas_recebidas', 'km_rodado', 'litros',
+)
+FIXOS = ('custos_fixos_total', 'custos_fixos_pagos', 'receitas_fixas_recebidas')
+# Menos que isso e a janela da previsão (app/previsao.py) passaria a ler do arquivo
+RETENCAO_MINIMA_MESES = 3
+
+# Modelo -> (atributo de data, atributos que mudam os totais)
+PROTEGIDOS = {
+    Faturamento: ('data', ('data', 'valor', 'user_id')),
+    CustoVariavel: ('data', ('data', 'valor', 'user_id')),
+    Abastecimento: ('data', ('data', 'valor_total', 'user_id')),
+    RegistroCusto: ('data_vencimento', ('data_vencimento', 'valor', 'pago')),
+    RegistroReceita: ('data_recebimento_esperada', ('data_recebimento_esperada', 'valor', 'recebido')),
+}
+ARQUIVOS = {
+    Faturamento: FaturamentoArquivo,
+    CustoVariavel: CustoVariavelArquivo,
+    Abastecimento: AbastecimentoArquivo,
+    RegistroCusto: RegistroCustoArquivo,
+    RegistroReceita: RegistroReceitaArquivo,
+}
+# Documentos da busca (app/busca.py) que apontam para linhas arquivadas
+DOCUMENTOS_ARQUIVADOS = {CustoVariavel: 'custo_variavel', RegistroCusto: 'registro_custo'}
+
+fechamento_cli = AppGroup('fechamento', help='Fechamento mensal e arquivo de lançamentos.')
+
+
+class MesFechado(ValueError):
+    """Lançamento ou registro com data num mês já fechado."""
+
+
+def fim_do_mes(dia):
+    return dia.replace(day=calendar.monthrange(dia.year, dia.month)[1])
+
+
+def _meses_antes(mes, meses):
+    indice = mes.year * 12 + mes.month - 1 - meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def ultimo_mes_fechavel(hoje, carencia):
+    """Primeiro dia do último mês terminado há mais de `carencia` dias."""
+    return _meses_antes((hoje - timedelta(days=carencia)).replace(day=1), 1)
+
+
+def fechado_ate(user_id):
+    """Último dia do último mês fechado do usuário (None se nenhum)."""
+    mes = db.session.query(func.max(FechamentoMensal.mes)).filter(FechamentoMensal.user_id == user_id).scalar()
+    return fim_do_mes(mes) if mes else None
+
+
+def arquivado_ate(user_id):
+    """Último dia do último mês com os lançamentos no arquivo (None se nenhum)."""
+    mes = db.session.query(func.max(FechamentoMensal.mes)).filter(
+        FechamentoMensal.user_id == user_id, FechamentoMensal.arquivado_em.isnot(None)
+    ).scalar()
+    return fim_do_mes(mes) if mes else None
+
+
+def do_mes(user_id, mes):
+    """FechamentoMensal do mês de `mes` (None se o mês está aberto)."""
+    return FechamentoMensal.query.filter_by(user_id=user_id, mes=mes.replace(day=1)).first()
+
+
+def conferir_aberto(user_id, dia):
+    """Levanta MesFechado se `dia` cai num mês já fechado do usuário."""
+    if dia >= date.today().replace(day=1):
+        # O mês corrente nunca está fechado: nem consulta
+        return
+    fechado = fechado_ate(user_id)
+    if fechado and dia <= fechado:
+        raise MesFechado(f'O mês de {dia:%m/%Y} já foi fechado e não aceita mais alterações.')
+
+
+# --- Totais por dia ----------------------------------------------------------
+
+def _abertos(coluna, user_id, inicio=None, fim=None):
+    """Consulta (data, total) agrupada por dia de uma coluna de fechamento, nas tabelas quentes."""
+    if coluna in razao.TIPOS:
+        modelo, coluna_data, coluna_valor = razao.TIPOS[coluna]
+        consulta = db.session.query(coluna_data, func.sum(coluna_valor)).filter(modelo.user_id == user_id)
+    elif coluna == 'km_rodado':
+        coluna_data = LancamentoDiario.data
+        consulta = db.session.query(coluna_data, func.sum(LancamentoDiario.km_rodado)).filter(
+            LancamentoDiario.user_id == user_id
+        )
+    elif coluna == 'litros':
+        coluna_data = Abastecimento.data
+        consulta = db.session.query(coluna_data, func.sum(Abastecimento.litros)).filter(
+            Abastecimento.user_id == user_id
+        )
+    elif coluna == 'receitas_fixas_recebidas':
+        coluna_data = RegistroReceita.data_recebimento_esperada
+        consulta = db.session.query(coluna_data, func.sum(RegistroReceita.valor)).join(Receita).filter(
+            RegistroReceita.user_id == user_id, Receita.is_active == True, RegistroReceita.recebido == True
+        )
+    else:
+        coluna_data = RegistroCusto.data_vencimento
+        valor = RegistroCusto.valor
+        if coluna == 'custos_fixos_pagos':
+            valor = case((RegistroCusto.pago == True, RegistroCusto.valor), else_=0.0)
+        consulta = db.session.query(coluna_data, func.sum(valor)).join(Custo).filter(
+            RegistroCusto.user_id == user_id, Custo.is_active == True
+        )
+    if inicio is not None:
+        consulta = consulta.filter(coluna_data >= inicio)
+    if fim is not None:
+        consulta = consulta.filter(coluna_data <= fim)
+    return consulta.group_by(coluna_data).order_by(coluna_data)
+
+
+def por_dia(user_id, coluna, inicio=None, fim=None):
+    """
+    [(data, total)] em ordem de data entre inicio e fim (None: sem limite):
+    dias fechados de fechamento_diario, dias abertos das tabelas quentes.
+    """
+    fechado = fechado_ate(user_id)
+    linhas = []
+    if fechado and (inicio is None or inicio <= fechado):
+        valor = getattr(FechamentoDiario, coluna)
+        consulta = db.session.query(FechamentoDiario.data, valor).filter(
+            FechamentoDiario.user_id == user_id, FechamentoDiario.data <= min(fim or fechado, fechado), valor != 0
+        )
+        if inicio is not None:
+            consulta = consulta.filter(FechamentoDiario.data >= inicio)
+        linhas = consulta.order_by(FechamentoDiario.data).all()
+        inicio = fechado + timedelta(days=1)
+    if inicio is None or fim is None or inicio <= fim:
+        linhas.extend(_abertos(coluna, user_id, inicio, fim))
+    return linhas
+
+
+def fixos(user_id, inicio, fim):
+    """Custos fixos (total e pagos) e receitas fixas recebidas do período, só de definições ativas."""
+    return {coluna: sum(total or 0.0 for _, total in por_dia(user_id, coluna, inicio, fim)) for coluna in FIXOS}
+
+
+# --- Fechamento --------------------------------------------------------------
+
+def _primeiro_dia(user_id):
+    datas = [
+        db.session.query(func.min(coluna)).filter(modelo.user_id == user_id).scalar()
+        for modelo, coluna in (
+            (LancamentoDiario, LancamentoDiario.data),
+            *((modelo, coluna_data) for modelo, coluna_data, _ in razao.TIPOS.values()),
+            (RegistroCusto, RegistroCusto.data_vencimento),
+            (RegistroReceita, RegistroReceita.data_recebimento_esperada),
+        )
+    ]
+    datas = [d for d in datas if d]
+    return min(datas) if datas else None
+
+
+def fechar(user_id, ate, hoje=None):
+    """
+    Fecha, em ordem, os meses do usuário ainda abertos até o mês de `ate`
+    (limitado aos que já podem fechar). Devolve quantos meses fechou.
+    """
+    hoje = hoje or date.today()
+    ate = min(ate.replace(day=1), ultimo_mes_fechavel(hoje, current_app.config['FECHAMENTO_CARENCIA_DIAS']))
+    fechado = fechado_ate(user_id)
+    inicio = fechado + timedelta(days=1) if fechado else _primeiro_dia(user_id)
+    if inicio is None or inicio > fim_do_mes(ate):
+        return 0
+    inicio = inicio.replace(day=1)
+    fim = fim_do_mes(ate)
+
+    dias = {}
+    for coluna in COLUNAS:
+        for dia, total in _abertos(coluna, user_id, inicio, fim):
+            if total:
+                dias.setdefault(dia, dict.fromkeys(COLUNAS, 0))[coluna] = total
+    meses = {}
+    mes = inicio
+    while mes <= ate:
+        meses[mes] = {
+            'user_id': user_id, 'mes': mes, **dict.fromkeys(COLUNAS, 0),
+            'meta_esperada': calendario.meta_esperada(user_id, mes, fim_do_mes(mes)), 'fechado_em': datetime.utcnow(),
+        }
+        mes = fim_do_mes(mes) + timedelta(days=1)
+    for dia, totais in dias.items():
+        linha = meses[dia.replace(day=1)]
+        for coluna, total in totais.items():
+            linha[coluna] += total
+
+    conexao = db.session.connection()
+    if dias:
+        conexao.execute(FechamentoDiario.__table__.insert(), [
+            {'user_id': user_id, 'data': dia, **totais} for dia, totais in sorted(dias.items())
+        ])
+    conexao.execute(FechamentoMensal.__table__.insert(), list(meses.values()))
+    db.session.commit()
+    return len(meses)
+
+
+def arquivar(user_id, ate):
+    """
+    Move para as tabelas *_arquivo os lançamentos e registros do usuário com
+    data até `ate` (limitado ao que já está fechado). Devolve {tabela: linhas}.
+    """
+    fechado = fechado_ate(user_id)
+    if fechado is None:
+        return {}
+    ate = min(fim_do_mes(ate), fechado)
+    conexao = db.session.connection()
+    movidas = {}
+
+    documentos = BuscaDocumento.__table__
+    for modelo, tipo in DOCUMENTOS_ARQUIVADOS.items():
+        tabela = modelo.__table__
+        ids = select(tabela.c.id).where(tabela.c.user_id == user_id, tabela.c[PROTEGIDOS[modelo][0]] <= ate)
+        conexao.execute(documentos.delete().where(documentos.c.tipo == tipo, documentos.c.ref_id.in_(ids)))
+    registros = RegistroCusto.__table__
+    alertas = AlertaVencimento.__table__
+    conexao.execute(alertas.delete().where(alertas.c.registro_custo_id.in_(
+        select(registros.c.id).where(registros.c.user_id == user_id, registros.c.data_vencimento <= ate)
+    )))
+
+    for modelo, arquivo in ARQUIVOS.items():
+        quente, frio = modelo.__table__, arquivo.__table__
+        colunas = [coluna.name for coluna in quente.c if coluna.name != 'id']
+        filtro = (quente.c.user_id == user_id) & (quente.c[PROTEGIDOS[modelo][0]] <= ate)
+        conexao.execute(frio.insert().from_select(colunas, select(*(quente.c[c] for c in colunas)).where(filtro)))
+        movidas[quente.name] = conexao.execute(quente.delete().where(filtro)).rowcount
+
+    mensal = FechamentoMensal.__table__
+    conexao.execute(mensal.update().where(
+        mensal.c.user_id == user_id, mensal.c.mes <= ate, mensal.c.arquivado_em.is_(None)
+    ).values(arquivado_em=datetime.utcnow()))
+    db.session.commit()
+    return movidas
+
+
+def com_arquivo(modelo, user_id, inicio):
+    """
+    Entidade para consultar `modelo` a partir de `inicio`: o próprio modelo ou,
+    se o período alcança meses arquivados, um alias sobre a união da tabela
+    quente com a do arquivo (mesmas colunas).
+    """
+    arquivado = arquivado_ate(user_id)
+    if arquivado is None or inicio > arquivado:
+        return modelo
+    quente, frio = modelo.__table__, ARQUIVOS[modelo].__table__
+    uniao = union_all(select(quente), select(*(frio.c[coluna.name] for coluna in quente.c)))
+    return aliased(modelo, uniao.subquery(quente.name))
+
+
+# --- Proteção dos meses fechados -------------------------------------------
+
+def _datas(obj, atributo):
+    historico = inspect(obj).attrs[atributo].history
+    return [d for d in chain(historico.added or (), historico.deleted or (), historico.unchanged or ()) if d]
+
+
+def _conferir_flush(session, flush_context, instances):
+    primeiras = {}
+    for obj in chain(session.new, session.dirty, session.deleted):
+        protegido = PROTEGIDOS.get(type(obj))
+        if protegido is None or obj.user_id is None:
+            continue
+        atributo, relevantes = protegido
+        if obj in session.dirty and not any(inspect(obj).attrs[a].history.has_changes() for a in relevantes):
+            continue
+        for dia in _datas(obj, atributo):
+            primeiras[obj.user_id] = min(dia, primeiras.get(obj.user_id, dia))
+    with session.no_autoflush:
+        for user_id, dia in primeiras.items():
+            conferir_aberto(user_id, dia)
+
+
+def _mes_fechado(erro):
+    db.session.rollback()
+    accept = request.accept_mimetypes
+    if request.is_json or request.path.startswith('/api/') or (accept.accept_json and not accept.accept_html):
+        return jsonify(erro=str(erro)), 409
+    flash(str(erro), 'warning')
+    return redirect(request.referrer or url_for('main.dashboard'))
+
+
+# --- CLI ---------------------------------------------------------------------
+
+def _mes_param(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m').date()
+    except ValueError:
+        raise click.BadParameter('use o formato AAAA-MM')
+
+
+@fechamento_cli.command('fechar')
+@click.option('--ate', 'ate_str', default=None, help='Último mês a fechar (AAAA-MM); padrão: o último que já pode fechar.')
+@click.option('--arquivar', 'arquivar_antigos', is_flag=True,
+              help='Move para o arquivo os lançamentos dos meses fechados há mais de ARQUIVO_RETENCAO_MESES.')
+def fechar_command(ate_str, arquivar_antigos):
+    """Fecha os meses terminados de todos os usuários, banco a banco."""
+    hoje = date.today()
+    ate = _mes_param(ate_str) if ate_str else hoje
+    retencao = current_app.config['ARQUIVO_RETENCAO_MESES']
+    if arquivar_antigos and not retencao:
+        raise click.ClickException('Arquivo desligado (ARQUIVO_RETENCAO_MESES=0).')
+    corte = _meses_antes(hoje.replace(day=1), max(retencao, RETENCAO_MINIMA_MESES)) - timedelta(days=1)
+
+    inicio = time.perf_counter()
+    fechados = arquivadas = 0
+    for _ in shards.em_cada_banco():
+        for (user_id,) in db.session.query(Parametros.user_id).distinct().all():
+            try:
+                fechados += fechar(user_id, ate, hoje)
+                if arquivar_antigos:
+                    arquivadas += sum(arquivar(user_id, corte).values())
+            except IntegrityError:
+                # Outro processo fechou o mesmo mês ao mesmo tempo
+                db.session.rollback()
+    mensagem = f'{fechados} meses fechados'
+    if arquivar_antigos:
+        mensagem += f', {arquivadas} linhas arquivadas (até {corte:%m/%Y})'
+    click.echo(f'{mensagem} em {time.perf_counter() - inicio:.2f}s.')
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_flush', _conferir_flush):
+        event.listen(db.session, 'before_flush', _conferir_flush)
+    app.register_error_handler(MesFechado, _mes_fechado)
+    app.cli.add_command(fechamento_cli)
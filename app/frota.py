@@ -0,0 +1,236 @@
+"""
+Visão da frota: ranking dos motoristas para os administradores.
+
+As rotas do app são todas do `current_user`; comparar motoristas lendo os
+lançamentos de cada um não escala. A frota lê só resumo_mensal, uma linha por
+motorista e mês no banco global (faturamento, km rodado, litros abastecidos e
+meta esperada). O ranking de um período é um GROUP BY sobre os meses dele,
+ordenado e paginado no banco, qualquer que seja o tamanho do histórico.
+
+`flask frota atualizar` (job periódico, depois do fechamento) mantém o resumo,
+banco a banco:
+
+- os meses fechados (app/fechamento.py) são copiados uma vez do
+  fechamento_mensal, porque não mudam mais;
+- os meses abertos são recalculados dos lançamentos, com uma consulta agrupada
+  por usuário e dia para cada medida, e têm a meta esperada só até hoje.
+
+Administradores são os usuários com `is_admin` (`flask frota admin EMAIL`).
+"""
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from functools import wraps
+
+import click
+from flask import abort
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import func, select
+
+from . import db, calendario, shards
+from .fechamento import fim_do_mes
+from .models import (
+    User, Parametros, FechamentoMensal, ResumoMensal, Faturamento, LancamentoDiario, Abastecimento
+)
+
+POR_PAGINA_PADRAO = 50
+POR_PAGINA_MAXIMO = 500
+CRITERIOS = ('faturamento', 'valor_km', 'consumo', 'meta')
+# Medida do resumo -> (modelo, coluna de data, coluna somada) dos lançamentos
+MEDIDAS = {
+    'faturamento': (Faturamento, Faturamento.data, Faturamento.valor),
+    'km_rodado': (LancamentoDiario, LancamentoDiario.data, LancamentoDiario.km_rodado),
+    'litros': (Abastecimento, Abastecimento.data, Abastecimento.litros),
+}
+
+frota_cli = AppGroup('frota', help='Visão da frota (ranking dos motoristas).')
+
+
+class CriterioInvalido(ValueError):
+    """Critério de ordenação desconhecido."""
+
+
+def somente_admin(view):
+    """Rota só para administradores (403 para os demais); use depois de @login_required."""
+    @wraps(view)
+    def decorada(*args, **kwargs):
+        if not current_user.is_authenticated or not current_user.is_admin:
+            abort(403)
+        return view(*args, **kwargs)
+    return decorada
+
+
+# --- Ranking -----------------------------------------------------------------
+
+def _indicadores(faturamento, km_rodado, litros, meta):
+    """R$/km (como no extrato do dashboard), km/l e % da meta; None quando o divisor é zero."""
+    return {
+        'valor_km': faturamento / func.nullif(km_rodado, 0),
+        'consumo': km_rodado * 1.0 / func.nullif(litros, 0),
+        'meta': faturamento * 100.0 / func.nullif(meta, 0),
+    }
+
+
+def _linha(faturamento, km_rodado, litros, meta, valor_km, consumo, atingida):
+    return {
+        'faturamento': round(faturamento or 0.0, 2),
+        'km_rodado': int(km_rodado or 0),
+        'litros': round(litros or 0.0, 2),
+        'meta_esperada': round(meta or 0.0, 2),
+        'valor_km': round(valor_km, 2) if valor_km is not None else None,
+        'consumo': round(consumo, 2) if consumo is not None else None,
+        'meta_atingida': round(atingida, 1) if atingida is not None else None,
+    }
+
+
+def _valores_python(faturamento, km_rodado, litros, meta):
+    # Mesmas contas de _indicadores, para a linha de totais
+    def dividir(a, b):
+        return a / b if b else None
+    return (
+        dividir(faturamento or 0.0, km_rodado),
+        dividir(km_rodado or 0, litros),
+        dividir((faturamento or 0.0) * 100, meta),
+    )
+
+
+def ranking(inicio, fim, criterio='faturamento', pagina=1, por_pagina=POR_PAGINA_PADRAO):
+    """
+    Motoristas ordenados pelo critério nos meses de `inicio` a `fim`
+    (primeiros dias dos meses), do melhor para o pior, com os totais da frota.
+    """
+    if criterio not in CRITERIOS:
+        raise CriterioInvalido(f'Critério desconhecido: {criterio}. Use um de: {", ".join(CRITERIOS)}.')
+    pagina = max(1, pagina)
+    por_pagina = max(1, min(por_pagina, POR_PAGINA_MAXIMO))
+
+    no_periodo = ResumoMensal.mes.between(inicio, fim)
+    somas = (
+        func.sum(ResumoMensal.faturamento).label('faturamento'),
+        func.sum(ResumoMensal.km_rodado).label('km_rodado'),
+        func.sum(ResumoMensal.litros).label('litros'),
+        func.sum(ResumoMensal.meta_esperada).label('meta_esperada'),
+    )
+    por_usuario = select(ResumoMensal.user_id, *somas).where(no_periodo).group_by(ResumoMensal.user_id).subquery()
+    colunas = (por_usuario.c.faturamento, por_usuario.c.km_rodado, por_usuario.c.litros, por_usuario.c.meta_esperada)
+    indicadores = _indicadores(*colunas)
+    ordem = por_usuario.c.faturamento if criterio == 'faturamento' else indicadores[criterio]
+
+    linhas = db.session.query(
+        User.id, User.name, User.email, *colunas,
+        indicadores['valor_km'], indicadores['consumo'], indicadores['meta'],
+    ).join(por_usuario, por_usuario.c.user_id == User.id).order_by(
+        ordem.desc().nulls_last(), User.id
+    ).limit(por_pagina).offset((pagina - 1) * por_pagina).all()
+
+    frota = db.session.query(*somas).filter(no_periodo).one()
+    total = db.session.query(func.count()).select_from(por_usuario).scalar()
+    primeira = (pagina - 1) * por_pagina
+    return {
+        'inicio': inicio.strftime('%Y-%m'),
+        'fim': fim.strftime('%Y-%m'),
+        'criterio': criterio,
+        'pagina': pagina,
+        'por_pagina': por_pagina,
+        'total_motoristas': total,
+        'frota': _linha(*frota, *_valores_python(*frota)),
+        'motoristas': [
+            {'posicao': primeira + i, 'user_id': user_id, 'nome': nome, 'email': email, **_linha(*valores)}
+            for i, (user_id, nome, email, *valores) in enumerate(linhas, start=1)
+        ],
+    }
+
+
+# --- Atualização do resumo ---------------------------------------------------
+
+def _proximo_mes(mes):
+    return fim_do_mes(mes) + timedelta(days=1)
+
+
+def _atualizar_banco(hoje):
+    versoes = defaultdict(list)
+    for parametro in Parametros.query.all():
+        versoes[parametro.user_id].append(parametro)
+    if not versoes:
+        return 0
+    agora = datetime.utcnow()
+    mes_atual = hoje.replace(day=1)
+    resumo = ResumoMensal.__table__
+    conexao_global = db.session.connection(bind_arguments={'mapper': ResumoMensal})
+
+    # Meses fechados ainda não copiados: a partir do último copiado de cada usuário
+    copiados = dict(conexao_global.execute(
+        select(resumo.c.user_id, func.max(resumo.c.mes)).where(resumo.c.fechado == True).group_by(resumo.c.user_id)
+    ).all())
+    desde = min((copiados.get(user_id) or date.min for user_id in versoes), default=date.min)
+    fechados = [
+        {'user_id': f.user_id, 'mes': f.mes, 'faturamento': f.faturamento, 'km_rodado': f.km_rodado,
+         'litros': f.litros, 'meta_esperada': f.meta_esperada, 'fechado': True, 'atualizado_em': agora}
+        for f in FechamentoMensal.query.filter(FechamentoMensal.mes > desde)
+        if f.user_id in versoes and f.mes > (copiados.get(f.user_id) or date.min)
+    ]
+
+    # Meses abertos: do mês seguinte ao último fechado (ou do primeiro parâmetro) até o atual
+    ultimos = dict(db.session.query(FechamentoMensal.user_id, func.max(FechamentoMensal.mes)).group_by(FechamentoMensal.user_id))
+    primeiro_aberto = {
+        user_id: _proximo_mes(ultimos[user_id]) if user_id in ultimos else min(p.start_date for p in lista).replace(day=1)
+        for user_id, lista in versoes.items()
+    }
+    abertos = {}
+    for user_id, mes in primeiro_aberto.items():
+        while mes <= mes_atual:
+            meta = calendario.meta_do_periodo(versoes[user_id], mes, min(fim_do_mes(mes), hoje))
+            abertos[user_id, mes] = {
+                'user_id': user_id, 'mes': mes, 'faturamento': 0.0, 'km_rodado': 0, 'litros': 0.0,
+                'meta_esperada': meta, 'fechado': False, 'atualizado_em': agora,
+            }
+            mes = _proximo_mes(mes)
+    inicio = min(primeiro_aberto.values())
+    for medida, (modelo, coluna_data, coluna_valor) in MEDIDAS.items():
+        linhas = db.session.query(modelo.user_id, coluna_data, func.sum(coluna_valor)).filter(
+            coluna_data.between(inicio, hoje)
+        ).group_by(modelo.user_id, coluna_data)
+        for user_id, dia, total in linhas:
+            linha = abertos.get((user_id, dia.replace(day=1)))
+            if linha is not None:
+                linha[medida] += total or 0
+
+    usuarios = list(versoes)
+    conexao_global.execute(resumo.delete().where(resumo.c.fechado == False, resumo.c.user_id.in_(usuarios)))
+    novas = fechados + list(abertos.values())
+    if novas:
+        conexao_global.execute(resumo.insert(), novas)
+    db.session.commit()
+    return len(novas)
+
+
+def atualizar(hoje=None):
+    """Atualiza resumo_mensal com os motoristas de todos os bancos; devolve as linhas gravadas."""
+    hoje = hoje or date.today()
+    return sum(_atualizar_banco(hoje) for _ in shards.em_cada_banco())
+
+
+@frota_cli.command('atualizar')
+def atualizar_command():
+    """Recalcula o resumo mensal usado pela visão da frota."""
+    inicio = time.perf_counter()
+    linhas = atualizar()
+    click.echo(f'{linhas} linhas de resumo gravadas em {time.perf_counter() - inicio:.2f}s.')
+
+
+@frota_cli.command('admin')
+@click.argument('email')
+@click.option('--remover', is_flag=True, help='Tira o acesso em vez de dar.')
+def admin_command(email, remover):
+    """Dá (ou tira) de EMAIL o acesso à visão da frota."""
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'Usuário {email} não encontrado.')
+    user.is_admin = not remover
+    db.session.commit()
+    click.echo(f'{email}: {"sem" if remover else "com"} acesso à frota.')
+
+
+def init_app(app):
+    app.cli.add_command(frota_cli)
@@ -0,0 +1,73 @@
+"""
+Lançamento diário (um por usuário e dia) criado ou atualizado numa instrução só.
+
+Com a restrição única (user_id, data), o dia é gravado com
+INSERT ... ON CONFLICT DO UPDATE ... RETURNING id: quem chega primeiro cria a
+linha, quem chega depois soma os km na mesma linha, e os dois recebem o id sem
+consultar antes nem tentar de novo. Como a escrita não passa pelo ORM, os
+lançamentos desses dias já carregados na sessão têm o km relido do banco.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from . import db
+from .fechamento import conferir_aberto
+from .models import LancamentoDiario
+
+
+def registrar_dias(user_id, km_por_data):
+    """{data: km a somar} -> {data: id do lançamento}, criando os dias que faltam."""
+    if not km_por_data:
+        return {}
+    # O upsert não passa pelo flush, onde os meses fechados são protegidos
+    conferir_aberto(user_id, min(km_por_data))
+    tabela = LancamentoDiario.__table__
+    linhas = [{'user_id': user_id, 'data': data, 'km_rodado': km or 0} for data, km in km_por_data.items()]
+    conexao = db.session.connection()
+    dialeto = conexao.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialeto == 'sqlite' else postgresql).insert
+        stmt = insert(tabela).values(linhas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['user_id', 'data'],
+            set_={'km_rodado': func.coalesce(tabela.c.km_rodado, 0) + stmt.excluded.km_rodado}
+        ).returning(tabela.c.data, tabela.c.id)
+        ids = dict(conexao.execute(stmt).all())
+    else:
+        ids = {linha['data']: _somar_ou_inserir(conexao, tabela, linha) for linha in linhas}
+    _expirar_km(ids.values())
+    return ids
+
+
+def _somar_ou_inserir(conexao, tabela, linha):
+    """Demais bancos: incremento atômico e inserção do que faltar (a restrição única barra duplicatas)."""
+    do_dia = (tabela.c.user_id == linha['user_id']) & (tabela.c.data == linha['data'])
+
+    def somar():
+        conexao.execute(tabela.update().where(do_dia).values(
+            km_rodado=func.coalesce(tabela.c.km_rodado, 0) + linha['km_rodado']
+        ))
+        return conexao.execute(select(tabela.c.id).where(do_dia)).scalar()
+
+    lancamento_id = somar()
+    if lancamento_id is not None:
+        return lancamento_id
+    try:
+        with conexao.begin_nested():
+            return conexao.execute(tabela.insert().values(**linha)).inserted_primary_key[0]
+    except IntegrityError:
+        # Outra transação criou o dia entre o SELECT e o INSERT: os km vão para a linha dela
+        return somar()
+
+
+def _expirar_km(ids):
+    for lancamento_id in ids:
+        obj = db.session.identity_map.get(db.session.identity_key(LancamentoDiario, lancamento_id))
+        if obj is not None:
+            db.session.expire(obj, ['km_rodado'])
+
+
+def registrar_dia(user_id, data, km_adicional=0):
+    """Id do lançamento do dia, somando `km_adicional` ao km rodado."""
+    return registrar_dias(user_id, {data: km_adicional})[data]
@@ -0,0 +1,71 @@
+"""
+Limite de tentativas de login e cadastro por IP e por e-mail.
+
+Cada chave tem um balde de fichas (token bucket): começa cheio com
+`rajada` fichas, cada tentativa gasta uma e elas voltam à razão de
+`por_minuto`. Sem ficha, a tentativa é recusada com 429 antes de qualquer
+hash de senha, então uma rajada de credential stuffing custa uma consulta a
+um dicionário, não um scrypt. O limite de IP segura quem testa muitas
+contas; o de e-mail, quem testa muitas senhas na mesma conta a partir de
+vários IPs.
+
+Os baldes ficam em memória, por worker, limitados por LRU. Atrás de proxy,
+configure PROXIES_CONFIAVEIS para o IP do cliente vir do X-Forwarded-For.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+
+class Limitador:
+    """Baldes de fichas por chave, com no máximo `max_chaves` em memória."""
+
+    def __init__(self, rajada, por_minuto, max_chaves=10000):
+        self.rajada = rajada
+        self.por_segundo = por_minuto / 60
+        self.max_chaves = max_chaves
+        self._baldes = OrderedDict()
+        self._trava = threading.Lock()
+
+    def gastar(self, chave):
+        """Gasta uma ficha da chave; devolve 0 se pode seguir ou os segundos até a próxima ficha."""
+        agora = time.monotonic()
+        with self._trava:
+            fichas, ultimo = self._baldes.pop(chave, (self.rajada, agora))
+            fichas = min(self.rajada, fichas + (agora - ultimo) * self.por_segundo)
+            if fichas >= 1:
+                self._guardar(chave, fichas - 1, agora)
+                return 0
+            self._guardar(chave, fichas, agora)
+            return math.ceil((1 - fichas) / self.por_segundo) if self.por_segundo else 3600
+
+    def _guardar(self, chave, fichas, agora):
+        self._baldes[chave] = (fichas, agora)
+        if len(self._baldes) > self.max_chaves:
+            # O menos usado recentemente sai; na pior hipótese ele volta com o balde cheio
+            self._baldes.popitem(last=False)
+
+
+def tentativa(email):
+    """Registra uma tentativa do cliente atual; 0 se pode seguir ou segundos de espera."""
+    limitadores = current_app.extensions['limites']
+    espera = limitadores['ip'].gastar(request.remote_addr)
+    if espera:
+        return espera
+    if email:
+        return limitadores['email'].gastar(email.strip().lower())
+    return 0
+
+
+def init_app(app):
+    max_chaves = app.config['LIMITE_MAX_CHAVES']
+    app.extensions['limites'] = {
+        'ip': Limitador(app.config['LIMITE_IP_RAJADA'], app.config['LIMITE_IP_POR_MINUTO'], max_chaves),
+        'email': Limitador(app.config['LIMITE_EMAIL_RAJADA'], app.config['LIMITE_EMAIL_POR_MINUTO'], max_chaves),
+    }
+    if app.config['PROXIES_CONFIAVEIS']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXIES_CONFIAVEIS'])
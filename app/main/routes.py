@@ -1,20 +1,34 @@
-from flask import render_template, flash, redirect, url_for, request, session, jsonify, abort, current_app
+from flask import render_template, flash, redirect, url_for, request, session, jsonify, abort, current_app, stream_with_context
 from flask_login import login_user, logout_user, current_user, login_required
 from . import bp
-from app import db, oauth
+from app import db, oauth, razao, metas, calendario, previsao, alertas, exclusao, limites, fechamento
 from app.models import (
     User, Parametros, Custo, RegistroCusto,
     CategoriaCusto, CustoVariavel, LancamentoDiario,
     Faturamento, Abastecimento, TipoCombustivel,
     Receita, RegistroReceita
 )
+from app.sync import aplicar_lote, LoteInvalido, MAX_ENTRADAS_POR_LOTE
+from app.lancamentos import registrar_dia
+from app.oidc import identidade
+from app.replicas import somente_leitura
+from app.series import serie_financeira, PONTOS_PADRAO, DATA_MINIMA, DATA_MAXIMA
+from app.detalhamento import detalhar, DetalhamentoInvalido, TOP_PADRAO
+from app.busca import buscar
+from app.autocompletar import sugerir, CAMPOS as CAMPOS_AUTOCOMPLETAR
+from app.exportacao import exportar
+from app.assets import versao as versao_assets
+from app.frota import ranking, somente_admin, CriterioInvalido, CRITERIOS as CRITERIOS_FROTA, POR_PAGINA_PADRAO
 
 from .forms import LoginForm, RegistrationForm, CustoForm, RegistroCustoForm, ReceitaForm
 from urllib.parse import urlsplit
 from datetime import datetime, timedelta, date
-from sqlalchemy import extract, func
+from sqlalchemy import extract, func, tuple_
+from sqlalchemy.orm import joinedload
+from sqlalchemy.exc import IntegrityError
 from calendar import monthrange
 import locale
+import os
 import calendar
 
 # Configura o locale para Português do Brasil
@@ -22,18 +36,32 @@ locale.setlocale(locale.LC_TIME, 'pt_BR.UTF-8')
 
 # --- ROTAS DE AUTENTICAÇÃO ---
 
+def _tentativa_recusada(template, form):
+    """Resposta 429 se o IP ou o e-mail estourou o limite de tentativas (antes de qualquer hash)."""
+    espera = limites.tentativa(request.form.get('email'))
+    if not espera:
+        return None
+    flash(f'Muitas tentativas. Tente novamente em {espera} segundos.', 'danger')
+    return render_template(template, form=form), 429, {'Retry-After': str(espera)}
+
 @bp.route("/login", methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
         return redirect(url_for('main.index'))
     
     form = LoginForm()
+    if request.method == 'POST':
+        recusada = _tentativa_recusada('login.html', form)
+        if recusada:
+            return recusada
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         if user is None or not user.check_password(form.password.data):
             flash('E-mail ou senha inválidos.', 'danger')
             return redirect(url_for('main.login'))
-        
+        if db.session.is_modified(user):
+            db.session.commit()
+
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         return redirect(next_page or url_for('main.index'))
@@ -46,6 +74,10 @@ def register():
         return redirect(url_for('main.index'))
     
     form = RegistrationForm()
+    if request.method == 'POST':
+        recusada = _tentativa_recusada('register.html', form)
+        if recusada:
+            return recusada
     if form.validate_on_submit():
         user = User(email=form.email.data)
         user.set_password(form.password.data)
@@ -65,10 +97,14 @@ def login_google():
 
 @bp.route("/authorize")
 def authorize():
+    # Identidade direto do ID token validado (assinatura, emissor, audiência e nonce): sem chamar o userinfo
     token = oauth.google.authorize_access_token()
-    user_info = oauth.google.get('https://www.googleapis.com/oauth2/v2/userinfo').json()
-    
-    google_id = str(user_info['id'])
+    user_info = identidade(token)
+    if user_info is None:
+        flash('Não foi possível confirmar sua conta Google.', 'danger')
+        return redirect(url_for('main.login'))
+
+    google_id = user_info['id']
     email = user_info['email']
 
     user = User.query.filter_by(email=email).first()
@@ -113,15 +149,11 @@ def index():
         data_str = request.form.get('data')
         data_obj = datetime.strptime(data_str, '%Y-%m-%d').date()
 
-        lancamento_diario = LancamentoDiario.query.filter_by(data=data_obj, user_id=current_user.id).first()
-        if not lancamento_diario:
-            lancamento_diario = LancamentoDiario(data=data_obj, km_rodado=0, user_id=current_user.id)
-            db.session.add(lancamento_diario)
-            db.session.flush() 
+        # Cria o dia ou soma os km numa instrução só, sem ler antes (app/lancamentos.py)
+        km_adicional = int(request.form.get('kmRodado') or 0) if form_type == 'desempenho' else 0
+        lancamento_id = registrar_dia(current_user.id, data_obj, km_adicional)
 
         if form_type == 'desempenho':
-            km_adicional = int(request.form.get('kmRodado') or 0)
-            lancamento_diario.km_rodado += km_adicional
             # (Sua lógica de faturamento que já funciona, permanece aqui)
             valores = request.form.getlist('faturamentoValor')
             tipos = request.form.getlist('faturamentoTipo')
@@ -138,7 +170,7 @@ def index():
                 else: fonte_final = 'Dinheiro'
                 db.session.add(Faturamento(
                     valor=float(valor_str), tipo=tipos[i], fonte=fonte_final,
-                    data=data_obj, user_id=current_user.id, lancamento_id=lancamento_diario.id
+                    data=data_obj, user_id=current_user.id, lancamento_id=lancamento_id
                 ))
             flash(f'Dados de desempenho salvos com sucesso!', 'success')
 
@@ -159,7 +191,7 @@ def index():
                     else: fonte_final = 'Dinheiro'
                     db.session.add(Faturamento(
                         valor=float(valor_str), tipo=tipos_fat[i], fonte=fonte_final,
-                        data=data_obj, user_id=current_user.id, lancamento_id=lancamento_diario.id
+                        data=data_obj, user_id=current_user.id, lancamento_id=lancamento_id
                     ))
 
             # CORREÇÃO: Implementa a lógica para salvar custos variáveis
@@ -199,7 +231,7 @@ def index():
                         data=data_obj,
                         user_id=current_user.id,
                         categoria_id=categoria_id_final,
-                        lancamento_id=lancamento_diario.id
+                        lancamento_id=lancamento_id
                     )
                     db.session.add(novo_custo_variavel)
 
@@ -217,6 +249,47 @@ def index():
     return render_template('index.html', parametro=parametro_hoje, categorias=categorias, hoje=hoje)
 
 
+@bp.route('/api/lancamentos/sync', methods=['POST'])
+@login_required
+def sync_lancamentos():
+    """
+    Recebe em lote os lançamentos capturados offline (ver static/js/fila-offline.js).
+    JSON: {"entradas": [{"chave", "data", "km_rodado", "faturamentos": [...], "custos": [...]}]}
+    Resposta: {"aplicadas": [chaves], "duplicadas": [chaves], "recusadas": [{"chave", "erro"}]}
+    """
+    if not get_parametros_for_date(current_user, date.today()):
+        return jsonify(erro='Cadastre os parâmetros do veículo primeiro.'), 409
+
+    dados = request.get_json(silent=True) or {}
+    entradas = dados.get('entradas')
+    if not isinstance(entradas, list) or not entradas:
+        return jsonify(erro='Nenhuma entrada informada.'), 400
+    if len(entradas) > MAX_ENTRADAS_POR_LOTE:
+        return jsonify(erro=f'Envie no máximo {MAX_ENTRADAS_POR_LOTE} entradas por lote.'), 413
+
+    try:
+        resultado = aplicar_lote(current_user.id, entradas)
+    except LoteInvalido as e:
+        db.session.rollback()
+        return jsonify(erro=str(e)), 400
+    except IntegrityError:
+        # Outro envio com as mesmas chaves foi gravado ao mesmo tempo; o reenvio será deduplicado
+        db.session.rollback()
+        return jsonify(erro='Lote em processamento, tente novamente.'), 409
+    return jsonify(resultado)
+
+
+@bp.route('/sw.js')
+def service_worker():
+    # Servido na raiz para que o escopo do service worker cubra todo o app, com o nome
+    # do cache amarrado à versão do build dos assets
+    with open(os.path.join(current_app.static_folder, 'js', 'sw.js'), encoding='utf-8') as f:
+        codigo = f.read().replace('__VERSAO_ASSETS__', versao_assets())
+    response = current_app.response_class(codigo, mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @bp.route('/custos', methods=['GET', 'POST'])
 @login_required
 def custos():
@@ -241,10 +314,9 @@ def custos():
 @bp.route("/custos/delete/<int:custo_id>", methods=['GET'])
 @login_required
 def delete_custo(custo_id):
-    custo = Custo.query.get_or_404(custo_id)
-    # Adicionar verificação de permissão se necessário
-    db.session.delete(custo)
-    db.session.commit()
+    # Exclusão em massa, restrita às definições do próprio usuário (app/exclusao.py)
+    if not exclusao.excluir_custo(current_user.id, custo_id):
+        abort(404)
     flash('Custo excluído com sucesso.', 'success')
     return redirect(url_for('main.custos'))
 
@@ -252,9 +324,8 @@ def delete_custo(custo_id):
 @bp.route('/custos/delete_definicao/<int:custo_id>', methods=['POST'])
 @login_required
 def delete_definicao_custo(custo_id):
-    custo = Custo.query.get_or_404(custo_id)
-    db.session.delete(custo)
-    db.session.commit()
+    if not exclusao.excluir_custo(current_user.id, custo_id):
+        abort(404)
     flash('Definição de custo excluída!', 'success')
     return redirect(url_for('main.cadastro'))
 
@@ -367,34 +438,258 @@ def abastecimento():
 
     tipos_combustivel = TipoCombustivel.query.order_by(TipoCombustivel.nome).all()
     hoje = date.today().strftime('%Y-%m-%d')
-    historico_crescente = current_user.abastecimentos.order_by(Abastecimento.data.asc(), Abastecimento.km_atual.asc()).all()
-    
-    for i in range(len(historico_crescente)):
-        abastecimento_atual = historico_crescente[i]
-        abastecimento_atual.media_desde_anterior = None
-        if i > 0 and abastecimento_atual.tanque_cheio:
-            km_rodados_total = 0
-            litros_consumidos_total = 0
-            for j in range(i, 0, -1):
-                abastecimento_periodo = historico_crescente[j]
-                abastecimento_anterior_periodo = historico_crescente[j-1]
-                km_rodados_total += abastecimento_periodo.km_atual - abastecimento_anterior_periodo.km_atual
-                litros_consumidos_total += abastecimento_periodo.litros
-                if historico_crescente[j-1].tanque_cheio:
-                    break
-            
-            if litros_consumidos_total > 0 and km_rodados_total > 0:
-                abastecimento_atual.media_desde_anterior = km_rodados_total / litros_consumidos_total
+    grupos, proximo_cursor = _pagina_historico_abastecimento(current_user.id)
 
-    historico_final = list(reversed(historico_crescente))
-    
     return render_template('abastecimento.html', 
         parametro=parametro_hoje, 
         tipos_combustivel=tipos_combustivel, 
         hoje=hoje, 
-        historico=historico_final
+        grupos=grupos,
+        proximo_cursor=proximo_cursor
     )
-    
+
+
+@bp.route("/abastecimento/historico", methods=['GET'])
+@login_required
+@somente_leitura
+def historico_abastecimento():
+    """Próxima página do histórico de abastecimentos ("carregar mais")."""
+    try:
+        cursor = _parse_cursor_abastecimento(request.args.get('cursor', ''))
+    except ValueError:
+        return jsonify(erro='Cursor inválido.'), 400
+
+    grupos, proximo_cursor = _pagina_historico_abastecimento(current_user.id, cursor)
+    return jsonify(
+        html=render_template('_historico_abastecimento.html', grupos=grupos),
+        proximo_cursor=proximo_cursor
+    )
+
+
+HISTORICO_ABASTECIMENTO_POR_PAGINA = 30
+
+
+def _chave_abastecimento():
+    return tuple_(Abastecimento.data, Abastecimento.km_atual, Abastecimento.id)
+
+
+def _cursor_abastecimento(abastecimento):
+    return f'{abastecimento.data.isoformat()}_{abastecimento.km_atual}_{abastecimento.id}'
+
+
+def _parse_cursor_abastecimento(cursor):
+    data_str, km_atual, abastecimento_id = cursor.split('_')
+    return datetime.strptime(data_str, '%Y-%m-%d').date(), int(km_atual), int(abastecimento_id)
+
+
+def _pagina_historico_abastecimento(user_id, cursor=None, limite=HISTORICO_ABASTECIMENTO_POR_PAGINA):
+    """
+    Uma página do histórico, do mais recente para o mais antigo, paginada por
+    (data, km_atual, id). Retorna os grupos por dia e o cursor da próxima página.
+    """
+    chave = _chave_abastecimento()
+    do_usuario = Abastecimento.query.filter(Abastecimento.user_id == user_id)
+
+    query = do_usuario.options(joinedload(Abastecimento.tipo_combustivel))
+    if cursor:
+        query = query.filter(chave < tuple_(*cursor))
+    pagina = query.order_by(
+        Abastecimento.data.desc(), Abastecimento.km_atual.desc(), Abastecimento.id.desc()
+    ).limit(limite + 1).all()
+    tem_mais = len(pagina) > limite
+    pagina = pagina[:limite]
+    if not pagina:
+        return [], None
+
+    # Média do trecho: km desde o último tanque cheio / litros abastecidos desde então.
+    # Só é preciso conhecer a âncora (último tanque cheio antes da página, ou o primeiro
+    # abastecimento) e a soma dos litros entre ela e a página.
+    mais_antigo = pagina[-1]
+    anteriores = do_usuario.filter(chave < tuple_(mais_antigo.data, mais_antigo.km_atual, mais_antigo.id))
+    ancora = anteriores.filter(Abastecimento.tanque_cheio == True).order_by(
+        Abastecimento.data.desc(), Abastecimento.km_atual.desc(), Abastecimento.id.desc()
+    ).first() or anteriores.order_by(
+        Abastecimento.data.asc(), Abastecimento.km_atual.asc(), Abastecimento.id.asc()
+    ).first()
+
+    km_ancora = None
+    litros_desde_ancora = 0.0
+    if ancora:
+        km_ancora = ancora.km_atual
+        litros_desde_ancora = db.session.query(func.sum(Abastecimento.litros)).filter(
+            Abastecimento.user_id == user_id,
+            chave > tuple_(ancora.data, ancora.km_atual, ancora.id),
+            chave < tuple_(mais_antigo.data, mais_antigo.km_atual, mais_antigo.id)
+        ).scalar() or 0.0
+
+    for abastecimento_atual in reversed(pagina):
+        abastecimento_atual.media_desde_anterior = None
+        if km_ancora is None:
+            # Primeiro abastecimento do histórico: vira a âncora
+            km_ancora = abastecimento_atual.km_atual
+            continue
+        litros_desde_ancora += abastecimento_atual.litros
+        if abastecimento_atual.tanque_cheio:
+            km_rodados_total = abastecimento_atual.km_atual - km_ancora
+            if litros_desde_ancora > 0 and km_rodados_total > 0:
+                abastecimento_atual.media_desde_anterior = km_rodados_total / litros_desde_ancora
+            km_ancora = abastecimento_atual.km_atual
+            litros_desde_ancora = 0.0
+
+    grupos = []
+    for abastecimento_atual in pagina:
+        if not grupos or grupos[-1]['data'] != abastecimento_atual.data:
+            grupos.append({'data': abastecimento_atual.data, 'itens': []})
+        grupos[-1]['itens'].append(abastecimento_atual)
+
+    return grupos, (_cursor_abastecimento(mais_antigo) if tem_mais else None)
+
+
+# --- API DE LISTAGEM DE LANÇAMENTOS (paginada por cursor) ---
+
+LISTAGEM_POR_PAGINA = 50
+LISTAGEM_MAX_POR_PAGINA = 200
+
+
+def _parse_data_param(nome):
+    valor = request.args.get(nome)
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else None
+
+
+def _pagina_lancamentos(modelo, query):
+    """
+    Aplica filtro de período, cursor (data, id) e limite a uma consulta de
+    Faturamento/CustoVariavel, sempre do mais recente para o mais antigo.
+    Retorna (itens, proximo_cursor) ou levanta ValueError para parâmetros inválidos.
+    """
+    inicio, fim = _parse_data_param('inicio'), _parse_data_param('fim')
+    limite = request.args.get('limite', LISTAGEM_POR_PAGINA, type=int)
+    if limite < 1:
+        raise ValueError('limite')
+    limite = min(limite, LISTAGEM_MAX_POR_PAGINA)
+
+    if inicio:
+        query = query.filter(modelo.data >= inicio)
+    if fim:
+        query = query.filter(modelo.data <= fim)
+    cursor = request.args.get('cursor')
+    if cursor:
+        data_str, item_id = cursor.split('_')
+        data_cursor = datetime.strptime(data_str, '%Y-%m-%d').date()
+        query = query.filter(tuple_(modelo.data, modelo.id) < tuple_(data_cursor, int(item_id)))
+
+    itens = query.order_by(modelo.data.desc(), modelo.id.desc()).limit(limite + 1).all()
+    proximo_cursor = None
+    if len(itens) > limite:
+        itens = itens[:limite]
+        proximo_cursor = f'{itens[-1].data.isoformat()}_{itens[-1].id}'
+    return itens, proximo_cursor
+
+
+@bp.route('/api/faturamentos', methods=['GET'])
+@login_required
+@somente_leitura
+def listar_faturamentos():
+    """
+    Faturamentos do usuário, do mais recente para o mais antigo.
+    Filtros: inicio, fim (AAAA-MM-DD), tipo, fonte; paginação: cursor, limite.
+    """
+    query = Faturamento.query.filter(Faturamento.user_id == current_user.id)
+    if request.args.get('tipo'):
+        query = query.filter(Faturamento.tipo == request.args['tipo'])
+    if request.args.get('fonte'):
+        query = query.filter(Faturamento.fonte == request.args['fonte'])
+    try:
+        itens, proximo_cursor = _pagina_lancamentos(Faturamento, query)
+    except ValueError:
+        return jsonify(erro='Parâmetros de filtro ou cursor inválidos.'), 400
+
+    return jsonify(
+        itens=[{
+            'id': f.id, 'data': f.data.isoformat(), 'valor': f.valor, 'tipo': f.tipo,
+            'fonte': f.fonte, 'lancamento_id': f.lancamento_id
+        } for f in itens],
+        proximo_cursor=proximo_cursor
+    )
+
+
+@bp.route('/api/custos_variaveis', methods=['GET'])
+@login_required
+@somente_leitura
+def listar_custos_variaveis():
+    """
+    Custos variáveis do usuário, do mais recente para o mais antigo.
+    Filtros: inicio, fim (AAAA-MM-DD), categoria_id; paginação: cursor, limite.
+    """
+    query = CustoVariavel.query.filter(CustoVariavel.user_id == current_user.id)
+    if request.args.get('categoria_id'):
+        categoria_id = request.args.get('categoria_id', type=int)
+        if categoria_id is None:
+            return jsonify(erro='Categoria inválida.'), 400
+        query = query.filter(CustoVariavel.categoria_id == categoria_id)
+    try:
+        itens, proximo_cursor = _pagina_lancamentos(
+            CustoVariavel, query.options(joinedload(CustoVariavel.categoria))
+        )
+    except ValueError:
+        return jsonify(erro='Parâmetros de filtro ou cursor inválidos.'), 400
+
+    return jsonify(
+        itens=[{
+            'id': c.id, 'data': c.data.isoformat(), 'valor': c.valor, 'descricao': c.descricao,
+            'categoria_id': c.categoria_id, 'categoria': c.categoria.nome, 'lancamento_id': c.lancamento_id
+        } for c in itens],
+        proximo_cursor=proximo_cursor
+    )
+
+
+@bp.route('/api/busca', methods=['GET'])
+@login_required
+@somente_leitura
+def busca():
+    """
+    Busca nas descrições de custos variáveis e nas observações de custos e receitas.
+    Parâmetros: q (termos), inicio, fim (AAAA-MM-DD), limite.
+    """
+    try:
+        inicio, fim = _parse_data_param('inicio'), _parse_data_param('fim')
+    except ValueError:
+        return jsonify(erro='Datas no formato AAAA-MM-DD.'), 400
+
+    resultados = buscar(
+        current_user.id, request.args.get('q', ''), inicio, fim,
+        limite=request.args.get('limite', 20, type=int)
+    )
+    for resultado in resultados:
+        resultado['data'] = resultado['data'] and resultado['data'].isoformat()
+    return jsonify(resultados=resultados)
+
+
+@bp.route('/api/autocompletar', methods=['GET'])
+@login_required
+def autocompletar():
+    """Sugestões de fonte (campo=fonte) ou descrição de custo (campo=descricao) pelo prefixo q."""
+    campo = request.args.get('campo')
+    if campo not in CAMPOS_AUTOCOMPLETAR:
+        return jsonify(erro='Campo inválido.'), 400
+    sugestoes = sugerir(current_user.id, campo, request.args.get('q', ''), request.args.get('limite', 8, type=int))
+    response = jsonify(sugestoes=sugestoes)
+    response.headers['Cache-Control'] = 'private, max-age=30'
+    return response
+
+
+@bp.route('/api/alertas_vencimento', methods=['GET'])
+@login_required
+def alertas_vencimento():
+    """Contas fixas em aberto dentro da janela de alerta (alerta_dias) do custo, vencidas inclusive."""
+    return jsonify(alertas=[{
+        'registro_custo_id': a.registro_custo_id,
+        'custo_id': a.custo_id,
+        'nome': a.nome,
+        'valor': a.valor,
+        'data_vencimento': a.data_vencimento.isoformat(),
+        'dias_para_vencer': a.dias_para_vencer,
+    } for a in alertas.do_usuario(current_user.id)])
 
 
 @bp.route('/dashboard', methods=['GET', 'POST'])
@@ -413,9 +708,13 @@ def dashboard():
         flash('Por favor, configure seus parâmetros na página de cadastro primeiro.', 'warning')
         return redirect(url_for('main.cadastro'))
 
+    # Mês fechado (app/fechamento.py): os registros dele não mudam mais, nada a sincronizar
+    fechado = fechamento.fechado_ate(current_user.id)
+    mes_fechado = fechado is not None and end_date_month <= fechado
+
     # --- 2. SINCRONIZAÇÃO DE CUSTOS (Lógica robusta mantida) ---
     try:
-        definicoes_custos_ativos = Custo.query.filter_by(user_id=current_user.id, is_active=True).all()
+        definicoes_custos_ativos = [] if mes_fechado else Custo.query.filter_by(user_id=current_user.id, is_active=True).all()
         for definicao in definicoes_custos_ativos:
             day_vencimento_correto = min(definicao.dia_vencimento, end_date_month.day)
             data_vencimento_correta = date(year, month, day_vencimento_correto)
@@ -451,7 +750,7 @@ def dashboard():
 
     # --- 2.5 SINCRONIZAÇÃO DE RECEITAS ---
     try:
-        definicoes_receitas_ativas = Receita.query.filter_by(user_id=current_user.id, is_active=True).all()
+        definicoes_receitas_ativas = [] if mes_fechado else Receita.query.filter_by(user_id=current_user.id, is_active=True).all()
         for definicao in definicoes_receitas_ativas:
             day_recebimento_correto = min(definicao.dia_recebimento, end_date_month.day)
             data_recebimento_correta = date(year, month, day_recebimento_correto)
@@ -486,56 +785,55 @@ def dashboard():
         flash(f'Ocorreu um erro ao sincronizar as receitas: {e}', 'danger')
 
     # --- 3. CÁLCULOS FINANCEIROS DO MÊS (LÓGICA CORRIGIDA) ---
-    faturamento_bruto_real_mes = db.session.query(func.sum(Faturamento.valor)).filter(Faturamento.user_id == current_user.id, Faturamento.data.between(start_date_month, end_date_month)).scalar() or 0.0
-    abastecimentos_mes = db.session.query(func.sum(Abastecimento.valor_total)).filter(Abastecimento.user_id == current_user.id, Abastecimento.data.between(start_date_month, end_date_month)).scalar() or 0.0
-    custos_variaveis_mes = db.session.query(func.sum(CustoVariavel.valor)).filter(CustoVariavel.user_id == current_user.id, CustoVariavel.data.between(start_date_month, end_date_month)).scalar() or 0.0
-    
+    totais = _totais_mes(current_user.id, start_date_month, end_date_month)
+    faturamento_bruto_real_mes = totais['faturamento_bruto_real_mes']
+    abastecimentos_mes = totais['abastecimentos_mes']
+    custos_variaveis_mes = totais['custos_variaveis_mes']
+    custos_fixos_total_mes = totais['custos_fixos_total_mes']
+    saldo_atual_real = totais['saldo_atual_real']
+
     registros_custos_mes = RegistroCusto.query.join(Custo).filter(RegistroCusto.user_id == current_user.id, Custo.is_active == True, RegistroCusto.data_vencimento.between(start_date_month, end_date_month)).all()
-    custos_fixos_pagos_mes = sum(rc.valor for rc in registros_custos_mes if rc.pago)
-    custos_fixos_total_mes = sum(rc.valor for rc in registros_custos_mes)
-    
     registros_receitas_mes = RegistroReceita.query.join(Receita).filter(RegistroReceita.user_id == current_user.id, Receita.is_active == True, RegistroReceita.data_recebimento_esperada.between(start_date_month, end_date_month)).all()
-    receitas_fixas_recebidas_mes = sum(rr.valor for rr in registros_receitas_mes if rr.recebido)
-    
-    # Adiciona as receitas recorrentes recebidas no faturamento bruto
-    faturamento_bruto_real_mes += receitas_fixas_recebidas_mes
-
-    # CORREÇÃO DO SALDO ATUAL: Garante que todos os custos (variáveis, abastecimento e fixos pagos) sejam debitados.
-    saldo_atual_real = faturamento_bruto_real_mes - custos_variaveis_mes - abastecimentos_mes - custos_fixos_pagos_mes
 
     # --- 4. CÁLCULO DE METAS E PROJEÇÕES (LÓGICA CORRIGIDA) ---
-    meta_mensal_configurada = 0
-    if (parametro.dias_trabalho_semana or 0) > 0:
-        if parametro.periodicidade_meta == 'diaria': meta_mensal_configurada = (parametro.meta_faturamento or 0) * (parametro.dias_trabalho_semana * 4)
-        elif parametro.periodicidade_meta == 'semanal': meta_mensal_configurada = (parametro.meta_faturamento or 0) * 4
-        else: meta_mensal_configurada = parametro.meta_faturamento or 0
+    # Soma das metas dos dias de trabalho do mês, pelas versões de parâmetros em vigor em cada dia
+    # (a gravada no fechamento, se o mês já fechou)
+    fechamento_mes = fechamento.do_mes(current_user.id, start_date_month) if mes_fechado else None
+    meta_mensal_configurada = fechamento_mes.meta_esperada if fechamento_mes else \
+        calendario.meta_esperada(current_user.id, start_date_month, end_date_month)
     
-    # CORREÇÃO DA PROJEÇÃO DE LUCRO: Lógica ajustada para metas líquidas e brutas.
-    if parametro.tipo_meta == 'liquida':
-        # Se a meta é LÍQUIDA, a projeção de lucro é a própria meta.
-        projecao_lucro_operacional = meta_mensal_configurada
-    else: # Se a meta é 'bruta'
-        # Se a meta é BRUTA, subtraímos todos os custos do mês (fixos, variáveis e combustível).
-        projecao_lucro_operacional = meta_mensal_configurada - custos_variaveis_mes - abastecimentos_mes - custos_fixos_total_mes
-
-    # --- 5. CÁLCULO DE METAS DO DIA (Sem alteração) ---
+    # Projeção pelo desempenho real: perfil por dia da semana das últimas semanas (app/previsao.py)
+    # mais as receitas e custos recorrentes do mês, que já são conhecidos
+    projecao = previsao.com_fixos(
+        previsao.prever_mes(current_user.id, start_date_month, end_date_month, today),
+        sum(r.valor or 0.0 for r in registros_receitas_mes), custos_fixos_total_mes
+    )
+    projecao_lucro_operacional = projecao['lucro']
+
+    # --- 5. CÁLCULO DE METAS DO DIA (razão de metas: saldo acumulado do mês) ---
+    linha_hoje = metas.linha_do_dia(current_user.id, today)
+    linha_ontem = metas.linha_do_dia(current_user.id, today - timedelta(days=1))
     param_hoje = get_parametros_for_date(current_user, today) or parametro
-    param_ontem = get_parametros_for_date(current_user, today - timedelta(days=1)) or param_hoje
-    meta_diaria_base = (param_hoje.meta_faturamento / param_hoje.dias_trabalho_semana) if param_hoje and param_hoje.periodicidade_meta == 'semanal' and (param_hoje.dias_trabalho_semana or 0) > 0 else (param_hoje.meta_faturamento if param_hoje else 0)
-    meta_diaria_ontem = (param_ontem.meta_faturamento / param_ontem.dias_trabalho_semana) if param_ontem and param_ontem.periodicidade_meta == 'semanal' and (param_ontem.dias_trabalho_semana or 0) > 0 else (param_ontem.meta_faturamento if param_ontem else 0)
-    faturamento_ontem = db.session.query(func.sum(Faturamento.valor)).filter(Faturamento.user_id == current_user.id, Faturamento.data == (today - timedelta(days=1))).scalar() or 0
-    faturamento_hoje = db.session.query(func.sum(Faturamento.valor)).filter(Faturamento.user_id == current_user.id, Faturamento.data == today).scalar() or 0
-    saldo_dia_anterior = faturamento_ontem - meta_diaria_ontem
-    meta_ajustada_para_hoje = meta_diaria_base - saldo_dia_anterior
+    meta_diaria_base = linha_hoje.meta if linha_hoje else metas.meta_do_dia(param_hoje, today)
+    faturamento_hoje = linha_hoje.realizado if linha_hoje else 0
+    # O que faltou (ou sobrou) nos dias anteriores do mês entra na meta de hoje
+    saldo_meta_mes_anterior = linha_ontem.saldo_mes if linha_ontem and linha_ontem.data.month == today.month else 0
+    meta_ajustada_para_hoje = meta_diaria_base - saldo_meta_mes_anterior
     meta_restante_hoje = meta_ajustada_para_hoje - faturamento_hoje
+    saldo_meta_mes = linha_hoje.saldo_mes if linha_hoje else 0
 
     # --- 6. EXTRATO DIÁRIO (Lógica de cores revisada) ---
     extrato_diario = current_user.lancamentos_diarios.filter(LancamentoDiario.data.between(start_date_month, end_date_month)).order_by(LancamentoDiario.data.desc()).all()
+    metas_do_mes = metas.linhas_do_periodo(current_user.id, start_date_month, min(end_date_month, today))
+    # Faturamento de cada dia pelo razão: os lançamentos de meses arquivados não estão mais nas tabelas
+    faturamento_por_dia = razao.diarios(current_user.id, 'faturamento', start_date_month, end_date_month)
 
     for dia in extrato_diario:
         param_dia = get_parametros_for_date(current_user, dia.data)
-        meta_do_dia = (param_dia.meta_faturamento / param_dia.dias_trabalho_semana) if param_dia and param_dia.periodicidade_meta == 'semanal' and (param_dia.dias_trabalho_semana or 0) > 0 else (param_dia.meta_faturamento if param_dia else 0)
-        valor_km = (dia.faturamento_total / dia.km_rodado) if dia.km_rodado > 0 else 0
+        linha_meta = metas_do_mes.get(dia.data)
+        meta_do_dia = linha_meta.meta if linha_meta else metas.meta_do_dia(param_dia, dia.data)
+        faturamento_dia = faturamento_por_dia.get(dia.data, 0.0)
+        valor_km = (faturamento_dia / dia.km_rodado) if dia.km_rodado > 0 else 0
         
         cor_km = 'danger' 
         if param_dia and param_dia.valor_km_meta and valor_km >= param_dia.valor_km_meta:
@@ -543,7 +841,7 @@ def dashboard():
         elif param_dia and param_dia.valor_km_minimo and valor_km >= param_dia.valor_km_minimo:
             cor_km = 'warning'
         
-        dia.faturamento_realizado = dia.faturamento_total
+        dia.faturamento_realizado = faturamento_dia
         dia.meta_esperada = meta_do_dia
         dia.valor_km = valor_km
         dia.cor_km = cor_km
@@ -553,12 +851,14 @@ def dashboard():
         'dashboard.html', title='Dashboard Financeiro', parametro=parametro,
         meta_restante_hoje=meta_restante_hoje, meta_hoje_atingida=(meta_restante_hoje <= 0),
         meta_ajustada_para_hoje=meta_ajustada_para_hoje, meta_diaria_base=meta_diaria_base,
+        saldo_meta_mes=saldo_meta_mes,
         faturamento_bruto_real_mes=faturamento_bruto_real_mes, saldo_atual_real=saldo_atual_real,
         meta_mensal_bruta=meta_mensal_configurada, projecao_lucro_operacional=projecao_lucro_operacional,
+        projecao=projecao, alertas_vencimento=alertas.do_usuario(current_user.id),
         extrato_diario=extrato_diario, registros_custos=registros_custos_mes,
         registros_receitas=registros_receitas_mes,
         custos_fixos_total=custos_fixos_total_mes, current_month=month,
-        current_year=year, form=CustoForm(), receita_form=ReceitaForm()
+        current_year=year, today=today, form=CustoForm(), receita_form=ReceitaForm()
     )
 
 
@@ -677,10 +977,14 @@ def cadastro():
             # (Sua lógica existente para salvar parâmetros do veículo, que já funciona, está aqui)
             def to_float(val_str): return float(val_str.replace(',', '.').strip() or 0.0) if val_str else 0.0
             def to_int(val_str): return int(val_str.strip() or 0) if val_str else 0
+            # Dias marcados, 0 = segunda ... 6 = domingo; nenhum marcado vale como todos
+            dias_marcados = set(request.form.getlist('dias_trabalho')) & set('0123456')
+            dias_trabalho = ''.join(sorted(dias_marcados)) or '0123456'
             form_data = {
                 'modelo_carro': request.form.get('modelo_carro', '').strip(),
                 'placa_carro': request.form.get('placa_carro', '').strip(),
-                'dias_trabalho_semana': to_int(request.form.get('dias_trabalho_semana')),
+                'dias_trabalho': dias_trabalho,
+                'dias_trabalho_semana': len(dias_trabalho),
                 'meta_faturamento': to_float(request.form.get('meta_faturamento')),
                 'valor_km_minimo': to_float(request.form.get('valor_km_minimo')),
                 'valor_km_meta': to_float(request.form.get('valor_km_meta')),
@@ -696,6 +1000,8 @@ def cadastro():
             else:
                 for key, form_value in form_data.items():
                     db_value = getattr(parametro_ativo, key)
+                    if key == 'dias_trabalho':
+                        db_value = ''.join(str(d) for d in sorted(parametro_ativo.dias_da_semana))
                     if isinstance(form_value, (int, float)):
                         if float(db_value or 0.0) != float(form_value): is_changed = True; break
                     else: 
@@ -779,6 +1085,17 @@ def toggle_pago(registro_id):
     registro.data_pagamento = date.today() if registro.pago else None
     db.session.commit()
 
+    if _wants_json():
+        # Só este registro mudou: devolve o delta dos KPIs do mês em vez de reconstruir o dashboard
+        valor = registro.valor if registro.custo.is_active else 0.0
+        sinal = 1 if registro.pago else -1
+        return jsonify(
+            id=registro.id,
+            pago=registro.pago,
+            data_pagamento=registro.data_pagamento.isoformat() if registro.data_pagamento else None,
+            kpis_delta={'faturamento_bruto_real_mes': 0.0, 'saldo_atual_real': -sinal * valor}
+        )
+
     status = "pago" if registro.pago else "pendente"
     flash(f'Custo "{registro.custo.nome}" marcado como {status}.', 'success')
     
@@ -798,6 +1115,16 @@ def toggle_recebido(registro_id):
     registro.data_recebimento = date.today() if registro.recebido else None
     db.session.commit()
 
+    if _wants_json():
+        valor = registro.valor if registro.receita.is_active else 0.0
+        sinal = 1 if registro.recebido else -1
+        return jsonify(
+            id=registro.id,
+            recebido=registro.recebido,
+            data_recebimento=registro.data_recebimento.isoformat() if registro.data_recebimento else None,
+            kpis_delta={'faturamento_bruto_real_mes': sinal * valor, 'saldo_atual_real': sinal * valor}
+        )
+
     status = "recebido" if registro.recebido else "pendente"
     flash(f'Receita "{registro.receita.nome}" marcada como {status}.', 'success')
     
@@ -805,12 +1132,80 @@ def toggle_recebido(registro_id):
     month = registro.data_recebimento_esperada.month
     return redirect(url_for('main.dashboard', year=year, month=month))
 
+# --- BAIXA EM LOTE (PAGO/RECEBIDO) ---
+@bp.route('/registros/baixa_lote', methods=['POST'])
+@login_required
+def baixa_lote():
+    """
+    Marca vários RegistroCusto como pagos e RegistroReceita como recebidos de uma vez.
+    Espera JSON: {"custos": [ids], "receitas": [ids], "data": "AAAA-MM-DD",
+    "metodo_pagamento": "Pix", "year": 2026, "month": 3} e devolve os totais do mês.
+    """
+    dados = request.get_json(silent=True) or {}
+    hoje = date.today()
+    try:
+        custo_ids = {int(i) for i in dados.get('custos') or []}
+        receita_ids = {int(i) for i in dados.get('receitas') or []}
+        data_baixa = datetime.strptime(dados['data'], '%Y-%m-%d').date() if dados.get('data') else hoje
+        year = int(dados.get('year') or hoje.year)
+        month = int(dados.get('month') or hoje.month)
+        _, last_day = calendar.monthrange(year, month)
+        # date() recusa anos que o monthrange aceita (10000): conferido antes de gravar
+        inicio_mes, fim_mes = date(year, month, 1), date(year, month, last_day)
+    except (TypeError, ValueError, calendar.IllegalMonthError):
+        return jsonify(erro='Dados inválidos.'), 400
+    if not custo_ids and not receita_ids:
+        return jsonify(erro='Nenhum registro informado.'), 400
+    metodo_pagamento = (dados.get('metodo_pagamento') or '').strip()[:50] or None
+
+    # Posse conferida com uma única consulta IN por tabela, que traz também o vencimento mais antigo
+    if custo_ids:
+        proprios, primeiro = db.session.query(func.count(RegistroCusto.id), func.min(RegistroCusto.data_vencimento)).filter(
+            RegistroCusto.id.in_(custo_ids), RegistroCusto.user_id == current_user.id
+        ).one()
+        if proprios != len(custo_ids):
+            abort(403)
+        # O UPDATE em lote não passa pelo flush, onde os meses fechados são protegidos
+        fechamento.conferir_aberto(current_user.id, primeiro)
+    if receita_ids:
+        proprios, primeiro = db.session.query(
+            func.count(RegistroReceita.id), func.min(RegistroReceita.data_recebimento_esperada)
+        ).filter(
+            RegistroReceita.id.in_(receita_ids), RegistroReceita.user_id == current_user.id
+        ).one()
+        if proprios != len(receita_ids):
+            abort(403)
+        fechamento.conferir_aberto(current_user.id, primeiro)
+
+    # Um UPDATE ... WHERE id IN por tabela, na mesma transação; os já baixados mantêm data e método
+    if custo_ids:
+        RegistroCusto.query.filter(
+            RegistroCusto.id.in_(custo_ids), RegistroCusto.user_id == current_user.id, RegistroCusto.pago == False
+        ).update({
+            RegistroCusto.pago: True,
+            RegistroCusto.data_pagamento: data_baixa,
+            RegistroCusto.metodo_pagamento: metodo_pagamento,
+        }, synchronize_session=False)
+        # O UPDATE em lote não passa pelo flush: os alertas dos registros pagos saem aqui
+        alertas.reavaliar(db.session.connection(), sorted(custo_ids))
+    if receita_ids:
+        RegistroReceita.query.filter(
+            RegistroReceita.id.in_(receita_ids), RegistroReceita.user_id == current_user.id,
+            RegistroReceita.recebido == False
+        ).update({
+            RegistroReceita.recebido: True,
+            RegistroReceita.data_recebimento: data_baixa,
+        }, synchronize_session=False)
+    db.session.commit()
+
+    totais = _totais_mes(current_user.id, inicio_mes, fim_mes)
+    return jsonify(custos=sorted(custo_ids), receitas=sorted(receita_ids), totais=totais)
+
 @bp.route('/receita/delete_definicao/<int:receita_id>', methods=['POST'])
 @login_required
 def delete_definicao_receita(receita_id):
-    receita = Receita.query.get_or_404(receita_id)
-    db.session.delete(receita)
-    db.session.commit()
+    if not exclusao.excluir_receita(current_user.id, receita_id):
+        abort(404)
     flash('Definição de receita excluída!', 'success')
     return redirect(url_for('main.cadastro'))
 
@@ -851,6 +1246,38 @@ def toggle_receita_active(receita_id):
 
 
 # --- FUNÇÃO AUXILIAR ---
+def _wants_json():
+    """True para chamadas fetch/XHR que pedem JSON em vez do redirect com flash."""
+    return request.accept_mimetypes.accept_json and not request.accept_mimetypes.accept_html
+
+
+def _totais_mes(user_id, start_date, end_date):
+    """
+    KPIs financeiros do período: lançamentos pelo razão em memória, registros
+    fixos no banco; dias de meses fechados pelos totais do fechamento.
+    """
+    faturamento = razao.soma(user_id, 'faturamento', start_date, end_date)
+    abastecimentos = razao.soma(user_id, 'abastecimento', start_date, end_date)
+    custos_variaveis = razao.soma(user_id, 'custos_variaveis', start_date, end_date)
+
+    fixos = fechamento.fixos(user_id, start_date, end_date)
+    custos_fixos_pagos = fixos['custos_fixos_pagos']
+    receitas_fixas_recebidas = fixos['receitas_fixas_recebidas']
+
+    # As receitas recorrentes recebidas entram no faturamento bruto
+    faturamento_bruto = faturamento + receitas_fixas_recebidas
+    return {
+        'faturamento_bruto_real_mes': faturamento_bruto,
+        'abastecimentos_mes': abastecimentos,
+        'custos_variaveis_mes': custos_variaveis,
+        'custos_fixos_total_mes': fixos['custos_fixos_total'],
+        'custos_fixos_pagos_mes': custos_fixos_pagos,
+        'receitas_fixas_recebidas_mes': receitas_fixas_recebidas,
+        # Saldo real: debita variáveis, abastecimento e fixos pagos
+        'saldo_atual_real': faturamento_bruto - custos_variaveis - abastecimentos - custos_fixos_pagos,
+    }
+
+
 def get_safe_day(year, month, day):
     """Retorna o último dia do mês se o dia for inválido."""
     _, last_day = calendar.monthrange(year, month)
@@ -891,8 +1318,8 @@ def get_parametros_for_date(user, target_date):
 
 @bp.route('/relatorios', methods=['GET'])
 @login_required
+@somente_leitura
 def relatorios():
-    import json
     from datetime import date, timedelta
     
     periodo = request.args.get('periodo', 'mes_atual')
@@ -926,99 +1353,24 @@ def relatorios():
     parametro = get_parametros_for_date(current_user, min(end_date, hoje))
 
     # --- SQL Queries ---
-    faturamentos = Faturamento.query.filter(
-        Faturamento.user_id == current_user.id,
-        Faturamento.data.between(start_date, end_date)
-    ).all()
-    faturamento_total = sum(f.valor for f in faturamentos)
-    
-    abastecimentos = Abastecimento.query.filter(
-        Abastecimento.user_id == current_user.id,
-        Abastecimento.data.between(start_date, end_date)
-    ).all()
-    abastecimento_total = sum(a.valor_total for a in abastecimentos)
-    
-    custos_var = CustoVariavel.query.filter(
-        CustoVariavel.user_id == current_user.id,
-        CustoVariavel.data.between(start_date, end_date)
-    ).all()
-    custo_var_total = sum(c.valor for c in custos_var)
-    
-    registros_custos = RegistroCusto.query.join(Custo).filter(
-        RegistroCusto.user_id == current_user.id,
-        Custo.is_active == True,
-        RegistroCusto.data_vencimento.between(start_date, end_date)
-    ).all()
-    custo_fixo_total = sum(rc.valor for rc in registros_custos if rc.pago)
-    
+    faturamento_total = razao.soma(current_user.id, 'faturamento', start_date, end_date)
+    abastecimento_total = razao.soma(current_user.id, 'abastecimento', start_date, end_date)
+    custo_var_total = razao.soma(current_user.id, 'custos_variaveis', start_date, end_date)
+
+    # Custos fixos pagos de definições ativas (dos meses fechados, pelo fechamento)
+    custo_fixo_total = fechamento.fixos(current_user.id, start_date, end_date)['custos_fixos_pagos']
+
     custo_total = abastecimento_total + custo_var_total + custo_fixo_total
     lucro_liquido = faturamento_total - custo_total
-    
-    delta_days = (end_date - start_date).days
-    
-    labels = []
-    faturamento_diario = []
-    custos_diarios = []
-    lucro_diario = []
-    
-    if delta_days <= 60:
-        for i in range(delta_days + 1):
-            dia_atual = start_date + timedelta(days=i)
-            labels.append(dia_atual.strftime('%d/%m'))
-            
-            fat_dia = sum(f.valor for f in faturamentos if f.data == dia_atual)
-            abast_dia = sum(a.valor_total for a in abastecimentos if a.data == dia_atual)
-            cv_dia = sum(c.valor for c in custos_var if c.data == dia_atual)
-            cf_dia = sum(rc.valor for rc in registros_custos if rc.data_vencimento == dia_atual and rc.pago)
-            
-            custo_dia = abast_dia + cv_dia + cf_dia
-            
-            faturamento_diario.append(round(fat_dia, 2))
-            custos_diarios.append(round(custo_dia, 2))
-            lucro_diario.append(round(fat_dia - custo_dia, 2))
-    else:
-        dict_agrupado = {}
-        for d in range(delta_days + 1):
-            dia_atual = start_date + timedelta(days=d)
-            k = dia_atual.strftime('%m/%Y')
-            if k not in dict_agrupado:
-                dict_agrupado[k] = {'fat': 0, 'custo': 0}
-        
-        for f in faturamentos: 
-            k = f.data.strftime('%m/%Y')
-            if k in dict_agrupado: dict_agrupado[k]['fat'] += f.valor
-        for a in abastecimentos: 
-            k = a.data.strftime('%m/%Y')
-            if k in dict_agrupado: dict_agrupado[k]['custo'] += a.valor_total
-        for c in custos_var: 
-            k = c.data.strftime('%m/%Y')
-            if k in dict_agrupado: dict_agrupado[k]['custo'] += c.valor
-        for rc in registros_custos: 
-            if rc.pago: 
-                k = rc.data_vencimento.strftime('%m/%Y')
-                if k in dict_agrupado: dict_agrupado[k]['custo'] += rc.valor
-            
-        for k, vals in dict_agrupado.items():
-            labels.append(k)
-            faturamento_diario.append(round(vals['fat'], 2))
-            custos_diarios.append(round(vals['custo'], 2))
-            lucro_diario.append(round(vals['fat'] - vals['custo'], 2))
-            
-    meta_esperada = 0
-    if parametro and parametro.meta_faturamento:
-        if parametro.periodicidade_meta == 'diaria':
-            dias_uteis = min(delta_days + 1, parametro.dias_trabalho_semana * 4) # fallback aproximado
-            meta_esperada = parametro.meta_faturamento * dias_uteis
-        elif parametro.periodicidade_meta == 'semanal':
-            semanas = (delta_days + 1) / 7.0
-            meta_esperada = parametro.meta_faturamento * semanas
-        else:
-            meses = (delta_days + 1) / 30.0
-            meta_esperada = parametro.meta_faturamento * meses
+
+    # O gráfico de evolução busca a série em /relatorios/series (ver static/js/relatorios.js)
+
+    # Meta dos dias de trabalho do período, versão a versão dos parâmetros
+    meta_esperada = calendario.meta_esperada(current_user.id, start_date, end_date)
 
     meta_atingida_perc = 0
     if meta_esperada > 0:
-        if parametro.tipo_meta == 'liquida':
+        if parametro and parametro.tipo_meta == 'liquida':
             meta_atingida_perc = (lucro_liquido / meta_esperada) * 100
         else:
             meta_atingida_perc = (faturamento_total / meta_esperada) * 100
@@ -1035,9 +1387,120 @@ def relatorios():
         custo_total=custo_total,
         lucro_liquido=lucro_liquido,
         meta_esperada=meta_esperada,
-        meta_atingida_perc=meta_atingida_perc,
-        labels=json.dumps(labels),
-        faturamento_diario=json.dumps(faturamento_diario),
-        custos_diarios=json.dumps(custos_diarios),
-        lucro_diario=json.dumps(lucro_diario)
+        meta_atingida_perc=meta_atingida_perc
+    )
+
+
+@bp.route('/relatorios/series', methods=['GET'])
+@login_required
+@somente_leitura
+def relatorios_series():
+    """
+    Série faturamento/custos/lucro reamostrada para o gráfico de evolução.
+    Parâmetros: inicio, fim (AAAA-MM-DD) e pontos (máximo de períodos).
+    """
+    try:
+        inicio = datetime.strptime(request.args.get('inicio', ''), '%Y-%m-%d').date()
+        fim = datetime.strptime(request.args.get('fim', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify(erro='Informe inicio e fim no formato AAAA-MM-DD.'), 400
+    if fim < inicio:
+        return jsonify(erro='O fim do período deve ser posterior ao início.'), 400
+    if inicio < DATA_MINIMA or fim > DATA_MAXIMA:
+        return jsonify(erro=f'Use datas entre {DATA_MINIMA:%d/%m/%Y} e {DATA_MAXIMA:%d/%m/%Y}.'), 400
+
+    pontos = request.args.get('pontos', PONTOS_PADRAO, type=int)
+    return jsonify(serie_financeira(current_user.id, inicio, fim, pontos))
+
+
+@bp.route('/relatorios/detalhamento', methods=['GET'])
+@login_required
+@somente_leitura
+def relatorios_detalhamento():
+    """
+    Totais do período agrupados por dimensão (fonte, tipo, categoria,
+    tipo_combustivel, dia_semana), com top-N e "outros".
+    Parâmetros: dimensao, medida (opcional), inicio, fim, top.
+    """
+    try:
+        inicio = datetime.strptime(request.args.get('inicio', ''), '%Y-%m-%d').date()
+        fim = datetime.strptime(request.args.get('fim', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify(erro='Informe inicio e fim no formato AAAA-MM-DD.'), 400
+    if fim < inicio:
+        return jsonify(erro='O fim do período deve ser posterior ao início.'), 400
+    if inicio < DATA_MINIMA or fim > DATA_MAXIMA:
+        return jsonify(erro=f'Use datas entre {DATA_MINIMA:%d/%m/%Y} e {DATA_MAXIMA:%d/%m/%Y}.'), 400
+
+    try:
+        resultado = detalhar(
+            current_user.id, request.args.get('dimensao', ''), inicio, fim,
+            medida=request.args.get('medida'), top=request.args.get('top', TOP_PADRAO, type=int)
+        )
+    except DetalhamentoInvalido as e:
+        return jsonify(erro=str(e)), 400
+    return jsonify(resultado)
+
+
+def _periodo_da_frota():
+    """Meses inicio/fim (AAAA-MM) da visão da frota; padrão: os últimos 12 meses, com o atual."""
+    hoje = date.today().replace(day=1)
+    padrao_inicio = date(hoje.year - 1, hoje.month, 1) + timedelta(days=31)
+    inicio = datetime.strptime(request.args.get('inicio') or padrao_inicio.strftime('%Y-%m'), '%Y-%m').date()
+    fim = datetime.strptime(request.args.get('fim') or hoje.strftime('%Y-%m'), '%Y-%m').date()
+    return inicio.replace(day=1), fim
+
+
+@bp.route('/api/frota', methods=['GET'])
+@login_required
+@somente_admin
+@somente_leitura
+def api_frota():
+    """
+    Ranking dos motoristas no período, a partir dos resumos mensais (app/frota.py).
+    Parâmetros: inicio, fim (AAAA-MM), criterio (faturamento, valor_km, consumo, meta),
+    pagina e por_pagina.
+    """
+    try:
+        inicio, fim = _periodo_da_frota()
+    except ValueError:
+        return jsonify(erro='Informe inicio e fim no formato AAAA-MM.'), 400
+    if fim < inicio:
+        return jsonify(erro='O fim do período deve ser posterior ao início.'), 400
+    try:
+        resultado = ranking(
+            inicio, fim, request.args.get('criterio', 'faturamento'),
+            pagina=request.args.get('pagina', 1, type=int),
+            por_pagina=request.args.get('por_pagina', POR_PAGINA_PADRAO, type=int)
+        )
+    except CriterioInvalido as e:
+        return jsonify(erro=str(e)), 400
+    return jsonify(resultado)
+
+
+@bp.route('/frota', methods=['GET'])
+@login_required
+@somente_admin
+@somente_leitura
+def frota():
+    try:
+        inicio, fim = _periodo_da_frota()
+    except ValueError:
+        flash('Período inválido: use o formato AAAA-MM.', 'warning')
+        return redirect(url_for('main.frota'))
+    criterio = request.args.get('criterio', 'faturamento')
+    if criterio not in CRITERIOS_FROTA:
+        criterio = 'faturamento'
+    resultado = ranking(min(inicio, fim), max(inicio, fim), criterio, pagina=request.args.get('pagina', 1, type=int))
+    return render_template('frota.html', title='Frota', resultado=resultado, criterios=CRITERIOS_FROTA)
+
+
+@bp.route('/conta/exportar', methods=['GET'])
+@login_required
+def exportar_dados():
+    """Todos os dados do usuário em JSON Lines (app/exportacao.py), enviados à medida que são lidos."""
+    nome = f'meupossante-{date.today().isoformat()}.jsonl'
+    return current_app.response_class(
+        stream_with_context(exportar(current_user.id)), mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{nome}"'}
     )
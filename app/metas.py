@@ -0,0 +1,146 @@
+"""
+Razão diário de metas de cada usuário.
+
+Para cada dia desde o primeiro `Parametros` guarda a meta esperada (pela versão
+de parâmetros em vigor no dia, ver app/calendario.py), o faturamento
+realizado e os saldos acumulados no mês e desde o início. "Quanto estou atrás
+no mês" vira a leitura de uma linha.
+
+As linhas são calculadas sob demanda, do último dia já calculado até a data
+pedida. Qualquer escrita que afete um dia (faturamento ou parâmetros) apaga, na
+mesma transação, as linhas daquele dia em diante; a próxima leitura as refaz.
+"""
+from datetime import timedelta
+
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db, fechamento
+from .calendario import meta_do_dia
+from .models import MetaDiaria, Parametros, Faturamento
+
+
+def _versoes(user_id):
+    """Versões de parâmetros do usuário, da mais recente para a mais antiga."""
+    return Parametros.query.filter_by(user_id=user_id).order_by(Parametros.start_date.desc()).all()
+
+
+def _parametro_em(versoes, dia):
+    # Mesmo critério de get_parametros_for_date, sem uma consulta por dia
+    for versao in versoes:
+        if versao.start_date <= dia and (versao.end_date is None or versao.end_date >= dia):
+            return versao
+    return None
+
+
+def _inserir(linhas):
+    tabela = MetaDiaria.__table__
+    conexao = db.session.connection()
+    dialeto = conexao.dialect.name
+    if dialeto in ('sqlite', 'postgresql'):
+        # Outra requisição pode ter calculado os mesmos dias: o resultado é idêntico
+        insert = (sqlite if dialeto == 'sqlite' else postgresql).insert
+        conexao.execute(insert(tabela).values(linhas).on_conflict_do_nothing(index_elements=['user_id', 'data']))
+    else:
+        conexao.execute(tabela.insert(), linhas)
+
+
+def garantir_ate(user_id, ate):
+    """Calcula e grava as linhas que faltam até `ate` (inclusive)."""
+    ultima = MetaDiaria.query.filter_by(user_id=user_id).order_by(MetaDiaria.data.desc()).first()
+    if ultima and ultima.data >= ate:
+        return
+
+    versoes = _versoes(user_id)
+    if not versoes:
+        return
+    inicio = ultima.data + timedelta(days=1) if ultima else min(v.start_date for v in versoes)
+    if inicio > ate:
+        return
+
+    # Meses fechados pelos totais do fechamento: os lançamentos podem estar no arquivo
+    realizado = dict(fechamento.por_dia(user_id, 'faturamento', inicio, ate))
+
+    saldo_mes = ultima.saldo_mes if ultima else 0.0
+    saldo_total = ultima.saldo_total if ultima else 0.0
+    linhas = []
+    dia = inicio
+    while dia <= ate:
+        if dia.day == 1:
+            saldo_mes = 0.0
+        meta = meta_do_dia(_parametro_em(versoes, dia), dia)
+        feito = realizado.get(dia) or 0.0
+        saldo_mes += feito - meta
+        saldo_total += feito - meta
+        linhas.append({
+            'user_id': user_id, 'data': dia, 'meta': meta, 'realizado': feito,
+            'saldo_mes': saldo_mes, 'saldo_total': saldo_total,
+        })
+        dia += timedelta(days=1)
+
+    _inserir(linhas)
+    db.session.commit()
+
+
+def linha_do_dia(user_id, dia):
+    """Linha do razão de metas de `dia` (None antes do primeiro parâmetro)."""
+    garantir_ate(user_id, dia)
+    return MetaDiaria.query.filter_by(user_id=user_id, data=dia).first()
+
+
+def linhas_do_periodo(user_id, inicio, fim):
+    """{data: MetaDiaria} entre inicio e fim, numa consulta."""
+    garantir_ate(user_id, fim)
+    return {
+        m.data: m for m in MetaDiaria.query.filter(
+            MetaDiaria.user_id == user_id, MetaDiaria.data.between(inicio, fim)
+        )
+    }
+
+
+def _datas(obj, atributo, somente_alteradas=False):
+    """Valores atuais e anteriores de um atributo de data (só os alterados, se pedido)."""
+    historico = inspect(obj).attrs[atributo].history
+    valores = [*(historico.added or ()), *(historico.deleted or ())]
+    if not somente_alteradas:
+        valores.extend(historico.unchanged or ())
+    return [d for d in valores if d]
+
+
+def _ao_flush(session, flush_context):
+    afetados = {}
+
+    def marcar(user_id, dia):
+        if user_id is not None and dia is not None:
+            afetados[user_id] = min(dia, afetados.get(user_id, dia))
+
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, (Faturamento, Parametros)):
+            continue
+        alterado = obj in session.dirty
+        if alterado and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, Faturamento):
+            for dia in _datas(obj, 'data'):
+                marcar(obj.user_id, dia)
+            continue
+
+        inicio = _datas(obj, 'start_date', somente_alteradas=alterado)
+        # Encerrar uma versão muda o parâmetro em vigor a partir do dia seguinte
+        fim = [d + timedelta(days=1) for d in _datas(obj, 'end_date', somente_alteradas=alterado)]
+        if alterado and not inicio and not fim:
+            # Meta ou dias de trabalho alterados na própria versão: vale desde o início dela
+            inicio = [obj.start_date]
+        for dia in inicio + fim:
+            marcar(obj.user_id, dia)
+
+    if afetados:
+        tabela = MetaDiaria.__table__
+        conexao = session.connection()
+        for user_id, dia in afetados.items():
+            conexao.execute(tabela.delete().where(tabela.c.user_id == user_id, tabela.c.data >= dia))
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _ao_flush):
+        event.listen(db.session, 'after_flush', _ao_flush)
@@ -1,6 +1,6 @@
-from . import db
+from . import db, senhas
+from sqlalchemy import DDL, event
 from datetime import datetime, date
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 
 # --- AUTH MODELS ---
@@ -13,28 +13,49 @@ class User(UserMixin, db.Model):
     name = db.Column(db.String(100), nullable=True)
     profile_pic = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Acesso à visão da frota (ver app/frota.py)
+    is_admin = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())
 
-    parametros = db.relationship('Parametros', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    custos = db.relationship('Custo', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    registros_custo = db.relationship('RegistroCusto', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    receitas = db.relationship('Receita', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    registros_receita = db.relationship('RegistroReceita', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    lancamentos_diarios = db.relationship('LancamentoDiario', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    faturamentos = db.relationship('Faturamento', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    custos_variaveis = db.relationship('CustoVariavel', backref='user', lazy='dynamic', cascade="all, delete-orphan")
-    abastecimentos = db.relationship('Abastecimento', backref='user', lazy='dynamic', cascade="all, delete-orphan")
+    parametros = db.relationship('Parametros', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    custos = db.relationship('Custo', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    registros_custo = db.relationship('RegistroCusto', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    receitas = db.relationship('Receita', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    registros_receita = db.relationship('RegistroReceita', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    lancamentos_diarios = db.relationship('LancamentoDiario', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    faturamentos = db.relationship('Faturamento', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    custos_variaveis = db.relationship('CustoVariavel', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    abastecimentos = db.relationship('Abastecimento', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    sync_entradas = db.relationship('SyncEntrada', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    busca_documentos = db.relationship('BuscaDocumento', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    autocompletar_termos = db.relationship('AutocompletarTermo', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    metas_diarias = db.relationship('MetaDiaria', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    alertas_vencimento = db.relationship('AlertaVencimento', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
+    previsoes = db.relationship('PrevisaoMensal', backref='user', lazy='dynamic', cascade="all, delete-orphan", passive_deletes=True)
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = senhas.gerar_hash(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # Senha certa com hash de parâmetros antigos: já regrava com os atuais (quem chamou faz o commit)
+        if not senhas.conferir(self.password_hash, password):
+            return False
+        if senhas.precisa_refazer(self.password_hash):
+            self.set_password(password)
+        return True
+
+class UsuarioShard(db.Model):
+    """Shard onde ficam os dados do usuário (ver app/shards.py); sem linha, no banco global."""
+    __tablename__ = 'usuario_shard'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    shard = db.Column(db.String(30), nullable=True)
+    movendo = db.Column(db.Boolean, nullable=False, default=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 # --- APP MODELS ---
 class Parametros(db.Model):
     __tablename__ = 'parametros'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     
     start_date = db.Column(db.Date, nullable=False, default=date.today)
     end_date = db.Column(db.Date, nullable=True)
@@ -47,9 +68,19 @@ class Parametros(db.Model):
     periodicidade_meta = db.Column(db.String(20))
     tipo_meta = db.Column(db.String(20))
     dias_trabalho_semana = db.Column(db.Integer)
+    # Dias da semana trabalhados, 0 = segunda ... 6 = domingo (ex.: '012345')
+    dias_trabalho = db.Column(db.String(7))
     valor_km_minimo = db.Column(db.Float, default=0.0)
     valor_km_meta = db.Column(db.Float, default=0.0)
 
+    @property
+    def dias_da_semana(self):
+        """Dias de trabalho configurados; sem configuração, os `dias_trabalho_semana` primeiros a partir de segunda."""
+        if self.dias_trabalho:
+            return frozenset(int(d) for d in self.dias_trabalho)
+        dias = self.dias_trabalho_semana or 0
+        return frozenset(range(dias if 0 < dias < 7 else 7))
+
 class CategoriaCusto(db.Model):
     __tablename__ = 'categoria_custo'
     id = db.Column(db.Integer, primary_key=True)
@@ -59,11 +90,14 @@ class CategoriaCusto(db.Model):
 class LancamentoDiario(db.Model):
     __tablename__ = 'lancamento_diario'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     data = db.Column(db.Date, nullable=False, index=True)
     km_rodado = db.Column(db.Integer, default=0)
+    # Sem passive_deletes: o razão e a busca precisam ver os filhos apagados no flush
     faturamentos = db.relationship('Faturamento', backref='lancamento', lazy='dynamic', cascade="all, delete-orphan")
     custos_variaveis = db.relationship('CustoVariavel', backref='lancamento', lazy='dynamic', cascade="all, delete-orphan")
+    # Um lançamento por usuário e dia: gravado por upsert (ver app/lancamentos.py)
+    __table_args__ = (db.UniqueConstraint('user_id', 'data', name='_lancamento_diario_data_uc'),)
 
     @property
     def faturamento_total(self):
@@ -75,9 +109,11 @@ class LancamentoDiario(db.Model):
 
 class Faturamento(db.Model):
     __tablename__ = 'faturamento'
+    # Listagem por cursor: ordena por (data, id) e filtra tipo/fonte sem ler a tabela
+    __table_args__ = (db.Index('ix_faturamento_user_listagem', 'user_id', 'data', 'id', 'tipo', 'fonte'),)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    lancamento_id = db.Column(db.Integer, db.ForeignKey('lancamento_diario.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    lancamento_id = db.Column(db.Integer, db.ForeignKey('lancamento_diario.id', ondelete='CASCADE'), nullable=True)
     data = db.Column(db.Date, nullable=False, index=True)
     valor = db.Column(db.Float, nullable=False)
     tipo = db.Column(db.String(50), nullable=False)
@@ -85,9 +121,10 @@ class Faturamento(db.Model):
 
 class CustoVariavel(db.Model):
     __tablename__ = 'custo_variavel'
+    __table_args__ = (db.Index('ix_custo_variavel_user_listagem', 'user_id', 'data', 'id', 'categoria_id'),)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    lancamento_id = db.Column(db.Integer, db.ForeignKey('lancamento_diario.id'), nullable=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    lancamento_id = db.Column(db.Integer, db.ForeignKey('lancamento_diario.id', ondelete='CASCADE'), nullable=True)
     categoria_id = db.Column(db.Integer, db.ForeignKey('categoria_custo.id'), nullable=False)
     data = db.Column(db.Date, nullable=False, index=True)
     descricao = db.Column(db.String(200), nullable=False)
@@ -101,8 +138,10 @@ class TipoCombustivel(db.Model):
 
 class Abastecimento(db.Model):
     __tablename__ = 'abastecimento'
+    # Histórico paginado por cursor: (data, km_atual, id) decrescente por usuário
+    __table_args__ = (db.Index('ix_abastecimento_user_historico', 'user_id', 'data', 'km_atual', 'id'),)
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     data = db.Column(db.Date, nullable=False, index=True)
     km_atual = db.Column(db.Integer, nullable=False)
     litros = db.Column(db.Float, nullable=False)
@@ -115,47 +154,280 @@ class Abastecimento(db.Model):
 class Custo(db.Model):
     __tablename__ = 'custo'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     nome = db.Column(db.String(120), nullable=False)
     valor = db.Column(db.Float, nullable=False)
     dia_vencimento = db.Column(db.Integer, nullable=False)
     observacao = db.Column(db.Text, nullable=True)
     alerta_dias = db.Column(db.Integer, default=7)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Sem passive_deletes: alertas e busca precisam ver os registros apagados no flush (em massa: app/exclusao.py)
     registros = db.relationship('RegistroCusto', backref='custo', lazy='dynamic', cascade="all, delete-orphan")
 
 class RegistroCusto(db.Model):
     __tablename__ = 'registro_custo'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    custo_id = db.Column(db.Integer, db.ForeignKey('custo.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    custo_id = db.Column(db.Integer, db.ForeignKey('custo.id', ondelete='CASCADE'), nullable=False, index=True)
     data_vencimento = db.Column(db.Date, nullable=False, index=True)
     valor = db.Column(db.Float, nullable=False)
     pago = db.Column(db.Boolean, default=False, nullable=False)
     data_pagamento = db.Column(db.Date, nullable=True)
     metodo_pagamento = db.Column(db.String(50), nullable=True)
     observacao = db.Column(db.Text, nullable=True)
-    __table_args__ = (db.UniqueConstraint('custo_id', 'data_vencimento', name='_custo_vencimento_uc'),)
+    __table_args__ = (
+        db.UniqueConstraint('custo_id', 'data_vencimento', name='_custo_vencimento_uc'),
+        # Índice parcial só dos registros em aberto, para a varredura de alertas (app/alertas.py)
+        db.Index('ix_registro_custo_em_aberto', 'data_vencimento', 'id',
+                 sqlite_where=db.text('pago = 0'), postgresql_where=db.text('NOT pago')),
+    )
 
 class Receita(db.Model):
     __tablename__ = 'receita'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     nome = db.Column(db.String(120), nullable=False)
     valor = db.Column(db.Float, nullable=False)
     dia_recebimento = db.Column(db.Integer, nullable=False)
     observacao = db.Column(db.Text, nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
+    # Sem passive_deletes: a busca precisa ver os registros apagados no flush (em massa: app/exclusao.py)
     registros = db.relationship('RegistroReceita', backref='receita', lazy='dynamic', cascade="all, delete-orphan")
 
 class RegistroReceita(db.Model):
     __tablename__ = 'registro_receita'
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    receita_id = db.Column(db.Integer, db.ForeignKey('receita.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    receita_id = db.Column(db.Integer, db.ForeignKey('receita.id', ondelete='CASCADE'), nullable=False, index=True)
     data_recebimento_esperada = db.Column(db.Date, nullable=False, index=True)
     valor = db.Column(db.Float, nullable=False)
     recebido = db.Column(db.Boolean, default=False, nullable=False)
     data_recebimento = db.Column(db.Date, nullable=True)
     observacao = db.Column(db.Text, nullable=True)
     __table_args__ = (db.UniqueConstraint('receita_id', 'data_recebimento_esperada', name='_receita_recebimento_uc'),)
+
+class SyncEntrada(db.Model):
+    """Chave de idempotência de cada lançamento recebido pela API de sincronização offline."""
+    __tablename__ = 'sync_entrada'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    chave = db.Column(db.String(64), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    recebido_em = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.UniqueConstraint('user_id', 'chave', name='_sync_entrada_chave_uc'),)
+
+class MetaDiaria(db.Model):
+    """Linha diária do razão de metas (ver app/metas.py): meta, realizado e saldos acumulados."""
+    __tablename__ = 'meta_diaria'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    meta = db.Column(db.Float, nullable=False, default=0.0)
+    realizado = db.Column(db.Float, nullable=False, default=0.0)
+    saldo_mes = db.Column(db.Float, nullable=False, default=0.0)
+    saldo_total = db.Column(db.Float, nullable=False, default=0.0)
+    __table_args__ = (db.UniqueConstraint('user_id', 'data', name='_meta_diaria_data_uc'),)
+
+class AlertaVencimento(db.Model):
+    """Conta em aberto dentro da janela de alerta do custo (ver app/alertas.py)."""
+    __tablename__ = 'alerta_vencimento'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    registro_custo_id = db.Column(db.Integer, db.ForeignKey('registro_custo.id', ondelete='CASCADE'), nullable=False, unique=True)
+    custo_id = db.Column(db.Integer, db.ForeignKey('custo.id', ondelete='CASCADE'), nullable=False, index=True)
+    nome = db.Column(db.String(120), nullable=False)
+    valor = db.Column(db.Float, nullable=False)
+    data_vencimento = db.Column(db.Date, nullable=False)
+    gerado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (db.Index('ix_alerta_vencimento_user', 'user_id', 'data_vencimento'),)
+
+    @property
+    def dias_para_vencer(self):
+        return (self.data_vencimento - date.today()).days
+
+class PrevisaoMensal(db.Model):
+    """Previsão de fim de mês gravada pelo job noturno (ver app/previsao.py), com faixa de confiança."""
+    __tablename__ = 'previsao_mensal'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    data_referencia = db.Column(db.Date, nullable=False)
+    mes = db.Column(db.Date, nullable=False)
+    faturamento = db.Column(db.Float, nullable=False)
+    faturamento_min = db.Column(db.Float, nullable=False)
+    faturamento_max = db.Column(db.Float, nullable=False)
+    lucro = db.Column(db.Float, nullable=False)
+    lucro_min = db.Column(db.Float, nullable=False)
+    lucro_max = db.Column(db.Float, nullable=False)
+    __table_args__ = (db.UniqueConstraint('user_id', 'data_referencia', name='_previsao_mensal_data_uc'),)
+
+class VersaoRazao(db.Model):
+    """Contador das escritas nos lançamentos do usuário: o razão em cache vale enquanto ele não muda (ver app/razao.py)."""
+    __tablename__ = 'versao_razao'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (db.UniqueConstraint('user_id', name='_versao_razao_user_uc'),)
+
+class FechamentoMensal(db.Model):
+    """Totais de um mês fechado (ver app/fechamento.py): gravados uma vez, não mudam depois."""
+    __tablename__ = 'fechamento_mensal'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    mes = db.Column(db.Date, nullable=False)
+    faturamento = db.Column(db.Float, nullable=False, default=0.0)
+    abastecimento = db.Column(db.Float, nullable=False, default=0.0)
+    custos_variaveis = db.Column(db.Float, nullable=False, default=0.0)
+    custos_fixos_total = db.Column(db.Float, nullable=False, default=0.0)
+    custos_fixos_pagos = db.Column(db.Float, nullable=False, default=0.0)
+    receitas_fixas_recebidas = db.Column(db.Float, nullable=False, default=0.0)
+    km_rodado = db.Column(db.Integer, nullable=False, default=0)
+    litros = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    meta_esperada = db.Column(db.Float, nullable=False, default=0.0)
+    fechado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    # Quando os lançamentos do mês foram para as tabelas *_arquivo
+    arquivado_em = db.Column(db.DateTime, nullable=True)
+    __table_args__ = (db.UniqueConstraint('user_id', 'mes', name='_fechamento_mensal_mes_uc'),)
+
+class FechamentoDiario(db.Model):
+    """Totais de cada dia com movimento de um mês fechado; o razão lê os dias fechados daqui."""
+    __tablename__ = 'fechamento_diario'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    faturamento = db.Column(db.Float, nullable=False, default=0.0)
+    abastecimento = db.Column(db.Float, nullable=False, default=0.0)
+    custos_variaveis = db.Column(db.Float, nullable=False, default=0.0)
+    custos_fixos_total = db.Column(db.Float, nullable=False, default=0.0)
+    custos_fixos_pagos = db.Column(db.Float, nullable=False, default=0.0)
+    receitas_fixas_recebidas = db.Column(db.Float, nullable=False, default=0.0)
+    km_rodado = db.Column(db.Integer, nullable=False, default=0)
+    litros = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    __table_args__ = (db.UniqueConstraint('user_id', 'data', name='_fechamento_diario_data_uc'),)
+
+class ResumoMensal(db.Model):
+    """
+    Agregado mensal de cada motorista para a visão da frota (ver app/frota.py).
+    Fica no banco global, com todos os usuários juntos; meses ainda abertos
+    são recalculados pelo job, os fechados vêm do fechamento mensal.
+    """
+    __tablename__ = 'resumo_mensal'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    mes = db.Column(db.Date, nullable=False)
+    faturamento = db.Column(db.Float, nullable=False, default=0.0)
+    km_rodado = db.Column(db.Integer, nullable=False, default=0)
+    litros = db.Column(db.Float, nullable=False, default=0.0)
+    meta_esperada = db.Column(db.Float, nullable=False, default=0.0)
+    fechado = db.Column(db.Boolean, nullable=False, default=False)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'mes', name='_resumo_mensal_mes_uc'),
+        # Ranking de um período: varre os meses do período, todos os usuários
+        db.Index('ix_resumo_mensal_mes', 'mes', 'user_id'),
+    )
+
+# --- ARQUIVO: lançamentos de meses fechados fora das tabelas quentes (ver app/fechamento.py) ---
+# Mesmas colunas das tabelas de origem, ids próprios e só o índice por usuário e data.
+class FaturamentoArquivo(db.Model):
+    __tablename__ = 'faturamento_arquivo'
+    __table_args__ = (db.Index('ix_faturamento_arquivo_user_data', 'user_id', 'data'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    lancamento_id = db.Column(db.Integer, db.ForeignKey('lancamento_diario.id', ondelete='CASCADE'), nullable=True)
+    data = db.Column(db.Date, nullable=False)
+    valor = db.Column(db.Float, nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    fonte = db.Column(db.String(100))
+
+class CustoVariavelArquivo(db.Model):
+    __tablename__ = 'custo_variavel_arquivo'
+    __table_args__ = (db.Index('ix_custo_variavel_arquivo_user_data', 'user_id', 'data'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    lancamento_id = db.Column(db.Integer, db.ForeignKey('lancamento_diario.id', ondelete='CASCADE'), nullable=True)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria_custo.id'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    descricao = db.Column(db.String(200), nullable=False)
+    valor = db.Column(db.Float, nullable=False)
+
+class AbastecimentoArquivo(db.Model):
+    __tablename__ = 'abastecimento_arquivo'
+    __table_args__ = (db.Index('ix_abastecimento_arquivo_user_data', 'user_id', 'data'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    data = db.Column(db.Date, nullable=False)
+    km_atual = db.Column(db.Integer, nullable=False)
+    litros = db.Column(db.Float, nullable=False)
+    valor_litro = db.Column(db.Float)
+    valor_total = db.Column(db.Float, nullable=False)
+    tanque_cheio = db.Column(db.Boolean, default=False)
+    tipo_combustivel_id = db.Column(db.Integer, db.ForeignKey('tipo_combustivel.id'), nullable=True)
+    media_consumo_calculada = db.Column(db.Float, nullable=True)
+
+class RegistroCustoArquivo(db.Model):
+    __tablename__ = 'registro_custo_arquivo'
+    __table_args__ = (db.Index('ix_registro_custo_arquivo_user_data', 'user_id', 'data_vencimento'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    custo_id = db.Column(db.Integer, db.ForeignKey('custo.id', ondelete='CASCADE'), nullable=False, index=True)
+    data_vencimento = db.Column(db.Date, nullable=False)
+    valor = db.Column(db.Float, nullable=False)
+    pago = db.Column(db.Boolean, default=False, nullable=False)
+    data_pagamento = db.Column(db.Date, nullable=True)
+    metodo_pagamento = db.Column(db.String(50), nullable=True)
+    observacao = db.Column(db.Text, nullable=True)
+
+class RegistroReceitaArquivo(db.Model):
+    __tablename__ = 'registro_receita_arquivo'
+    __table_args__ = (db.Index('ix_registro_receita_arquivo_user_data', 'user_id', 'data_recebimento_esperada'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    receita_id = db.Column(db.Integer, db.ForeignKey('receita.id', ondelete='CASCADE'), nullable=False, index=True)
+    data_recebimento_esperada = db.Column(db.Date, nullable=False)
+    valor = db.Column(db.Float, nullable=False)
+    recebido = db.Column(db.Boolean, default=False, nullable=False)
+    data_recebimento = db.Column(db.Date, nullable=True)
+    observacao = db.Column(db.Text, nullable=True)
+
+class AutocompletarTermo(db.Model):
+    """Frequência de uso de cada fonte/descrição digitada pelo usuário (ver app/autocompletar.py)."""
+    __tablename__ = 'autocompletar_termo'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    campo = db.Column(db.String(20), nullable=False)
+    termo = db.Column(db.String(200), nullable=False)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categoria_custo.id'), nullable=True)
+    usos = db.Column(db.Integer, nullable=False, default=0)
+    ultimo_uso = db.Column(db.Date, nullable=False)
+    __table_args__ = (db.UniqueConstraint('user_id', 'campo', 'termo', name='_autocompletar_termo_uc'),)
+
+class BuscaDocumento(db.Model):
+    """
+    Texto pesquisável de um custo/receita (ver app/busca.py). Mantido em sincronia
+    pelos eventos de flush; o índice full-text fica em busca_fts (SQLite) ou num
+    índice GIN sobre to_tsvector (Postgres).
+    """
+    __tablename__ = 'busca_documento'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, index=True)
+    tipo = db.Column(db.String(20), nullable=False)
+    ref_id = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.Date, nullable=True)
+    texto = db.Column(db.Text, nullable=False)
+    __table_args__ = (db.UniqueConstraint('tipo', 'ref_id', name='_busca_documento_ref_uc'),)
+
+# Estruturas full-text específicas de cada banco (as mesmas da migração), criadas junto com a tabela
+for _ddl in (
+    "CREATE VIRTUAL TABLE busca_fts USING fts5(texto, usuario, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER busca_documento_ai AFTER INSERT ON busca_documento BEGIN "
+    "INSERT INTO busca_fts(rowid, texto, usuario) VALUES (new.id, new.texto, 'u' || new.user_id); END",
+    "CREATE TRIGGER busca_documento_ad AFTER DELETE ON busca_documento BEGIN "
+    "DELETE FROM busca_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER busca_documento_au AFTER UPDATE ON busca_documento BEGIN "
+    "UPDATE busca_fts SET texto = new.texto, usuario = 'u' || new.user_id WHERE rowid = old.id; END",
+):
+    event.listen(BuscaDocumento.__table__, 'after_create', DDL(_ddl).execute_if(dialect='sqlite'))
+event.listen(BuscaDocumento.__table__, 'before_drop', DDL('DROP TABLE IF EXISTS busca_fts').execute_if(dialect='sqlite'))
+event.listen(BuscaDocumento.__table__, 'after_create', DDL(
+    "CREATE INDEX ix_busca_documento_vetor ON busca_documento USING gin (to_tsvector('portuguese', texto))"
+).execute_if(dialect='postgresql'))
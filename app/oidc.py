@@ -0,0 +1,172 @@
+"""
+Documento de descoberta e chaves (JWKS) do provedor OpenID Connect em cache.
+
+O Authlib busca a descoberta uma vez por worker e nunca mais a renova, e a
+JWKS só é buscada de novo quando aparece um `kid` desconhecido. Aqui cada
+documento fica em memória pelo tempo que o provedor manda (Cache-Control
+max-age / Expires) e é renovado em segundo plano: perto de expirar, ou já
+expirado, a requisição usa a cópia atual e uma thread faz a busca condicional
+(If-None-Match / If-Modified-Since). Se o provedor estiver lento ou fora do
+ar, o login continua com a última cópia boa.
+
+O login lê a identidade das claims do ID token já validado (assinatura, iss,
+aud, exp e nonce), sem a chamada extra ao endpoint de userinfo.
+"""
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from flask import current_app
+from authlib.integrations.flask_client import FlaskOAuth2App
+
+# Fração da validade a partir da qual a renovação já começa em segundo plano
+RENOVAR_APOS = 0.8
+# Intervalo mínimo entre buscas forçadas da JWKS (kid desconhecido)
+INTERVALO_MINIMO_FORCADO = 60
+# Espera antes de tentar renovar de novo depois de uma falha
+ESPERA_APOS_FALHA = 30
+
+
+def validade_dos_cabecalhos(cabecalhos, padrao):
+    """Segundos de validade segundo Cache-Control (max-age, menos Age) ou Expires."""
+    controle = cabecalhos.get('Cache-Control', '')
+    diretivas = {}
+    for parte in controle.split(','):
+        nome, _, valor = parte.strip().partition('=')
+        if nome:
+            diretivas[nome.lower()] = valor.strip('"')
+    if 'no-store' in diretivas or 'no-cache' in diretivas:
+        return 0
+    if 'max-age' in diretivas:
+        try:
+            return max(0, int(diretivas['max-age']) - int(cabecalhos.get('Age') or 0))
+        except ValueError:
+            return padrao
+    if cabecalhos.get('Expires'):
+        try:
+            expira = parsedate_to_datetime(cabecalhos['Expires'])
+            agora = parsedate_to_datetime(cabecalhos['Date']) if cabecalhos.get('Date') else None
+            return max(0, int(expira.timestamp() - (agora.timestamp() if agora else time.time())))
+        except (TypeError, ValueError):
+            return 0
+    return padrao
+
+
+class DocumentoRemoto:
+    """JSON remoto em cache, renovado em segundo plano."""
+
+    def __init__(self, url, validade_padrao=3600, validade_minima=60, timeout=5):
+        self.url = url
+        self.validade_padrao = validade_padrao
+        self.validade_minima = validade_minima
+        self.timeout = timeout
+        self.valor = None
+        self.obtido_em = 0.0
+        self.validade = 0
+        self._etag = None
+        self._modificado = None
+        self._ultima_forcada = 0.0
+        self._proxima_tentativa = 0.0
+        # Uma trava para a busca (lenta) e outra só para marcar a renovação em andamento
+        self._trava = threading.Lock()
+        self._trava_renovacao = threading.Lock()
+        self._renovando = False
+
+    def obter(self, forcar=False):
+        agora = time.monotonic()
+        if self.valor is None:
+            # Primeira vez: não há o que servir enquanto busca
+            with self._trava:
+                if self.valor is None:
+                    self._buscar()
+            return self.valor
+        if forcar and agora - self._ultima_forcada >= INTERVALO_MINIMO_FORCADO:
+            self._ultima_forcada = agora
+            with self._trava:
+                self._buscar(condicional=False)
+            return self.valor
+        if agora - self.obtido_em >= self.validade * RENOVAR_APOS and agora >= self._proxima_tentativa:
+            self._renovar_em_segundo_plano()
+        return self.valor
+
+    def _buscar(self, condicional=True):
+        cabecalhos = {}
+        if condicional and self._etag:
+            cabecalhos['If-None-Match'] = self._etag
+        if condicional and self._modificado:
+            cabecalhos['If-Modified-Since'] = self._modificado
+        resposta = requests.get(self.url, headers=cabecalhos, timeout=self.timeout)
+        if resposta.status_code != 304:
+            resposta.raise_for_status()
+            self.valor = resposta.json()
+            self._etag = resposta.headers.get('ETag')
+            self._modificado = resposta.headers.get('Last-Modified')
+        self.validade = max(self.validade_minima, validade_dos_cabecalhos(resposta.headers, self.validade_padrao))
+        self.obtido_em = time.monotonic()
+
+    def _renovar(self):
+        try:
+            with self._trava:
+                self._buscar()
+        except (requests.RequestException, ValueError):
+            # Continua com a cópia atual e tenta de novo mais tarde
+            self._proxima_tentativa = time.monotonic() + ESPERA_APOS_FALHA
+        finally:
+            self._renovando = False
+
+    def _renovar_em_segundo_plano(self):
+        with self._trava_renovacao:
+            if self._renovando:
+                return
+            self._renovando = True
+        threading.Thread(target=self._renovar, name=f'oidc-renovar {self.url}', daemon=True).start()
+
+
+_documentos = {}
+_trava_documentos = threading.Lock()
+
+
+def documento(url, **opcoes):
+    """DocumentoRemoto compartilhado do worker para a URL."""
+    with _trava_documentos:
+        if url not in _documentos:
+            _documentos[url] = DocumentoRemoto(url, **opcoes)
+        return _documentos[url]
+
+
+class ClienteOIDC(FlaskOAuth2App):
+    """Cliente OAuth do Authlib com descoberta e JWKS vindos do cache acima."""
+
+    def _opcoes_de_cache(self):
+        return {
+            'validade_padrao': current_app.config['OIDC_CACHE_PADRAO_SEGUNDOS'],
+            'timeout': current_app.config['OIDC_TIMEOUT_SEGUNDOS'],
+        }
+
+    def load_server_metadata(self):
+        if self._server_metadata_url:
+            descoberta = documento(self._server_metadata_url, **self._opcoes_de_cache()).obter()
+            self.server_metadata.update(descoberta)
+        return self.server_metadata
+
+    def fetch_jwk_set(self, force=False):
+        uri = self.load_server_metadata().get('jwks_uri')
+        if not uri:
+            raise RuntimeError('Missing "jwks_uri" in metadata')
+        return documento(uri, **self._opcoes_de_cache()).obter(forcar=force)
+
+
+def identidade(token):
+    """Claims de identidade do ID token validado pelo Authlib em authorize_access_token()."""
+    claims = token.get('userinfo')
+    if not claims or not claims.get('sub') or not claims.get('email'):
+        return None
+    if claims.get('email_verified') is False:
+        return None
+    return {
+        'id': str(claims['sub']),
+        'email': claims['email'],
+        'name': claims.get('name'),
+        'picture': claims.get('picture'),
+    }
@@ -0,0 +1,311 @@
+"""
+Previsão de fim de mês do faturamento e do lucro.
+
+Para cada usuário monta um perfil por dia da semana com o faturamento e os
+custos variáveis (abastecimento + custos do dia a dia) das últimas
+JANELA_SEMANAS semanas: média e variância de cada dia da semana. A previsão é
+o realizado até hoje mais a média de cada dia que falta no mês; a faixa de
+confiança soma as variâncias desses dias.
+
+O perfil é montado a partir do razão em memória (app/razao.py), fica em cache
+por worker enquanto o razão de onde saiu for o do usuário e é atualizado a
+cada commit com os lançamentos novos que caem na janela. O job noturno (`flask previsao projetar`) projeta todos os usuários de
+uma vez, com uma consulta agregada por tipo, e grava em `previsao_mensal`.
+"""
+import math
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+
+from . import db, razao, shards
+from .models import (
+    Faturamento, CustoVariavel, Abastecimento, Parametros, PrevisaoMensal,
+    RegistroCusto, Custo, RegistroReceita, Receita
+)
+
+JANELA_SEMANAS = 8
+# z da faixa de confiança de 80%
+Z_FAIXA = 1.2816
+MAX_USUARIOS_EM_MEMORIA = 256
+
+# Tipos do razão somados como custo variável
+TIPOS_CUSTO = ('abastecimento', 'custos_variaveis')
+
+
+class Perfil:
+    """Faturamento e custos variáveis diários da janela [referencia - N semanas, referencia)."""
+
+    def __init__(self, referencia, inicio_historico=None, razao=None):
+        self.referencia = referencia
+        self.inicio = referencia - timedelta(weeks=JANELA_SEMANAS)
+        # Razão de onde o perfil saiu: outro razão para o usuário quer dizer escritas que o perfil não viu
+        self.razao = razao
+        dias = 7 * JANELA_SEMANAS
+        self.faturamento = array('d', [0.0]) * dias
+        self.custos = array('d', [0.0]) * dias
+        # Dias anteriores ao primeiro faturamento não contam como dias sem trabalho
+        self.primeiro = 0
+        if inicio_historico is not None:
+            self.primeiro = min(dias, max(0, (inicio_historico - self.inicio).days))
+        self._estatisticas = None
+
+    def acrescentar(self, tipo, dia, valor):
+        if not self.inicio <= dia < self.referencia:
+            return
+        i = (dia - self.inicio).days
+        if tipo == 'faturamento':
+            self.faturamento[i] += valor or 0.0
+            self.primeiro = min(self.primeiro, i)
+        else:
+            self.custos[i] += valor or 0.0
+        self._estatisticas = None
+
+    def estatisticas(self):
+        """
+        Por dia da semana (0 = segunda): (média do faturamento, variância do
+        faturamento, média dos custos, variância do lucro do dia).
+        """
+        if self._estatisticas is not None:
+            return self._estatisticas
+        amostras = [[] for _ in range(7)]
+        dia_da_semana = self.inicio.weekday()
+        for i in range(self.primeiro, len(self.faturamento)):
+            amostras[(dia_da_semana + i) % 7].append((self.faturamento[i], self.custos[i]))
+
+        resultado = []
+        for linhas in amostras:
+            n = len(linhas)
+            if not n:
+                resultado.append((0.0, 0.0, 0.0, 0.0))
+                continue
+            media_f = sum(f for f, _ in linhas) / n
+            media_c = sum(c for _, c in linhas) / n
+            media_l = media_f - media_c
+            var_f = sum((f - media_f) ** 2 for f, _ in linhas) / (n - 1) if n > 1 else 0.0
+            var_l = sum((f - c - media_l) ** 2 for f, c in linhas) / (n - 1) if n > 1 else 0.0
+            resultado.append((media_f, var_f, media_c, var_l))
+        self._estatisticas = resultado
+        return resultado
+
+    def projetar(self, inicio, fim, faturamento, custos):
+        """
+        Previsão de inicio a fim (o mês) com a referência como "hoje".
+        `faturamento` e `custos` são {data: total} realizados no mês até hoje.
+        """
+        hoje = self.referencia
+        estatisticas = self.estatisticas()
+        real_f = sum(faturamento.values())
+        real_l = real_f - sum(custos.values())
+        prev_f = prev_l = var_f = var_l = 0.0
+
+        dia = max(inicio, hoje)
+        while dia <= fim:
+            media_f, variancia_f, media_c, variancia_l = estatisticas[dia.weekday()]
+            if dia == hoje:
+                # Hoje já tem lançamentos: só o que falta para chegar na média do dia
+                falta_f = max(0.0, media_f - faturamento.get(dia, 0.0))
+                falta_c = max(0.0, media_c - custos.get(dia, 0.0))
+                if falta_f or falta_c:
+                    prev_f += falta_f
+                    prev_l += falta_f - falta_c
+                    var_f += variancia_f
+                    var_l += variancia_l
+            else:
+                prev_f += media_f
+                prev_l += media_f - media_c
+                var_f += variancia_f
+                var_l += variancia_l
+            dia += timedelta(days=1)
+
+        faixa_f = Z_FAIXA * math.sqrt(var_f)
+        faixa_l = Z_FAIXA * math.sqrt(var_l)
+        return {
+            'faturamento': real_f + prev_f,
+            # O faturamento do mês não fica abaixo do que já entrou
+            'faturamento_min': max(real_f, real_f + prev_f - faixa_f),
+            'faturamento_max': real_f + prev_f + faixa_f,
+            'lucro': real_l + prev_l,
+            'lucro_min': real_l + prev_l - faixa_l,
+            'lucro_max': real_l + prev_l + faixa_l,
+        }
+
+
+def _perfil_do_razao(razao_usuario, referencia):
+    perfil = Perfil(referencia, _inicio_historico(razao_usuario), razao_usuario)
+    for tipo in ('faturamento',) + TIPOS_CUSTO:
+        serie = razao_usuario.series[tipo]
+        for dia, valor in serie.diarios(perfil.inicio, referencia - timedelta(days=1)).items():
+            perfil.acrescentar(tipo, dia, valor)
+    return perfil
+
+
+def _inicio_historico(razao_usuario):
+    serie = razao_usuario.series['faturamento']
+    return date.fromordinal(serie.datas[0]) if len(serie.datas) else None
+
+
+_perfis = OrderedDict()
+_trava = threading.Lock()
+
+
+def perfil_do_usuario(user_id, referencia):
+    """Perfil do usuário com a janela terminando em `referencia` (LRU por worker)."""
+    atual = razao.razao_do_usuario(user_id)
+    with _trava:
+        perfil = _perfis.get(user_id)
+        if perfil is not None and perfil.referencia == referencia and perfil.razao is atual:
+            _perfis.move_to_end(user_id)
+            return perfil
+
+    perfil = _perfil_do_razao(atual, referencia)
+    if razao.pendente(user_id):
+        return perfil
+    with _trava:
+        _perfis[user_id] = perfil
+        _perfis.move_to_end(user_id)
+        while len(_perfis) > MAX_USUARIOS_EM_MEMORIA:
+            _perfis.popitem(last=False)
+    return perfil
+
+
+def prever_mes(user_id, inicio, fim, hoje=None):
+    """Previsão dos lançamentos do dia a dia no mês [inicio, fim], vista de `hoje`."""
+    hoje = hoje or date.today()
+    ate = min(fim, hoje)
+    faturamento = razao.diarios(user_id, 'faturamento', inicio, ate)
+    custos = {}
+    for tipo in TIPOS_CUSTO:
+        for dia, valor in razao.diarios(user_id, tipo, inicio, ate).items():
+            custos[dia] = custos.get(dia, 0.0) + valor
+    return perfil_do_usuario(user_id, hoje).projetar(inicio, fim, faturamento, custos)
+
+
+def _ao_confirmar(novos, invalidados):
+    with _trava:
+        for user_id in invalidados:
+            _perfis.pop(user_id, None)
+        for user_id, tipo, dia, valor in novos:
+            perfil = _perfis.get(user_id)
+            if perfil is not None:
+                perfil.acrescentar('faturamento' if tipo == 'faturamento' else 'custos', dia, valor)
+
+
+# --- Job noturno -----------------------------------------------------------
+
+previsao_cli = AppGroup('previsao', help='Previsão de fim de mês.')
+
+_MODELOS = (
+    ('faturamento', Faturamento, Faturamento.data, Faturamento.valor),
+    ('custos', Abastecimento, Abastecimento.data, Abastecimento.valor_total),
+    ('custos', CustoVariavel, CustoVariavel.data, CustoVariavel.valor),
+)
+
+
+def _por_usuario(coluna_user, total, *filtros):
+    consulta = db.session.query(coluna_user, func.sum(total)).filter(*filtros).group_by(coluna_user)
+    return {user_id: valor or 0.0 for user_id, valor in consulta}
+
+
+def projetar_todos(hoje=None):
+    """Projeta o mês de `hoje` para todos os usuários com parâmetros e grava em previsao_mensal."""
+    hoje = hoje or date.today()
+    inicio_mes = hoje.replace(day=1)
+    fim_mes = (inicio_mes + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    inicio_janela = hoje - timedelta(weeks=JANELA_SEMANAS)
+
+    usuarios = [u for (u,) in db.session.query(Parametros.user_id).distinct()]
+    primeiros = dict(db.session.query(Faturamento.user_id, func.min(Faturamento.data)).group_by(Faturamento.user_id))
+    perfis = {u: Perfil(hoje, primeiros.get(u)) for u in usuarios}
+    realizados = {u: ({}, {}) for u in usuarios}
+
+    # Uma consulta por tipo cobre a janela do perfil e o mês até hoje
+    desde = min(inicio_janela, inicio_mes)
+    for tipo, modelo, coluna_data, coluna_valor in _MODELOS:
+        linhas = db.session.query(modelo.user_id, coluna_data, func.sum(coluna_valor)).filter(
+            coluna_data.between(desde, min(hoje, fim_mes))
+        ).group_by(modelo.user_id, coluna_data)
+        for user_id, dia, total in linhas:
+            if user_id not in perfis:
+                continue
+            perfis[user_id].acrescentar(tipo, dia, total)
+            if dia >= inicio_mes:
+                diarios = realizados[user_id][0 if tipo == 'faturamento' else 1]
+                diarios[dia] = diarios.get(dia, 0.0) + (total or 0.0)
+
+    custos_fixos = _por_usuario(
+        RegistroCusto.user_id, RegistroCusto.valor, RegistroCusto.custo.has(Custo.is_active == True),
+        RegistroCusto.data_vencimento.between(inicio_mes, fim_mes)
+    )
+    receitas_fixas = _por_usuario(
+        RegistroReceita.user_id, RegistroReceita.valor, RegistroReceita.receita.has(Receita.is_active == True),
+        RegistroReceita.data_recebimento_esperada.between(inicio_mes, fim_mes)
+    )
+
+    linhas = []
+    for user_id in usuarios:
+        previsto = com_fixos(
+            perfis[user_id].projetar(inicio_mes, fim_mes, *realizados[user_id]),
+            receitas_fixas.get(user_id, 0.0), custos_fixos.get(user_id, 0.0)
+        )
+        linhas.append({'user_id': user_id, 'data_referencia': hoje, 'mes': inicio_mes, **previsto})
+    if linhas:
+        _gravar(linhas)
+    db.session.commit()
+    return len(linhas)
+
+
+def com_fixos(previsto, receitas_fixas, custos_fixos):
+    """Soma à previsão as receitas e os custos recorrentes do mês, que já são conhecidos."""
+    fixos = receitas_fixas - custos_fixos
+    return {
+        'faturamento': previsto['faturamento'] + receitas_fixas,
+        'faturamento_min': previsto['faturamento_min'] + receitas_fixas,
+        'faturamento_max': previsto['faturamento_max'] + receitas_fixas,
+        'lucro': previsto['lucro'] + fixos,
+        'lucro_min': previsto['lucro_min'] + fixos,
+        'lucro_max': previsto['lucro_max'] + fixos,
+    }
+
+
+def _gravar(linhas):
+    tabela = PrevisaoMensal.__table__
+    conexao = db.session.connection()
+    dialeto = conexao.dialect.name
+    colunas = ('mes', 'faturamento', 'faturamento_min', 'faturamento_max', 'lucro', 'lucro_min', 'lucro_max')
+    if dialeto in ('sqlite', 'postgresql'):
+        insert = (sqlite if dialeto == 'sqlite' else postgresql).insert
+        # Lotes para não passar do limite de parâmetros por comando
+        for i in range(0, len(linhas), 500):
+            stmt = insert(tabela).values(linhas[i:i + 500])
+            conexao.execute(stmt.on_conflict_do_update(
+                index_elements=['user_id', 'data_referencia'],
+                set_={c: stmt.excluded[c] for c in colunas}
+            ))
+        return
+    conexao.execute(tabela.delete().where(
+        tabela.c.data_referencia == linhas[0]['data_referencia'],
+        tabela.c.user_id.in_([linha['user_id'] for linha in linhas])
+    ))
+    conexao.execute(tabela.insert(), linhas)
+
+
+@previsao_cli.command('projetar')
+@click.option('--data', 'data_str', default=None, help='Dia de referência (AAAA-MM-DD); padrão: hoje.')
+def projetar_command(data_str):
+    """Grava a previsão de fim de mês de todos os usuários."""
+    hoje = datetime.strptime(data_str, '%Y-%m-%d').date() if data_str else date.today()
+    inicio = time.perf_counter()
+    total = sum(projetar_todos(hoje) for _ in shards.em_cada_banco())
+    click.echo(f'{total} previsões gravadas para {hoje.isoformat()} em {time.perf_counter() - inicio:.2f}s.')
+
+
+def init_app(app):
+    razao.observar(_ao_confirmar)
+    app.cli.add_command(previsao_cli)
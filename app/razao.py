@@ -0,0 +1,297 @@
+"""
+Cache em memória do "razão" de cada usuário para as contas repetidas dos
+relatórios e do dashboard.
+
+Por usuário e tipo de lançamento (faturamento, custos variáveis, abastecimento)
+guarda os totais diários em arrays compactos: datas como ordinais ordenados e
+valores/somas acumuladas como floats. Um total de período vira dois bisects e
+uma subtração, sem ir ao banco. O cache é por worker, limitado por LRU,
+montado com uma consulta agregada por tipo e estendido a cada commit. Os dias
+de meses fechados vêm dos totais do fechamento (app/fechamento.py), não dos
+lançamentos, que podem já estar no arquivo.
+
+Lançamentos alterados ou removidos invalidam o razão do usuário. Cada
+transação que mexe nos lançamentos de um usuário soma 1 ao contador dele em
+versao_razao, no mesmo banco e na mesma transação. O razão guarda a versão
+com que foi montado e só vale enquanto ela for a do banco, conferida uma vez
+por requisição (uma consulta pela chave; o razão conferido fica em `g` até o
+próximo commit do usuário): escritas de outros workers aparecem na requisição
+seguinte, só para o usuário afetado. Neste worker, um commit que cai enquanto
+o razão é montado (a geração do usuário muda) impede que ele vá para o cache.
+"""
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+
+from flask import current_app, g, has_app_context
+from sqlalchemy import event, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from . import db, fechamento
+from .models import Faturamento, CustoVariavel, Abastecimento, VersaoRazao
+from .replicas import no_primario
+
+# Tipo -> (modelo, coluna de data, coluna de valor)
+TIPOS = {
+    'faturamento': (Faturamento, Faturamento.data, Faturamento.valor),
+    'custos_variaveis': (CustoVariavel, CustoVariavel.data, CustoVariavel.valor),
+    'abastecimento': (Abastecimento, Abastecimento.data, Abastecimento.valor_total),
+}
+_TIPO_DO_MODELO = {modelo: tipo for tipo, (modelo, _, _) in TIPOS.items()}
+
+
+class Serie:
+    """Totais diários de um tipo: datas (ordinais) únicas e crescentes."""
+
+    def __init__(self, linhas=()):
+        self.datas = array('l')
+        self.valores = array('d')
+        for dia, total in linhas:
+            self.datas.append(dia.toordinal())
+            self.valores.append(total or 0.0)
+        self._acumular(0)
+
+    def _acumular(self, inicio):
+        # acumulado[i] = soma de valores[:i]
+        if inicio == 0:
+            self.acumulado = array('d', [0.0])
+        else:
+            del self.acumulado[inicio + 1:]
+        total = self.acumulado[inicio]
+        for valor in self.valores[inicio:]:
+            total += valor
+            self.acumulado.append(total)
+
+    def acrescentar(self, dia, valor):
+        ordinal = dia.toordinal()
+        i = bisect_left(self.datas, ordinal)
+        if i < len(self.datas) and self.datas[i] == ordinal:
+            self.valores[i] += valor
+        else:
+            self.datas.insert(i, ordinal)
+            self.valores.insert(i, valor)
+        # Refaz as somas acumuladas a partir do dia (só o fim, no caso comum de hoje)
+        self._acumular(i)
+
+    def _faixa(self, inicio, fim):
+        return bisect_left(self.datas, inicio.toordinal()), bisect_right(self.datas, fim.toordinal())
+
+    def soma(self, inicio, fim):
+        i, j = self._faixa(inicio, fim)
+        return self.acumulado[j] - self.acumulado[i]
+
+    def somas_por_faixa(self, limites):
+        """Somas entre limites consecutivos [l0, l1), [l1, l2)... (datas)."""
+        posicoes = [bisect_left(self.datas, limite.toordinal()) for limite in limites]
+        return [self.acumulado[b] - self.acumulado[a] for a, b in zip(posicoes, posicoes[1:])]
+
+    def diarios(self, inicio, fim):
+        i, j = self._faixa(inicio, fim)
+        return {date.fromordinal(self.datas[k]): self.valores[k] for k in range(i, j)}
+
+
+class Razao:
+    def __init__(self, user_id, versao):
+        self.versao = versao
+        self.series = {}
+        for tipo in TIPOS:
+            self.series[tipo] = Serie(fechamento.por_dia(user_id, tipo))
+
+
+_razoes = OrderedDict()
+# user_id -> commits deste worker que mexeram nos lançamentos do usuário
+_geracoes = {}
+_trava = threading.Lock()
+# Funções chamadas a cada commit com os lançamentos novos e os usuários invalidados
+_observadores = []
+
+
+def observar(funcao):
+    """Registra funcao(novos, invalidados) para caches derivados do razão."""
+    if funcao not in _observadores:
+        _observadores.append(funcao)
+
+
+def pendente(user_id):
+    """Se a transação atual tem lançamentos do usuário ainda não confirmados."""
+    pendentes = db.session.info.get('razao')
+    return bool(pendentes) and (
+        user_id in pendentes['invalidados'] or any(n[0] == user_id for n in pendentes['novos'])
+    )
+
+
+def versao(conexao, user_id):
+    """Versão atual dos lançamentos do usuário no banco de `conexao` (0 antes da primeira escrita)."""
+    tabela = VersaoRazao.__table__
+    return conexao.execute(select(tabela.c.versao).where(tabela.c.user_id == user_id)).scalar() or 0
+
+
+def _incrementar(conexao, usuarios, inicial=1):
+    """Soma 1 à versão dos usuários na transação de `conexao`; devolve {user_id: versão nova}."""
+    tabela = VersaoRazao.__table__
+    usuarios = sorted(usuarios)
+    conexao.execute(tabela.update().where(tabela.c.user_id.in_(usuarios)).values(versao=tabela.c.versao + 1))
+    versoes = dict(conexao.execute(
+        select(tabela.c.user_id, tabela.c.versao).where(tabela.c.user_id.in_(usuarios))
+    ).all())
+    for user_id in usuarios:
+        if user_id in versoes:
+            continue
+        try:
+            # Primeira escrita do usuário neste banco: outra transação pode estar criando a mesma linha
+            with conexao.begin_nested():
+                conexao.execute(tabela.insert().values(user_id=user_id, versao=inicial))
+            versoes[user_id] = inicial
+        except IntegrityError:
+            conexao.execute(tabela.update().where(tabela.c.user_id == user_id).values(versao=tabela.c.versao + 1))
+            versoes[user_id] = versao(conexao, user_id)
+    return versoes
+
+
+def _conferidos():
+    """{user_id: razão} com a versão já conferida nesta requisição."""
+    if not has_app_context():
+        return {}
+    if 'razoes_conferidos' not in g:
+        g.razoes_conferidos = {}
+    return g.razoes_conferidos
+
+
+def razao_do_usuario(user_id):
+    conferidos = _conferidos()
+    if user_id in conferidos and not pendente(user_id):
+        return conferidos[user_id]
+    razao = _razao_do_usuario(user_id)
+    if not pendente(user_id):
+        conferidos[user_id] = razao
+    return razao
+
+
+def _razao_do_usuario(user_id):
+    # O cache é de todas as requisições: versão e lançamentos vêm do primário, nunca de uma réplica
+    with no_primario():
+        # A versão é lida antes dos lançamentos: uma escrita entre as duas leituras só faz o razão ser remontado
+        atual = db.session.execute(
+            select(VersaoRazao.versao).where(VersaoRazao.user_id == user_id)
+        ).scalar() or 0
+        with _trava:
+            razao = _razoes.get(user_id)
+            if razao is not None and razao.versao == atual:
+                _razoes.move_to_end(user_id)
+                return razao
+            geracao = _geracoes.get(user_id, 0)
+
+        razao = Razao(user_id, atual)
+    if pendente(user_id):
+        # A transação atual ainda não foi confirmada: o que foi lido não pode ir para o cache
+        return razao
+    with _trava:
+        if _geracoes.get(user_id, 0) != geracao:
+            # Um commit deste worker caiu durante a montagem: o que foi lido pode já estar velho
+            return razao
+        _razoes[user_id] = razao
+        _razoes.move_to_end(user_id)
+        while len(_razoes) > current_app.config['RAZAO_MAX_USUARIOS']:
+            antigo, _ = _razoes.popitem(last=False)
+            _geracoes.pop(antigo, None)
+    return razao
+
+
+def soma(user_id, tipo, inicio, fim):
+    """Total de um tipo de lançamento entre inicio e fim (inclusive)."""
+    return razao_do_usuario(user_id).series[tipo].soma(inicio, fim)
+
+
+def diarios(user_id, tipo, inicio, fim):
+    """{data: total} dos dias com lançamento entre inicio e fim."""
+    return razao_do_usuario(user_id).series[tipo].diarios(inicio, fim)
+
+
+def somas_por_faixa(user_id, tipo, limites):
+    """Totais de um tipo em cada período [limites[k], limites[k + 1])."""
+    return razao_do_usuario(user_id).series[tipo].somas_por_faixa(limites)
+
+
+def _pendentes(session):
+    return session.info.setdefault('razao', {'novos': [], 'invalidados': set(), 'versoes': {}})
+
+
+def invalidar(user_id, conexao=None, inicial=1):
+    """
+    Descarta o razão do usuário no próximo commit (escritas em massa que não passam pelo ORM).
+    Com `conexao` (escrita feita fora da sessão), também muda a versão no banco, na transação
+    dela, para os outros workers; `inicial` é a versão se o usuário ainda não tem uma ali.
+    """
+    _pendentes(db.session)['invalidados'].add(user_id)
+    if conexao is not None:
+        _incrementar(conexao, [user_id], inicial)
+
+
+def _ao_flush(session, flush_context):
+    novos, invalidados = [], set()
+    for obj in session.new:
+        tipo = _TIPO_DO_MODELO.get(type(obj))
+        if tipo:
+            _, coluna_data, coluna_valor = TIPOS[tipo]
+            novos.append((obj.user_id, tipo, getattr(obj, coluna_data.key), getattr(obj, coluna_valor.key) or 0.0))
+    for obj in session.dirty:
+        if type(obj) in _TIPO_DO_MODELO and session.is_modified(obj, include_collections=False):
+            estado = inspect(obj)
+            invalidados.update(estado.attrs.user_id.history.deleted or ())
+            invalidados.add(obj.user_id)
+    for obj in session.deleted:
+        if type(obj) in _TIPO_DO_MODELO:
+            invalidados.add(obj.user_id)
+    if novos or invalidados:
+        pendentes = _pendentes(session)
+        pendentes['novos'].extend(novos)
+        pendentes['invalidados'] |= invalidados
+        usuarios = invalidados | {user_id for user_id, *_ in novos}
+        # (versão antes da transação, versão depois deste flush) de cada usuário
+        for user_id, nova in _incrementar(session.connection(), usuarios).items():
+            antes = pendentes['versoes'].get(user_id, (nova - 1, None))[0]
+            pendentes['versoes'][user_id] = (antes, nova)
+
+
+def _ao_commit(session):
+    pendentes = session.info.pop('razao', None)
+    if not pendentes:
+        return
+    usuarios = pendentes['invalidados'] | {n[0] for n in pendentes['novos']}
+    conferidos = _conferidos()
+    for user_id in usuarios:
+        # A próxima leitura na requisição confere a versão de novo
+        conferidos.pop(user_id, None)
+    with _trava:
+        for user_id in usuarios:
+            _geracoes[user_id] = _geracoes.get(user_id, 0) + 1
+        for user_id in pendentes['invalidados']:
+            _razoes.pop(user_id, None)
+        for user_id, (antes, depois) in pendentes['versoes'].items():
+            razao = _razoes.get(user_id)
+            if razao is None:
+                continue
+            if razao.versao == antes:
+                razao.versao = depois
+            else:
+                # O cache não tinha as escritas de outro worker: acrescentar as novas não basta
+                _razoes.pop(user_id)
+        for user_id, tipo, dia, valor in pendentes['novos']:
+            razao = _razoes.get(user_id)
+            if razao is not None:
+                razao.series[tipo].acrescentar(dia, valor)
+    for funcao in _observadores:
+        funcao(pendentes['novos'], pendentes['invalidados'])
+
+
+def _ao_rollback(session):
+    session.info.pop('razao', None)
+
+
+def init_app(app):
+    for nome, listener in (('after_flush', _ao_flush), ('after_commit', _ao_commit),
+                           ('after_rollback', _ao_rollback)):
+        if not event.contains(db.session, nome, listener):
+            event.listen(db.session, nome, listener)
@@ -0,0 +1,109 @@
+"""
+Leituras de relatório em réplicas do banco, escritas sempre no primário.
+
+Com DATABASE_REPLICA_URLS (URLs separadas por vírgula), cada réplica vira um
+bind `replica_N` e as rotas marcadas com `@somente_leitura` mandam os SELECTs
+para uma delas (sorteada uma vez por requisição). Vão para o primário:
+
+- qualquer escrita (flush, INSERT/UPDATE/DELETE, `session.connection()`) e
+  tudo o que vier depois dela na mesma transação;
+- SELECT ... FOR UPDATE e SQL textual sem `.columns()`;
+- as leituras de quem escreveu há menos de REPLICA_JANELA_SEGUNDOS, para o
+  usuário ver o que acabou de gravar mesmo com a réplica atrasada (a marca
+  fica no cookie de sessão, então vale em qualquer worker);
+- as leituras dentro de `no_primario()`: os caches em memória compartilhados
+  entre requisições (razão, autocompletar) são montados do primário, senão o
+  atraso de uma réplica ficaria no cache para todo mundo.
+
+Rotas que gravam (commit) não levam `@somente_leitura`.
+
+O roteamento em si fica em SessaoRoteada (app/sessao.py). Sem réplicas
+configuradas nada muda. Localmente dá para testar com dois
+arquivos SQLite: DATABASE_REPLICA_URLS=sqlite:///.../replica.db e
+`flask replicas sincronizar` para copiar o primário para a réplica.
+"""
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import click
+from flask import current_app, has_request_context, request, session as cookie
+from flask.cli import AppGroup
+from sqlalchemy import event
+
+from .sessao import SessaoRoteada, PREFIXO_REPLICA as PREFIXO
+
+replicas_cli = AppGroup('replicas', help='Réplicas de leitura do banco.')
+
+
+def binds_de_replica(urls):
+    """SQLALCHEMY_BINDS das réplicas a partir de DATABASE_REPLICA_URLS."""
+    urls = [url.strip() for url in (urls or '').split(',') if url.strip()]
+    return {f'{PREFIXO}{i}': url for i, url in enumerate(urls, start=1)}
+
+
+def somente_leitura(view):
+    """Marca a rota (só nos GETs) para ler das réplicas."""
+    @wraps(view)
+    def decorada(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+        sessao = current_app.extensions['sqlalchemy'].session
+        sessao.info['leitura'] = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            sessao.info.pop('leitura', None)
+    return decorada
+
+
+@contextmanager
+def no_primario():
+    """Manda para o primário as leituras do bloco, mesmo numa rota `@somente_leitura`."""
+    sessao = current_app.extensions['sqlalchemy'].session
+    leitura = sessao.info.pop('leitura', None)
+    try:
+        yield
+    finally:
+        if leitura is not None:
+            sessao.info['leitura'] = leitura
+
+
+def _ao_commit(sessao):
+    if sessao.info.pop('escrita', False) and has_request_context():
+        cookie['_escrita_em'] = time.time()
+
+
+def _ao_rollback(sessao):
+    sessao.info.pop('escrita', None)
+
+
+@replicas_cli.command('sincronizar')
+def sincronizar_command():
+    """Copia o banco primário para as réplicas (só SQLite, para testes locais)."""
+    engines = current_app.extensions['sqlalchemy'].engines
+    primario = engines[None].url
+    if primario.get_backend_name() != 'sqlite':
+        raise click.ClickException('Só réplicas SQLite são sincronizadas por aqui; use a replicação do banco.')
+    origem = sqlite3.connect(primario.database)
+    try:
+        for nome, engine in engines.items():
+            if not (nome and nome.startswith(PREFIXO)):
+                continue
+            engine.dispose()
+            destino = sqlite3.connect(engine.url.database)
+            try:
+                origem.backup(destino)
+            finally:
+                destino.close()
+            click.echo(f'{nome}: {engine.url.database}')
+    finally:
+        origem.close()
+
+
+def init_app(app):
+    for nome, listener in (('after_commit', _ao_commit), ('after_rollback', _ao_rollback)):
+        if not event.contains(SessaoRoteada, nome, listener):
+            event.listen(SessaoRoteada, nome, listener)
+    app.cli.add_command(replicas_cli)
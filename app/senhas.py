@@ -0,0 +1,43 @@
+"""
+Hash de senhas com custo configurável e atualização transparente.
+
+O método e o tamanho do salt vêm de SENHA_METODO / SENHA_SALT (no formato do
+werkzeug: "scrypt:N:r:p" ou "pbkdf2:sha256:iterações"). Hashes gravados com
+outros parâmetros continuam valendo; no próximo login certo a senha é
+refeita com os parâmetros atuais.
+
+`python -m benchmarks.senhas` mede quantos hashes por segundo cada núcleo
+aguenta com esses parâmetros, para dimensionar os limites de
+app/limites.py.
+"""
+from functools import lru_cache
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+@lru_cache(maxsize=8)
+def _prefixo(metodo):
+    # Prefixo que o werkzeug grava para o método (com os parâmetros padrão explícitos)
+    return generate_password_hash('', metodo, 1).split('$', 1)[0]
+
+
+def _configuracao():
+    return current_app.config['SENHA_METODO'], current_app.config['SENHA_SALT']
+
+
+def gerar_hash(senha):
+    metodo, tamanho_salt = _configuracao()
+    return generate_password_hash(senha, metodo, tamanho_salt)
+
+
+def conferir(senha_hash, senha):
+    return bool(senha_hash) and check_password_hash(senha_hash, senha)
+
+
+def precisa_refazer(senha_hash):
+    """True se o hash foi gerado com parâmetros diferentes dos configurados."""
+    metodo_atual, tamanho_salt = _configuracao()
+    metodo, _, resto = senha_hash.partition('$')
+    salt = resto.partition('$')[0]
+    return metodo != _prefixo(metodo_atual) or len(salt) != tamanho_salt
@@ -0,0 +1,110 @@
+"""
+Séries temporais dos relatórios (faturamento x custos x lucro).
+
+Os totais vêm do razão em memória (app/razao.py) e dos custos fixos pagos,
+agregados por dia no banco (ou no fechamento, app/fechamento.py), e são reamostrados em períodos adaptativos: a
+granularidade mais fina (dia, semana, mês, trimestre, ano) que cabe no número
+de pontos pedido. Por serem somas por período, os
+totais do gráfico continuam batendo com os KPIs, mesmo em intervalos de anos.
+"""
+from datetime import date, timedelta
+
+from . import razao, fechamento
+
+PONTOS_PADRAO = 60
+PONTOS_MAXIMO = 500
+GRANULARIDADES = ('dia', 'semana', 'mes', 'trimestre', 'ano')
+# Intervalo aceito nas datas dos relatórios: fora dele é erro de digitação (e perto de
+# date.max as contas de "dia seguinte" estouram)
+DATA_MINIMA = date(1900, 1, 1)
+DATA_MAXIMA = date(2199, 12, 31)
+
+
+def inicio_do_periodo(dia, granularidade):
+    if granularidade == 'dia':
+        return dia
+    if granularidade == 'semana':
+        return dia - timedelta(days=dia.weekday())
+    if granularidade == 'mes':
+        return dia.replace(day=1)
+    if granularidade == 'trimestre':
+        return date(dia.year, 3 * ((dia.month - 1) // 3) + 1, 1)
+    return date(dia.year, 1, 1)
+
+
+def _proximo_periodo(chave, granularidade):
+    """Início do período seguinte ao que começa em `chave`; None depois do último representável."""
+    try:
+        if granularidade == 'dia':
+            return chave + timedelta(days=1)
+        if granularidade == 'semana':
+            return chave + timedelta(days=7)
+        if granularidade == 'mes':
+            return (chave + timedelta(days=32)).replace(day=1)
+        if granularidade == 'trimestre':
+            return (chave + timedelta(days=93)).replace(day=1)
+        return date(chave.year + 1, 1, 1)
+    except (OverflowError, ValueError):
+        return None
+
+
+def _quantidade_de_periodos(inicio, fim, granularidade):
+    if granularidade == 'dia':
+        return (fim - inicio).days + 1
+    if granularidade == 'semana':
+        return (inicio_do_periodo(fim, 'semana') - inicio_do_periodo(inicio, 'semana')).days // 7 + 1
+    meses = (fim.year - inicio.year) * 12 + fim.month - inicio.month
+    if granularidade == 'mes':
+        return meses + 1
+    if granularidade == 'trimestre':
+        return (fim.year - inicio.year) * 4 + (fim.month - 1) // 3 - (inicio.month - 1) // 3 + 1
+    return fim.year - inicio.year + 1
+
+
+def escolher_granularidade(inicio, fim, pontos):
+    for granularidade in GRANULARIDADES:
+        if _quantidade_de_periodos(inicio, fim, granularidade) <= pontos:
+            return granularidade
+    return GRANULARIDADES[-1]
+
+
+def serie_financeira(user_id, inicio, fim, pontos=PONTOS_PADRAO):
+    """
+    Série faturamento/custos/lucro de `inicio` a `fim` com no máximo `pontos`
+    períodos, em formato colunar:
+    {"granularidade": "semana", "periodos": ["2024-01-01", ...],
+     "faturamento": [...], "custos": [...], "lucro": [...]}
+    Cada período é identificado pela sua data inicial (limitada a `inicio`).
+    """
+    pontos = max(1, min(pontos, PONTOS_MAXIMO))
+    granularidade = escolher_granularidade(inicio, fim, pontos)
+
+    # Início de cada período do intervalo, inclusive os sem movimento
+    chaves = []
+    dia = inicio
+    while dia is not None and dia <= fim:
+        chave = inicio_do_periodo(dia, granularidade)
+        chaves.append(chave)
+        dia = _proximo_periodo(chave, granularidade)
+
+    # Lançamentos do dia a dia saem do razão em memória; custos fixos, do banco
+    limites = [max(chave, inicio) for chave in chaves] + [fim + timedelta(days=1)]
+    faturamento = razao.somas_por_faixa(user_id, 'faturamento', limites)
+    custos = [
+        a + c for a, c in zip(
+            razao.somas_por_faixa(user_id, 'abastecimento', limites),
+            razao.somas_por_faixa(user_id, 'custos_variaveis', limites)
+        )
+    ]
+    posicao = {chave: i for i, chave in enumerate(chaves)}
+    # Custos fixos entram no dia do vencimento, somente os pagos e de definições ativas
+    for dia, total in fechamento.por_dia(user_id, 'custos_fixos_pagos', inicio, fim):
+        custos[posicao[inicio_do_periodo(dia, granularidade)]] += total or 0.0
+
+    return {
+        'granularidade': granularidade,
+        'periodos': [limite.isoformat() for limite in limites[:-1]],
+        'faturamento': [round(v, 2) for v in faturamento],
+        'custos': [round(v, 2) for v in custos],
+        'lucro': [round(f - c, 2) for f, c in zip(faturamento, custos)],
+    }
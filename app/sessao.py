@@ -0,0 +1,78 @@
+"""
+Sessão do banco que escolhe o engine de cada comando.
+
+O primário (SQLALCHEMY_DATABASE_URI) é o banco global. Por cima dele:
+
+- shards (app/shards.py): com `session.info['shard']` definido, tudo o que
+  toca tabelas de dados do usuário vai para o shard dele; as tabelas de
+  TABELAS_GLOBAIS continuam no global;
+- réplicas (app/replicas.py): nas rotas `@somente_leitura`, os SELECTs que
+  iriam para o global vão para uma réplica.
+
+Fica num módulo sem dependências do app porque a classe é passada ao
+SQLAlchemy() antes de `db` existir.
+"""
+import random
+import time
+
+from flask import current_app, has_request_context, session as cookie
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Table, inspect
+from sqlalchemy.sql.expression import Select, CompoundSelect, TextualSelect
+from sqlalchemy.sql.util import find_tables
+
+PREFIXO_REPLICA = 'replica_'
+# Ficam só no banco global (categorias e combustíveis têm cópia em cada shard, ver app/shards.py;
+# resumo_mensal junta todos os usuários para a visão da frota, ver app/frota.py)
+TABELAS_GLOBAIS = frozenset({'user', 'categoria_custo', 'tipo_combustivel', 'usuario_shard', 'resumo_mensal'})
+
+
+def _somente_select(clause):
+    # text(...).columns(...) é uma consulta que devolve linhas; text() puro pode ser qualquer coisa
+    if isinstance(clause, (CompoundSelect, TextualSelect)):
+        return True
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def dados_do_usuario(mapper=None, clause=None):
+    """True se o comando toca alguma tabela fora de TABELAS_GLOBAIS (ou não dá para saber)."""
+    if clause is not None:
+        tabelas = [t for t in find_tables(clause, check_columns=True, include_crud=True) if isinstance(t, Table)]
+        if tabelas:
+            return any(t.name not in TABELAS_GLOBAIS for t in tabelas)
+        # SQL textual: todo o SQL escrito à mão do app é sobre dados do usuário
+        return True
+    if mapper is not None:
+        return mapper.local_table.name not in TABELAS_GLOBAIS
+    # session.connection() sem mais nada: as escritas em lote dos módulos
+    return True
+
+
+class SessaoRoteada(Session):
+    """Sessão do Flask-SQLAlchemy que roteia para o shard do usuário e para as réplicas."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+        shard = self.info.get('shard')
+        if shard and dados_do_usuario(mapper and inspect(mapper), clause):
+            return self._db.engines[shard]
+        if not _somente_select(clause):
+            self.info['escrita'] = True
+            return engine
+        if not self.info.get('leitura') or self.info.get('escrita') or _escreveu_ha_pouco():
+            return engine
+        return self._replica() or engine
+
+    def _replica(self):
+        if 'replica' not in self.info:
+            nomes = [nome for nome in self._db.engines if nome and nome.startswith(PREFIXO_REPLICA)]
+            self.info['replica'] = random.choice(nomes) if nomes else None
+        return self._db.engines[self.info['replica']] if self.info['replica'] else None
+
+
+def _escreveu_ha_pouco():
+    if not has_request_context():
+        return False
+    return time.time() - cookie.get('_escrita_em', 0) < current_app.config['REPLICA_JANELA_SEGUNDOS']
@@ -0,0 +1,259 @@
+"""
+Dados de cada usuário num de vários bancos (shards).
+
+Com SHARD_URLS (URLs separadas por vírgula) cada URL vira um bind `shard_N`
+e o banco principal passa a ser o global: guarda `user`, o mapa
+`usuario_shard` e as tabelas compartilhadas (categorias e tipos de
+combustível), além dos dados de quem ainda não tem shard.
+
+- Usuário novo ganha um shard por hash estável do id (crc32 % N), gravado em
+  usuario_shard: acrescentar shards depois não muda ninguém de lugar.
+- Em cada requisição autenticada a sessão manda tudo o que toca dados do
+  usuário para o shard dele (SessaoRoteada, app/sessao.py).
+- Cada shard tem o schema completo (`flask db upgrade` com DATABASE_URL
+  apontando para ele), a linha `user` de quem mora nele (para as chaves
+  estrangeiras) e cópias das tabelas compartilhadas, atualizadas no flush que
+  as altera e por `flask shards sincronizar`.
+- Jobs que varrem todos os usuários rodam uma vez por banco (`em_cada_banco`).
+
+`flask shards mover EMAIL DESTINO` muda um usuário de banco com o app no ar:
+marca a conta (as escritas dela recebem 503 enquanto isso), espera as
+requisições em andamento, copia as linhas com ids novos
+(app/transferencia.py) numa transação do destino, vira o mapa e apaga a
+origem. As leituras continuam na origem até a virada.
+"""
+import time
+import zlib
+from contextlib import contextmanager
+from itertools import chain
+
+import click
+from flask import current_app, has_app_context, request
+from flask.cli import AppGroup
+from flask_login import current_user
+from sqlalchemy import event, func, select
+
+from . import db, razao, autocompletar, exclusao, transferencia
+from .models import User, UsuarioShard, CategoriaCusto, TipoCombustivel
+
+PREFIXO = 'shard_'
+GLOBAL = 'global'
+COMPARTILHADAS = (CategoriaCusto, TipoCombustivel)
+
+shards_cli = AppGroup('shards', help='Distribuição dos usuários entre bancos.')
+
+
+def binds_de_shard(urls):
+    """SQLALCHEMY_BINDS dos shards a partir de SHARD_URLS."""
+    urls = [url.strip() for url in (urls or '').split(',') if url.strip()]
+    return {f'{PREFIXO}{i}': url for i, url in enumerate(urls, start=1)}
+
+
+def nomes():
+    return current_app.extensions['shards']
+
+
+def shard_por_hash(user_id):
+    lista = nomes()
+    return lista[zlib.crc32(str(user_id).encode()) % len(lista)] if lista else None
+
+
+def shard_do_usuario(user_id):
+    """Bind do shard do usuário; None se os dados dele estão no banco global."""
+    mapa = db.session.get(UsuarioShard, user_id)
+    return mapa.shard if mapa else None
+
+
+@contextmanager
+def no_banco(shard):
+    """Dentro do bloco, os dados de usuário da sessão vão para `shard` (None: banco global)."""
+    anterior = db.session.info.get('shard')
+    db.session.info['shard'] = shard
+    try:
+        yield
+    finally:
+        db.session.info['shard'] = anterior
+
+
+def do_usuario(user_id):
+    return no_banco(shard_do_usuario(user_id))
+
+
+def em_cada_banco():
+    """Aponta a sessão para o banco global e depois para cada shard, um de cada vez."""
+    for shard in [None, *nomes()]:
+        # Mesmos ids em bancos diferentes: nada do mapa de identidade passa de um para o outro
+        db.session.close()
+        with no_banco(shard):
+            yield shard
+    db.session.close()
+
+
+def _conexao_global(sessao=None):
+    return (sessao or db.session).connection(bind_arguments={'mapper': User})
+
+
+def _espelhar_usuario(conexao_global, conexao_shard, user_id):
+    usuarios = User.__table__
+    if conexao_shard.execute(select(usuarios.c.id).where(usuarios.c.id == user_id)).first() is None:
+        linha = conexao_global.execute(select(usuarios).where(usuarios.c.id == user_id)).mappings().one()
+        conexao_shard.execute(usuarios.insert().values(**linha))
+
+
+def _copiar_compartilhada(conexao_global, conexao_shard, tabela, ids=None):
+    filtro = tabela.c.id.in_(ids) if ids is not None else True
+    linhas = [dict(linha) for linha in conexao_global.execute(select(tabela).where(filtro)).mappings()]
+    existentes = set(conexao_shard.execute(select(tabela.c.id).where(filtro)).scalars())
+    removidas = existentes - {linha['id'] for linha in linhas}
+    if removidas:
+        conexao_shard.execute(tabela.delete().where(tabela.c.id.in_(removidas)))
+    for linha in linhas:
+        if linha['id'] in existentes:
+            conexao_shard.execute(tabela.update().where(tabela.c.id == linha['id']).values(**linha))
+    novas = [linha for linha in linhas if linha['id'] not in existentes]
+    if novas:
+        conexao_shard.execute(tabela.insert(), novas)
+
+
+def _gravar_mapa(user_id, shard, movendo):
+    mapa = db.session.get(UsuarioShard, user_id) or UsuarioShard(user_id=user_id)
+    mapa.shard = shard
+    mapa.movendo = movendo
+    db.session.add(mapa)
+    db.session.commit()
+
+
+def mover(user_id, destino, espera=None):
+    """Leva os dados do usuário para `destino` (None: banco global); devolve {tabela: linhas copiadas}."""
+    if destino is not None and destino not in nomes():
+        raise ValueError(f'Shard desconhecido: {destino}.')
+    origem = shard_do_usuario(user_id)
+    if origem == destino:
+        return {}
+    espera = current_app.config['SHARD_ESPERA_MOVIMENTO'] if espera is None else espera
+    engines = db.engines
+
+    _gravar_mapa(user_id, origem, movendo=True)
+    # Requisições que leram o mapa antes da marca ainda podem estar escrevendo na origem
+    time.sleep(espera)
+    try:
+        with engines[origem].connect() as conexao_origem, engines[destino].begin() as conexao_destino:
+            if destino is not None:
+                _espelhar_usuario(_conexao_global(), conexao_destino, user_id)
+            # Restos de uma tentativa anterior interrompida
+            exclusao.apagar_dados(conexao_destino, user_id)
+            copiadas = transferencia.copiar_dados(conexao_origem, conexao_destino, user_id)
+            # A versão copiada é a da origem: a nova faz os outros workers lerem o destino
+            razao.invalidar(user_id, conexao_destino)
+    except Exception:
+        _gravar_mapa(user_id, origem, movendo=False)
+        raise
+
+    _gravar_mapa(user_id, destino, movendo=False)
+    with engines[origem].begin() as conexao_origem:
+        exclusao.apagar_dados(conexao_origem, user_id)
+        if origem is not None:
+            usuarios = User.__table__
+            conexao_origem.execute(usuarios.delete().where(usuarios.c.id == user_id))
+    autocompletar.invalidar(user_id)
+    return copiadas
+
+
+def sincronizar():
+    """Copia as tabelas compartilhadas e as linhas `user` dos moradores para cada shard."""
+    conexao_global = _conexao_global()
+    for shard in nomes():
+        with db.engines[shard].begin() as conexao_shard:
+            for modelo in COMPARTILHADAS:
+                _copiar_compartilhada(conexao_global, conexao_shard, modelo.__table__)
+            moradores = conexao_global.execute(
+                select(UsuarioShard.user_id).where(UsuarioShard.shard == shard)
+            ).scalars()
+            for user_id in moradores:
+                _espelhar_usuario(conexao_global, conexao_shard, user_id)
+
+
+def _ao_flush(session, flush_context):
+    if not has_app_context() or not nomes():
+        return
+    novos = [obj.id for obj in session.new if isinstance(obj, User)]
+    alteradas = {}
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, COMPARTILHADAS) and obj.id is not None:
+            alteradas.setdefault(obj.__table__, set()).add(obj.id)
+    if not novos and not alteradas:
+        return
+
+    conexao_global = _conexao_global(session)
+    for user_id in novos:
+        shard = shard_por_hash(user_id)
+        conexao_global.execute(UsuarioShard.__table__.insert().values(user_id=user_id, shard=shard, movendo=False))
+        _espelhar_usuario(conexao_global, session.connection(bind_arguments={'bind': db.engines[shard]}), user_id)
+    if alteradas:
+        for shard in nomes():
+            conexao_shard = session.connection(bind_arguments={'bind': db.engines[shard]})
+            for tabela, ids in alteradas.items():
+                _copiar_compartilhada(conexao_global, conexao_shard, tabela, ids)
+
+
+def _escolher_shard():
+    if not nomes() or request.endpoint == 'static' or not current_user.is_authenticated:
+        return None
+    mapa = db.session.get(UsuarioShard, current_user.id)
+    db.session.info['shard'] = mapa.shard if mapa else None
+    if mapa and mapa.movendo and request.method not in ('GET', 'HEAD'):
+        espera = current_app.config['SHARD_ESPERA_MOVIMENTO']
+        return 'Sua conta está sendo transferida. Tente de novo em alguns segundos.', 503, {'Retry-After': str(espera)}
+    return None
+
+
+def _banco(nome):
+    if nome == GLOBAL:
+        return None
+    if nome not in nomes():
+        raise click.BadParameter(f'use {GLOBAL} ou um de: {", ".join(nomes()) or "(nenhum shard configurado)"}')
+    return nome
+
+
+@shards_cli.command('status')
+def status_command():
+    """Quantos usuários moram em cada banco."""
+    por_shard = dict(db.session.query(UsuarioShard.shard, func.count()).group_by(UsuarioShard.shard))
+    sem_mapa = db.session.query(func.count(User.id)).filter(
+        ~select(UsuarioShard.user_id).where(UsuarioShard.user_id == User.id).exists()
+    ).scalar()
+    click.echo(f'{GLOBAL}: {sem_mapa + por_shard.pop(None, 0)}')
+    for shard in nomes():
+        click.echo(f'{shard}: {por_shard.get(shard, 0)}')
+
+
+@shards_cli.command('mover')
+@click.argument('email')
+@click.argument('destino')
+@click.option('--espera', type=int, default=None, help='Segundos entre marcar a conta e copiar; padrão: SHARD_ESPERA_MOVIMENTO.')
+def mover_command(email, destino, espera):
+    """Move os dados de EMAIL para DESTINO (global ou shard_N)."""
+    user = User.query.filter_by(email=email).first()
+    if user is None:
+        raise click.ClickException(f'Usuário {email} não encontrado.')
+    inicio = time.perf_counter()
+    copiadas = mover(user.id, _banco(destino), espera)
+    for tabela, linhas in copiadas.items():
+        click.echo(f'{tabela}: {linhas}')
+    click.echo(f'{email} em {destino} ({time.perf_counter() - inicio:.2f}s).')
+
+
+@shards_cli.command('sincronizar')
+def sincronizar_command():
+    """Atualiza nos shards as tabelas compartilhadas e as linhas dos usuários."""
+    sincronizar()
+    click.echo(f'{len(nomes())} shards sincronizados.')
+
+
+def init_app(app):
+    # Na ordem de SHARD_URLS: é ela que o hash dos usuários novos usa
+    app.extensions['shards'] = [nome for nome in app.config['SQLALCHEMY_BINDS'] if nome.startswith(PREFIXO)]
+    if not event.contains(db.session, 'after_flush', _ao_flush):
+        event.listen(db.session, 'after_flush', _ao_flush)
+    app.before_request(_escolher_shard)
+    app.cli.add_command(shards_cli)
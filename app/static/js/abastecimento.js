@@ -1,45 +1,97 @@
 document.addEventListener("DOMContentLoaded", function () {
+  // --- Calculation Logic ---
   const precoInput = document.getElementById("precoPorLitro");
   const litrosInput = document.getElementById("litros");
   const totalInput = document.getElementById("custoTotal");
-  let lastEdited = null;
-
-  function calculate() {
-    const preco = parseFloat(precoInput.value) || 0;
-    const litros = parseFloat(litrosInput.value) || 0;
-    const total = parseFloat(totalInput.value) || 0;
-
-    if (lastEdited === precoInput && litros > 0) {
-      totalInput.value = (preco * litros).toFixed(2);
-    } else if (lastEdited === litrosInput && preco > 0) {
-      totalInput.value = (preco * litros).toFixed(2);
-    } else if (lastEdited === totalInput && preco > 0) {
-      litrosInput.value = (total / preco).toFixed(2);
-    } else if (lastEdited === totalInput && litros > 0) {
-      precoInput.value = (total / litros).toFixed(3);
+
+  function formatAndCalculate(event) {
+    let value = event.target.value;
+    // Allow only numbers and one comma/dot
+    value = value.replace(/[^\d,.]/g, "").replace(",", ".");
+
+    // Update the value in the field
+    // event.target.value = value;
+
+    const preco = parseFloat(precoInput.value.replace(",", ".")) || 0;
+    const litros = parseFloat(litrosInput.value.replace(",", ".")) || 0;
+    const total = parseFloat(totalInput.value.replace(",", ".")) || 0;
+
+    const activeElement = document.activeElement;
+
+    if (activeElement === precoInput && litros > 0) {
+      totalInput.value = (preco * litros).toFixed(2).replace(".", ",");
+    } else if (activeElement === litrosInput && preco > 0) {
+      totalInput.value = (preco * litros).toFixed(2).replace(".", ",");
+    } else if (activeElement === totalInput) {
+      if (preco > 0) {
+        litrosInput.value = (total / preco).toFixed(2).replace(".", ",");
+      } else if (litros > 0) {
+        precoInput.value = (total / litros).toFixed(3).replace(".", ",");
+      }
     }
   }
 
   [precoInput, litrosInput, totalInput].forEach((input) => {
-    input.addEventListener("focus", function () {
-      lastEdited = this;
-    });
-    input.addEventListener("input", calculate);
+    input.addEventListener("input", formatAndCalculate);
   });
 
+  // --- New Fuel Logic ---
   const tipoCombustivelSelect = document.getElementById("tipoCombustivel");
   const newCombustivelWrapper = document.getElementById(
     "newCombustivelWrapper",
   );
   const newCombustivelInput = document.getElementById("newCombustivelName");
 
-  tipoCombustivelSelect.addEventListener("change", function () {
-    if (this.value === "add_new_combustivel") {
+  function toggleNewFuelField() {
+    if (tipoCombustivelSelect.value === "add_new_combustivel") {
       newCombustivelWrapper.classList.remove("d-none");
       newCombustivelInput.required = true;
     } else {
       newCombustivelWrapper.classList.add("d-none");
       newCombustivelInput.required = false;
+      newCombustivelInput.value = "";
+    }
+  }
+
+  tipoCombustivelSelect.addEventListener("change", toggleNewFuelField);
+
+  // Initial check on page load
+  toggleNewFuelField();
+});
+
+// --- Histórico: "Carregar mais" paginado por cursor ---
+document.addEventListener("DOMContentLoaded", function () {
+  const botao = document.getElementById("carregar-mais-abastecimentos");
+  const historico = document.getElementById("historico-abastecimento");
+  if (!botao || !historico) return;
+
+  botao.addEventListener("click", async function () {
+    botao.disabled = true;
+    try {
+      const url = new URL(botao.dataset.url, window.location.origin);
+      url.searchParams.set("cursor", botao.dataset.cursor);
+      const resposta = await fetch(url, { headers: { Accept: "application/json" } });
+      if (!resposta.ok) throw new Error(resposta.status);
+      const dados = await resposta.json();
+
+      const modelo = document.createElement("template");
+      modelo.innerHTML = dados.html;
+      const novosGrupos = Array.from(modelo.content.querySelectorAll(".day-group"));
+      const ultimoGrupo = historico.querySelector(".day-group:last-of-type");
+      // Um dia pode ter ficado dividido entre duas páginas: junta no grupo já exibido
+      if (ultimoGrupo && novosGrupos.length && novosGrupos[0].dataset.data === ultimoGrupo.dataset.data) {
+        novosGrupos.shift().querySelectorAll(".entry-item").forEach((item) => ultimoGrupo.appendChild(item));
+      }
+      novosGrupos.forEach((grupo) => historico.appendChild(grupo));
+
+      if (dados.proximo_cursor) {
+        botao.dataset.cursor = dados.proximo_cursor;
+        botao.disabled = false;
+      } else {
+        botao.parentElement.remove();
+      }
+    } catch (erro) {
+      botao.disabled = false;
     }
   });
 });
@@ -0,0 +1,147 @@
+document.addEventListener("DOMContentLoaded", function () {
+  // --- Pagar/Receber sem recarregar o dashboard ---
+  // O servidor devolve o novo estado do registro e o delta dos KPIs do mês.
+  function aplicarDeltaKpis(delta) {
+    Object.entries(delta).forEach(([kpi, valorDelta]) => {
+      const el = document.querySelector(`[data-kpi="${kpi}"]`);
+      if (!el || !valorDelta) return;
+      const novoValor = parseFloat(el.dataset.valor) + valorDelta;
+      el.dataset.valor = novoValor;
+      el.textContent = "R$ " + novoValor.toFixed(2);
+      if (kpi === "saldo_atual_real") {
+        el.classList.toggle("text-success", novoValor >= 0);
+        el.classList.toggle("text-danger", novoValor < 0);
+      }
+    });
+  }
+
+  function definirKpis(totais) {
+    document.querySelectorAll("[data-kpi]").forEach((el) => {
+      const kpi = el.dataset.kpi;
+      if (!(kpi in totais)) return;
+      aplicarDeltaKpis({ [kpi]: totais[kpi] - parseFloat(el.dataset.valor) });
+    });
+  }
+
+  function atualizarRegistro(form, concluido) {
+    const badge = form.parentElement.querySelector(".js-status-badge");
+    badge.classList.toggle("bg-success", concluido);
+    badge.classList.toggle(badge.dataset.classePendente, !concluido);
+
+    const botao = form.querySelector("button");
+    botao.className = concluido
+      ? "btn btn-sm btn-outline-warning"
+      : "btn btn-sm btn-success";
+    botao.title = concluido ? "Marcar como Pendente" : form.dataset.tituloAcao;
+    botao.textContent = concluido ? "Desfazer" : form.dataset.acao;
+
+    // Registro já baixado sai da seleção do lote; desfeito, volta para ela
+    const checkbox = form.closest("li").querySelector(".js-lote");
+    if (!checkbox) return;
+    if (concluido && checkbox.checked) {
+      checkbox.checked = false;
+      checkbox.dispatchEvent(new Event("change"));
+    }
+    checkbox.disabled = concluido;
+    checkbox.classList.toggle("d-none", concluido);
+  }
+
+  async function mensagemDeErro(resposta, padrao) {
+    try {
+      return (await resposta.json()).erro || padrao;
+    } catch (erro) {
+      return padrao;
+    }
+  }
+
+  document.querySelectorAll(".js-toggle-form").forEach((form) => {
+    form.addEventListener("submit", async function (event) {
+      event.preventDefault();
+      const botao = form.querySelector("button");
+      botao.disabled = true;
+      let resposta;
+      try {
+        resposta = await fetch(form.action, {
+          method: "POST",
+          headers: { Accept: "application/json" },
+          body: new FormData(form),
+        });
+      } catch (erro) {
+        // Sem rede o pedido não chegou ao servidor: cai no fluxo tradicional com redirect
+        botao.disabled = false;
+        form.submit();
+        return;
+      }
+      try {
+        if (!resposta.ok) {
+          // O servidor respondeu: reenviar o formulário inverteria o registro de novo
+          alert(await mensagemDeErro(resposta, "Não foi possível atualizar o registro."));
+          return;
+        }
+        const dados = await resposta.json();
+        atualizarRegistro(form, dados[form.dataset.campo]);
+        aplicarDeltaKpis(dados.kpis_delta);
+      } catch (erro) {
+        // O registro mudou mas a resposta não pôde ser lida: a página mostra o estado real
+        window.location.reload();
+      } finally {
+        botao.disabled = false;
+      }
+    });
+  });
+
+  // --- Baixa em lote: um único POST para todos os registros marcados ---
+  const painelLote = document.getElementById("baixa-lote");
+  if (!painelLote) return;
+  const botaoLote = document.getElementById("baixa-lote-btn");
+
+  function selecionados() {
+    return Array.from(document.querySelectorAll(".js-lote:checked"));
+  }
+
+  document.querySelectorAll(".js-lote").forEach((checkbox) => {
+    checkbox.addEventListener("change", () => {
+      const quantidade = selecionados().length;
+      document.getElementById("baixa-lote-qtd").textContent = quantidade;
+      painelLote.classList.toggle("d-none", quantidade === 0);
+    });
+  });
+
+  botaoLote.addEventListener("click", async function () {
+    const marcados = selecionados();
+    const payload = {
+      custos: [],
+      receitas: [],
+      data: document.getElementById("baixa-lote-data").value,
+      metodo_pagamento: document.getElementById("baixa-lote-metodo").value,
+      year: parseInt(painelLote.dataset.year, 10),
+      month: parseInt(painelLote.dataset.month, 10),
+    };
+    marcados.forEach((checkbox) =>
+      payload[checkbox.dataset.tipo].push(parseInt(checkbox.value, 10)),
+    );
+
+    botaoLote.disabled = true;
+    try {
+      const resposta = await fetch(painelLote.dataset.url, {
+        method: "POST",
+        headers: {
+          Accept: "application/json",
+          "Content-Type": "application/json",
+        },
+        body: JSON.stringify(payload),
+      });
+      if (!resposta.ok) throw new Error(resposta.status);
+      const dados = await resposta.json();
+      marcados.forEach((checkbox) =>
+        atualizarRegistro(checkbox.closest("li").querySelector(".js-toggle-form"), true),
+      );
+      definirKpis(dados.totais);
+      painelLote.classList.add("d-none");
+    } catch (erro) {
+      alert("Não foi possível dar baixa nos registros selecionados.");
+    } finally {
+      botaoLote.disabled = false;
+    }
+  });
+});
@@ -0,0 +1,103 @@
+// Fila de lançamentos offline em IndexedDB, compartilhada pela página e pelo service worker.
+// Cada lançamento recebe uma chave de idempotência no momento da captura; o servidor ignora
+// chaves repetidas, então reenviar a fila depois de uma falha de rede é sempre seguro.
+// Entradas que o servidor recusa (mês fechado, categoria inexistente...) saem da fila: reenviá-las
+// não adianta e elas segurariam as outras.
+(function (global) {
+  const DB_NOME = "meupossante";
+  const STORE = "fila_lancamentos";
+  const URL_SYNC = "/api/lancamentos/sync";
+  const MAX_POR_LOTE = 500;
+  const SYNC_TAG = "sync-lancamentos";
+
+  function abrir() {
+    return new Promise((resolve, reject) => {
+      const pedido = indexedDB.open(DB_NOME, 1);
+      pedido.onupgradeneeded = () => {
+        pedido.result.createObjectStore(STORE, { keyPath: "chave" });
+      };
+      pedido.onsuccess = () => resolve(pedido.result);
+      pedido.onerror = () => reject(pedido.error);
+    });
+  }
+
+  async function transacao(modo, operacao) {
+    const db = await abrir();
+    return new Promise((resolve, reject) => {
+      const tx = db.transaction(STORE, modo);
+      const resultado = operacao(tx.objectStore(STORE));
+      tx.oncomplete = () => resolve(resultado && resultado.result);
+      tx.onerror = () => reject(tx.error);
+    });
+  }
+
+  function novaChave() {
+    if (global.crypto && crypto.randomUUID) return crypto.randomUUID();
+    return Date.now().toString(36) + Math.random().toString(36).slice(2);
+  }
+
+  function adicionar(entrada) {
+    entrada.chave = entrada.chave || novaChave();
+    return transacao("readwrite", (store) => store.put(entrada));
+  }
+
+  function listar() {
+    return transacao("readonly", (store) => store.getAll());
+  }
+
+  function remover(chaves) {
+    return transacao("readwrite", (store) => {
+      chaves.forEach((chave) => store.delete(chave));
+    });
+  }
+
+  let envioEmAndamento = null;
+
+  // Erro de um lote que chegou ao servidor e foi recusado por inteiro (não é falta de conexão)
+  class LoteRecusado extends Error {}
+
+  // Envia a fila em lotes; só remove localmente o que o servidor confirmou ou recusou.
+  function enviar() {
+    if (envioEmAndamento) return envioEmAndamento;
+    envioEmAndamento = (async () => {
+      const pendentes = await listar();
+      let aplicadas = 0;
+      const recusadas = [];
+      for (let i = 0; i < pendentes.length; i += MAX_POR_LOTE) {
+        const lote = pendentes.slice(i, i + MAX_POR_LOTE);
+        const resposta = await fetch(URL_SYNC, {
+          method: "POST",
+          credentials: "same-origin",
+          redirect: "manual", // sessão expirada redireciona ao login: trata como falha
+          headers: {
+            Accept: "application/json",
+            "Content-Type": "application/json",
+          },
+          body: JSON.stringify({ entradas: lote }),
+        });
+        if (resposta.status >= 400 && resposta.status < 500) {
+          // O servidor respondeu: mostra o motivo em vez de "sem conexão" (a fila fica para depois)
+          const corpo = await resposta.json().catch(() => ({}));
+          throw new LoteRecusado(corpo.erro || "Lançamentos recusados pelo servidor (" + resposta.status + ").");
+        }
+        if (!resposta.ok) throw new Error("Falha ao sincronizar: " + resposta.status);
+        const resultado = await resposta.json();
+        const porChave = new Map(lote.map((entrada) => [entrada.chave, entrada]));
+        const recusadasLote = resultado.recusadas || [];
+        await remover(
+          resultado.aplicadas.concat(resultado.duplicadas, recusadasLote.map((r) => r.chave)),
+        );
+        aplicadas += resultado.aplicadas.length;
+        recusadasLote.forEach((r) => {
+          recusadas.push({ erro: r.erro, entrada: porChave.get(r.chave) });
+        });
+      }
+      return { aplicadas: aplicadas, recusadas: recusadas, pendentes: (await listar()).length };
+    })().finally(() => {
+      envioEmAndamento = null;
+    });
+    return envioEmAndamento;
+  }
+
+  global.FilaOffline = { adicionar, listar, enviar, LoteRecusado, SYNC_TAG };
+})(self);
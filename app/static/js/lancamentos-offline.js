@@ -0,0 +1,117 @@
+// Captura os formulários da Central de Lançamentos na fila offline (fila-offline.js)
+// e sincroniza tudo em um único POST quando há conexão.
+document.addEventListener("DOMContentLoaded", function () {
+  const status = document.getElementById("sync-status");
+  const desempenhoForm = document.getElementById("desempenhoForm");
+  const avulsoForm = document.getElementById("avulsoForm");
+  if (!status || !("indexedDB" in window) || !window.fetch) return;
+
+  if ("serviceWorker" in navigator) {
+    navigator.serviceWorker.register("/sw.js");
+  }
+
+  function mostrarStatus(mensagem, categoria) {
+    status.className = "alert alert-" + categoria;
+    status.textContent = mensagem;
+  }
+
+  function paraNumero(texto) {
+    return parseFloat((texto || "").replace(",", ".")) || 0;
+  }
+
+  function lerFaturamentos(form, seletorLinha) {
+    return Array.from(form.querySelectorAll(seletorLinha))
+      .map((linha) => {
+        const tipo = linha.querySelector('[name="faturamentoTipo"]').value;
+        let fonte = linha.querySelector('[name="faturamentoFonte"]').value;
+        if (fonte === "Outro") {
+          fonte = linha.querySelector('[name="faturamentoFonteOutro"]').value.trim() || "Outro";
+        }
+        return {
+          valor: paraNumero(linha.querySelector('[name="faturamentoValor"]').value),
+          tipo: tipo,
+          fonte: fonte,
+        };
+      })
+      .filter((f) => f.valor > 0);
+  }
+
+  function lerCustos(form) {
+    return Array.from(form.querySelectorAll(".custo-row"))
+      .map((linha) => {
+        const categoria = linha.querySelector('[name="custoCategoria"]').value;
+        const custo = {
+          descricao: linha.querySelector('[name="custoDescricao"]').value.trim(),
+          valor: paraNumero(linha.querySelector('[name="custoValor"]').value),
+        };
+        if (categoria === "add_new_category") {
+          custo.categoria_nome = linha.querySelector('[name="newCategoryName"]').value.trim();
+        } else if (categoria) {
+          custo.categoria_id = parseInt(categoria, 10);
+        }
+        return custo;
+      })
+      .filter((c) => c.valor > 0 && (c.categoria_id || c.categoria_nome));
+  }
+
+  async function sincronizar() {
+    try {
+      const resultado = await FilaOffline.enviar();
+      if (resultado.recusadas.length > 0) {
+        const motivos = resultado.recusadas
+          .map((r) => `${r.entrada ? r.entrada.data : ""} ${r.erro}`.trim())
+          .join(" ");
+        mostrarStatus(
+          `${resultado.aplicadas} lançamento(s) sincronizado(s); ` +
+            `${resultado.recusadas.length} recusado(s) e descartado(s): ${motivos}`,
+          "danger",
+        );
+      } else if (resultado.aplicadas > 0) {
+        mostrarStatus(`${resultado.aplicadas} lançamento(s) sincronizado(s) com sucesso!`, "success");
+      }
+    } catch (erro) {
+      const pendentes = (await FilaOffline.listar()).length;
+      if (!pendentes) return;
+      if (erro instanceof FilaOffline.LoteRecusado) {
+        mostrarStatus(`${erro.message} ${pendentes} lançamento(s) continuam salvos no aparelho.`, "warning");
+        return;
+      }
+      mostrarStatus(
+        `Sem conexão: ${pendentes} lançamento(s) salvo(s) no aparelho. Serão enviados quando o sinal voltar.`,
+        "warning",
+      );
+      if ("serviceWorker" in navigator && "SyncManager" in window) {
+        const registro = await navigator.serviceWorker.ready;
+        registro.sync.register(FilaOffline.SYNC_TAG).catch(() => {});
+      }
+    }
+  }
+
+  async function capturar(event, entrada) {
+    event.preventDefault();
+    await FilaOffline.adicionar(entrada);
+    event.target.reset();
+    await sincronizar();
+  }
+
+  desempenhoForm.addEventListener("submit", (event) =>
+    capturar(event, {
+      data: desempenhoForm.querySelector('[name="data"]').value,
+      km_rodado: parseInt(desempenhoForm.querySelector('[name="kmRodado"]').value, 10) || 0,
+      faturamentos: lerFaturamentos(desempenhoForm, ".faturamento-row"),
+      custos: [],
+    }),
+  );
+
+  avulsoForm.addEventListener("submit", (event) =>
+    capturar(event, {
+      data: avulsoForm.querySelector('[name="data"]').value,
+      km_rodado: 0,
+      faturamentos: lerFaturamentos(avulsoForm, ".faturamento-avulso-row"),
+      custos: lerCustos(avulsoForm),
+    }),
+  );
+
+  window.addEventListener("online", sincronizar);
+  sincronizar();
+});
@@ -0,0 +1,161 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // --- LÓGICA PARA CUSTOS (Existente) ---
+    function setupCustoRow(row) {
+        const select = row.querySelector('select[name="custoCategoria"]');
+        const newCategoryInput = row.querySelector('.new-category-input');
+        select.addEventListener('change', () => {
+            newCategoryInput.style.display = select.value === 'add_new_category' ? 'block' : 'none';
+            newCategoryInput.querySelector('input').required = select.value === 'add_new_category';
+        });
+    }
+
+    function updateCustoRemoveButtons() {
+        const rows = document.querySelectorAll('#custos-container .custo-row');
+        rows.forEach((row, index) => {
+            const removeBtn = row.querySelector('.remove-custo');
+            removeBtn.disabled = rows.length === 1;
+            removeBtn.onclick = () => { row.remove(); updateCustoRemoveButtons(); };
+        });
+    }
+
+    document.getElementById('add-custo-btn').addEventListener('click', () => {
+        const container = document.getElementById('custos-container');
+        const newRow = container.querySelector('.custo-row').cloneNode(true);
+        newRow.querySelectorAll('input').forEach(input => input.value = '');
+        newRow.querySelector('select').selectedIndex = 0;
+        newRow.querySelector('.new-category-input').style.display = 'none';
+        container.appendChild(newRow);
+        setupCustoRow(newRow);
+        updateCustoRemoveButtons();
+    });
+
+    document.querySelectorAll('#custos-container .custo-row').forEach(setupCustoRow);
+    updateCustoRemoveButtons();
+
+    // --- LÓGICA PARA FATURAMENTO (MODIFICADA) ---
+    function setupFaturamentoRow(row) {
+        // A lógica que escondia o campo "Fonte" foi REMOVIDA.
+        // Agora, apenas a lógica para o campo "Outro" permanece.
+        const fonteSelect = row.querySelector('select[name="faturamentoFonte"]');
+        const outroInput = row.querySelector('input[name="faturamentoFonteOutro"]');
+
+        fonteSelect.addEventListener('change', () => {
+            outroInput.style.display = fonteSelect.value === 'Outro' ? 'block' : 'none';
+            outroInput.required = fonteSelect.value === 'Outro';
+        });
+
+        // Acionar na inicialização para garantir o estado correto do campo "Outro"
+        outroInput.style.display = fonteSelect.value === 'Outro' ? 'block' : 'none';
+        outroInput.required = fonteSelect.value === 'Outro';
+    }
+
+    function updateFaturamentoRemoveButtons() {
+        const rows = document.querySelectorAll('#faturamento-container .faturamento-row');
+        rows.forEach(row => {
+            const removeBtn = row.querySelector('.remove-faturamento');
+            removeBtn.disabled = rows.length === 1;
+            removeBtn.onclick = () => { row.remove(); updateFaturamentoRemoveButtons(); };
+        });
+    }
+
+    document.getElementById('add-faturamento-btn').addEventListener('click', () => {
+        const container = document.getElementById('faturamento-container');
+        const newRow = container.querySelector('.faturamento-row').cloneNode(true);
+        newRow.querySelectorAll('input').forEach(input => input.value = '');
+        newRow.querySelectorAll('select').forEach(select => select.selectedIndex = 0);
+        container.appendChild(newRow);
+        setupFaturamentoRow(newRow);
+        updateFaturamentoRemoveButtons();
+    });
+
+    document.querySelectorAll('#faturamento-container .faturamento-row').forEach(setupFaturamentoRow);
+    updateFaturamentoRemoveButtons();
+
+    // --- LÓGICA PARA FATURAMENTO AVULSO ---
+    function setupFaturamentoAvulsoRow(row) {
+        const fonteSelect = row.querySelector('select[name="faturamentoFonte"]');
+        const outroInput = row.querySelector('input[name="faturamentoFonteOutro"]');
+
+        fonteSelect.addEventListener('change', () => {
+            outroInput.style.display = fonteSelect.value === 'Outro' ? 'block' : 'none';
+            outroInput.required = fonteSelect.value === 'Outro';
+        });
+
+        outroInput.style.display = fonteSelect.value === 'Outro' ? 'block' : 'none';
+        outroInput.required = fonteSelect.value === 'Outro';
+    }
+
+    function updateFaturamentoAvulsoRemoveButtons() {
+        const rows = document.querySelectorAll('#faturamento-avulso-container .faturamento-avulso-row');
+        rows.forEach(row => {
+            const removeBtn = row.querySelector('.remove-faturamento-avulso');
+            removeBtn.disabled = rows.length === 1;
+            removeBtn.onclick = () => { row.remove(); updateFaturamentoAvulsoRemoveButtons(); };
+        });
+    }
+
+    document.getElementById('add-faturamento-avulso-btn').addEventListener('click', () => {
+        const container = document.getElementById('faturamento-avulso-container');
+        const newRow = container.querySelector('.faturamento-avulso-row').cloneNode(true);
+        newRow.querySelectorAll('input').forEach(input => input.value = '');
+        newRow.querySelectorAll('select').forEach(select => select.selectedIndex = 0);
+        container.appendChild(newRow);
+        setupFaturamentoAvulsoRow(newRow);
+        updateFaturamentoAvulsoRemoveButtons();
+    });
+
+    document.querySelectorAll('#faturamento-avulso-container .faturamento-avulso-row').forEach(setupFaturamentoAvulsoRow);
+    updateFaturamentoAvulsoRemoveButtons();
+});
+
+// --- Autocompletar de fontes e descrições já usadas ---
+document.addEventListener('DOMContentLoaded', function() {
+    const campos = { faturamentoFonteOutro: 'fonte', custoDescricao: 'descricao' };
+    const categorias = {};  // termo -> categoria sugerida, para preencher o select
+    let temporizador;
+
+    Object.entries(campos).forEach(([nome, campo]) => {
+        const lista = document.createElement('datalist');
+        lista.id = `autocompletar-${campo}`;
+        document.body.appendChild(lista);
+        document.querySelectorAll(`input[name="${nome}"]`).forEach(input => input.setAttribute('list', lista.id));
+    });
+
+    async function buscarSugestoes(input) {
+        const campo = campos[input.name];
+        const url = `/api/autocompletar?campo=${campo}&q=${encodeURIComponent(input.value)}`;
+        try {
+            const resposta = await fetch(url, { headers: { Accept: 'application/json' } });
+            if (!resposta.ok) return;
+            const { sugestoes } = await resposta.json();
+            const lista = document.getElementById(`autocompletar-${campo}`);
+            lista.replaceChildren(...sugestoes.map(s => {
+                if (s.categoria_id) categorias[s.termo] = s.categoria_id;
+                const opcao = document.createElement('option');
+                opcao.value = s.termo;
+                return opcao;
+            }));
+        } catch (erro) {
+            // Offline: o campo continua funcionando sem sugestões
+        }
+    }
+
+    // Delegação: cobre também as linhas adicionadas depois pelo botão "+"
+    document.addEventListener('input', event => {
+        const input = event.target;
+        if (!(input.name in campos)) return;
+        input.setAttribute('list', `autocompletar-${campos[input.name]}`);
+        clearTimeout(temporizador);
+        temporizador = setTimeout(() => buscarSugestoes(input), 150);
+    });
+
+    document.addEventListener('change', event => {
+        const input = event.target;
+        if (input.name !== 'custoDescricao' || !categorias[input.value]) return;
+        const select = input.closest('.custo-row').querySelector('select[name="custoCategoria"]');
+        if (!select.value && select.querySelector(`option[value="${categorias[input.value]}"]`)) {
+            select.value = categorias[input.value];
+            select.dispatchEvent(new Event('change'));
+        }
+    });
+});
@@ -0,0 +1,227 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Tratamento de UI do Filtro
+    const periodoSelect = document.getElementById('periodoSelect');
+    const customDates = document.querySelectorAll('.custom-date');
+
+    function toggleCustomDates() {
+        if (periodoSelect.value === 'personalizado') {
+            customDates.forEach(el => el.style.display = 'block');
+        } else {
+            customDates.forEach(el => el.style.display = 'none');
+        }
+    }
+
+    periodoSelect.addEventListener('change', toggleCustomDates);
+    toggleCustomDates(); // Init
+
+    // Dados do Backend, entregues em um bloco JSON no template
+    const dados = JSON.parse(document.getElementById('relatorios-dados').textContent);
+
+    // Rótulo de cada período conforme a granularidade escolhida pelo servidor
+    function rotulo(periodo, granularidade) {
+        const [ano, mes, dia] = periodo.split('-');
+        if (granularidade === 'dia' || granularidade === 'semana') return `${dia}/${mes}`;
+        if (granularidade === 'mes') return `${mes}/${ano}`;
+        if (granularidade === 'trimestre') return `T${Math.floor((Number(mes) - 1) / 3) + 1}/${ano}`;
+        return ano;
+    }
+
+    // Corpo JSON da resposta; erro do servidor (400 de período inválido etc.) vira exceção com a mensagem dele
+    function lerJson(resposta) {
+        return resposta.json().catch(() => ({})).then(corpo => {
+            if (!resposta.ok) throw new Error(corpo.erro || 'Não foi possível carregar os dados.');
+            return corpo;
+        });
+    }
+
+    // 1. Gráfico de Evolução (Misto)
+    const canvasEvolucao = document.getElementById('evolucaoChart');
+    const ctxEvolucao = canvasEvolucao.getContext('2d');
+    function montarEvolucao(labels, faturamentoData, custosData, lucroData) {
+        new Chart(ctxEvolucao, {
+            type: 'bar',
+            data: {
+                labels: labels,
+                datasets: [
+                    {
+                        label: 'Faturamento',
+                        data: faturamentoData,
+                        backgroundColor: 'rgba(13, 110, 253, 0.7)',
+                        borderColor: 'rgb(13, 110, 253)',
+                        borderWidth: 1,
+                        order: 2
+                    },
+                    {
+                        label: 'Custos',
+                        data: custosData,
+                        backgroundColor: 'rgba(220, 53, 69, 0.7)',
+                        borderColor: 'rgb(220, 53, 69)',
+                        borderWidth: 1,
+                        order: 3
+                    },
+                    {
+                        label: 'Lucro Líquido',
+                        data: lucroData,
+                        type: 'line',
+                        borderColor: 'rgb(25, 135, 84)',
+                        backgroundColor: 'rgb(25, 135, 84)',
+                        borderWidth: 3,
+                        tension: 0.3,
+                        fill: false,
+                        order: 1
+                    }
+                ]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                interaction: {
+                    mode: 'index',
+                    intersect: false,
+                },
+                plugins: {
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                let label = context.dataset.label || '';
+                                if (label) {
+                                    label += ': ';
+                                }
+                                if (context.parsed.y !== null) {
+                                    label += new Intl.NumberFormat('pt-BR', { style: 'currency', currency: 'BRL' }).format(context.parsed.y);
+                                }
+                                return label;
+                            }
+                        }
+                    }
+                },
+                scales: {
+                    y: {
+                        beginAtZero: true,
+                        ticks: {
+                            callback: function(value, index, values) {
+                                if(value >= 1000) return 'R$ ' + (value/1000).toFixed(1) + 'k';
+                                return 'R$ ' + value;
+                            }
+                        }
+                    }
+                }
+            }
+        });
+    }
+
+    // A série vem reamostrada para no máximo ~1 barra a cada 12px do gráfico
+    const seriesUrl = new URL(dados.series_url, window.location.origin);
+    seriesUrl.searchParams.set('pontos', Math.max(7, Math.floor(canvasEvolucao.parentElement.clientWidth / 12)));
+    fetch(seriesUrl, { headers: { Accept: 'application/json' } })
+        .then(lerJson)
+        .then(serie => montarEvolucao(
+            serie.periodos.map(p => rotulo(p, serie.granularidade)),
+            serie.faturamento, serie.custos, serie.lucro
+        ))
+        .catch(erro => {
+            const aviso = document.createElement('p');
+            aviso.className = 'text-muted text-center my-5';
+            aviso.textContent = erro.message;
+            canvasEvolucao.replaceWith(aviso);
+        });
+
+    // Detalhamento por dimensão (top 5 + "Outros")
+    const detalhamentoSelect = document.getElementById('detalhamentoSelect');
+    const detalhamentoCorpo = document.getElementById('detalhamentoCorpo');
+    const moeda = new Intl.NumberFormat('pt-BR', { style: 'currency', currency: 'BRL' });
+
+    function linhaDetalhamento(nome, quantidade, valor, total) {
+        const linha = document.createElement('tr');
+        const percentual = total > 0 ? (valor / total * 100).toFixed(1) + '%' : '-';
+        [nome, quantidade, moeda.format(valor), percentual].forEach((texto, i) => {
+            const celula = document.createElement('td');
+            if (i > 0) celula.className = 'text-end';
+            celula.textContent = texto;
+            linha.appendChild(celula);
+        });
+        return linha;
+    }
+
+    function carregarDetalhamento() {
+        const [dimensao, medida] = detalhamentoSelect.value.split('|');
+        const url = new URL(dados.detalhamento_url, window.location.origin);
+        url.searchParams.set('dimensao', dimensao);
+        if (medida) url.searchParams.set('medida', medida);
+        fetch(url, { headers: { Accept: 'application/json' } })
+            .then(lerJson)
+            .then(resultado => {
+                const linhas = resultado.itens.map(item =>
+                    linhaDetalhamento(item.chave, item.quantidade, item.valor, resultado.total));
+                if (resultado.outros.grupos > 0) {
+                    linhas.push(linhaDetalhamento(`Outros (${resultado.outros.grupos})`,
+                        resultado.outros.quantidade, resultado.outros.valor, resultado.total));
+                }
+                if (!linhas.length) {
+                    detalhamentoCorpo.innerHTML = '<tr><td colspan="4" class="text-muted">Nenhum lançamento no período.</td></tr>';
+                } else {
+                    detalhamentoCorpo.replaceChildren(...linhas);
+                }
+            })
+            .catch(erro => {
+                const celula = document.createElement('td');
+                celula.colSpan = 4;
+                celula.className = 'text-muted';
+                celula.textContent = erro.message;
+                const linha = document.createElement('tr');
+                linha.appendChild(celula);
+                detalhamentoCorpo.replaceChildren(linha);
+            });
+    }
+
+    detalhamentoSelect.addEventListener('change', carregarDetalhamento);
+    carregarDetalhamento();
+
+    // 2. Gráfico de Composição de Custos (Rosca)
+    const [valAbast, valVar, valFixo] = dados.composicao;
+
+    // Só monta o gráfico se houver custos
+    if (valAbast > 0 || valVar > 0 || valFixo > 0) {
+        const ctxCustos = document.getElementById('custosChart').getContext('2d');
+        new Chart(ctxCustos, {
+            type: 'doughnut',
+            data: {
+                labels: ['Combustível', 'Custos Variáveis', 'Custos Fixos'],
+                datasets: [{
+                    data: [valAbast, valVar, valFixo],
+                    backgroundColor: [
+                        'rgba(220, 53, 69, 0.8)',
+                        'rgba(255, 193, 7, 0.8)',
+                        'rgba(108, 117, 125, 0.8)'
+                    ],
+                    borderWidth: 1
+                }]
+            },
+            options: {
+                responsive: true,
+                maintainAspectRatio: false,
+                plugins: {
+                    legend: {
+                        display: false 
+                    },
+                    tooltip: {
+                        callbacks: {
+                            label: function(context) {
+                                let label = context.label || '';
+                                if (label) {
+                                    label += ': ';
+                                }
+                                if (context.parsed !== null) {
+                                    label += new Intl.NumberFormat('pt-BR', { style: 'currency', currency: 'BRL' }).format(context.parsed);
+                                }
+                                return label;
+                            }
+                        }
+                    }
+                }
+            }
+        });
+    } else {
+        document.getElementById('custosChart').parentElement.innerHTML = '<p class="text-muted">Nenhum custo registrado no período.</p>';
+    }
+});
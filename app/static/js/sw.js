@@ -0,0 +1,70 @@
+// Service worker: mantém a tela de lançamentos e os assets disponíveis sem sinal
+// e descarrega a fila offline (fila-offline.js) quando a conexão volta.
+// A rota /sw.js troca __VERSAO_ASSETS__ pela versão do build (app/assets.py): cada deploy
+// instala um service worker novo, cuja ativação apaga os caches das versões anteriores.
+importScripts("/static/js/fila-offline.js");
+
+const CACHE = "meupossante-__VERSAO_ASSETS__";
+
+self.addEventListener("install", () => self.skipWaiting());
+
+self.addEventListener("activate", (event) => {
+  event.waitUntil(
+    caches
+      .keys()
+      .then((nomes) =>
+        Promise.all(nomes.filter((nome) => nome !== CACHE).map((nome) => caches.delete(nome))),
+      )
+      .then(() => self.clients.claim()),
+  );
+});
+
+async function cacheFirst(request) {
+  const cache = await caches.open(CACHE);
+  const emCache = await cache.match(request);
+  if (emCache) return emCache;
+  const resposta = await fetch(request);
+  if (resposta.ok || resposta.type === "opaque") cache.put(request, resposta.clone());
+  return resposta;
+}
+
+async function networkFirst(request) {
+  const cache = await caches.open(CACHE);
+  try {
+    const resposta = await fetch(request);
+    if (resposta.ok && !resposta.redirected) cache.put(request, resposta.clone());
+    return resposta;
+  } catch (erro) {
+    const emCache = await cache.match(request);
+    if (emCache) return emCache;
+    throw erro;
+  }
+}
+
+self.addEventListener("fetch", (event) => {
+  const request = event.request;
+  if (request.method !== "GET") return;
+  const url = new URL(request.url);
+
+  if (url.origin === self.location.origin) {
+    if (url.pathname.startsWith("/assets/")) {
+      // Nome com hash do conteúdo: nunca muda, o cache não fica velho
+      event.respondWith(cacheFirst(request));
+    } else if (url.pathname.startsWith("/static/")) {
+      // Sem hash no nome (build ainda não gerado): o cache só serve sem sinal
+      event.respondWith(networkFirst(request));
+    } else if (request.mode === "navigate" && url.pathname === "/") {
+      event.respondWith(networkFirst(request));
+    }
+  } else if (url.hostname === "cdn.jsdelivr.net") {
+    // Enquanto os assets não forem vendorizados, a CDN também precisa funcionar offline
+    // (as URLs têm a versão do pacote, então cache-first é seguro)
+    event.respondWith(cacheFirst(request));
+  }
+});
+
+self.addEventListener("sync", (event) => {
+  if (event.tag === FilaOffline.SYNC_TAG) {
+    event.waitUntil(FilaOffline.enviar());
+  }
+});
@@ -0,0 +1,182 @@
+"""
+Sincronização em lote dos lançamentos capturados offline.
+
+Cada lançamento chega com uma chave de idempotência gerada no cliente
+(o mesmo envio pode ser repetido quando a conexão cai no meio). Chaves já
+vistas são ignoradas e as entradas válidas são aplicadas em uma única
+transação. Uma entrada que nunca vai poder ser aplicada (valor inválido, mês
+fechado, categoria inexistente) volta recusada, com o motivo, sem impedir as
+outras: o cliente a tira da fila em vez de reenviá-la para sempre.
+"""
+from datetime import datetime
+
+from sqlalchemy import func
+
+from . import db
+from .fechamento import MesFechado, fechado_ate
+from .lancamentos import registrar_dias
+from .models import Faturamento, CustoVariavel, CategoriaCusto, SyncEntrada
+
+MAX_ENTRADAS_POR_LOTE = 500
+TIPOS_FATURAMENTO = ('App', 'Especie')
+
+
+class LoteInvalido(ValueError):
+    """Entrada do lote que não pode ser aplicada."""
+
+
+def _valor_positivo(valor, onde):
+    try:
+        valor = float(str(valor).replace(',', '.'))
+    except (TypeError, ValueError):
+        raise LoteInvalido(f'{onde}: valor inválido.')
+    if valor <= 0:
+        raise LoteInvalido(f'{onde}: o valor deve ser maior que zero.')
+    return valor
+
+
+def _parse_entrada(bruta, indice):
+    onde = f'Entrada {indice}'
+    if not isinstance(bruta, dict):
+        raise LoteInvalido(f'{onde}: formato inválido.')
+
+    chave = bruta.get('chave')
+    if not isinstance(chave, str) or not 0 < len(chave) <= 64:
+        raise LoteInvalido(f'{onde}: chave de idempotência ausente ou longa demais.')
+    try:
+        data = datetime.strptime(bruta.get('data') or '', '%Y-%m-%d').date()
+        km_rodado = int(bruta.get('km_rodado') or 0)
+    except (TypeError, ValueError):
+        raise LoteInvalido(f'{onde}: data ou KM inválidos.')
+    if km_rodado < 0:
+        raise LoteInvalido(f'{onde}: KM rodado não pode ser negativo.')
+
+    faturamentos = []
+    for f in bruta.get('faturamentos') or []:
+        if not isinstance(f, dict):
+            raise LoteInvalido(f'{onde}: faturamento em formato inválido.')
+        tipo = f.get('tipo')
+        if tipo not in TIPOS_FATURAMENTO:
+            raise LoteInvalido(f'{onde}: tipo de faturamento inválido.')
+        # Mesma regra do formulário: pagamento em espécie sempre tem fonte 'Dinheiro'
+        fonte = (str(f.get('fonte') or '').strip() or 'Outro')[:100] if tipo == 'App' else 'Dinheiro'
+        faturamentos.append({'valor': _valor_positivo(f.get('valor'), onde), 'tipo': tipo, 'fonte': fonte})
+
+    custos = []
+    for c in bruta.get('custos') or []:
+        if not isinstance(c, dict):
+            raise LoteInvalido(f'{onde}: custo em formato inválido.')
+        custo = {
+            'valor': _valor_positivo(c.get('valor'), onde),
+            'descricao': str(c.get('descricao') or '').strip()[:200],
+        }
+        if c.get('categoria_id'):
+            try:
+                custo['categoria_id'] = int(c['categoria_id'])
+            except (TypeError, ValueError):
+                raise LoteInvalido(f'{onde}: categoria inválida.')
+        elif str(c.get('categoria_nome') or '').strip():
+            custo['categoria_nome'] = str(c['categoria_nome']).strip()[:100]
+        else:
+            raise LoteInvalido(f'{onde}: custo sem categoria.')
+        custos.append(custo)
+
+    return {'chave': chave, 'data': data, 'km_rodado': km_rodado,
+            'faturamentos': faturamentos, 'custos': custos}
+
+
+def aplicar_lote(user_id, entradas_brutas):
+    """
+    Valida e aplica um lote de lançamentos. Retorna as chaves aplicadas, as
+    que já tinham sido recebidas antes (duplicadas) e as recusadas, com o motivo.
+    Só uma entrada sem chave (que o cliente não teria como identificar) recusa o lote.
+    """
+    entradas, recusadas = {}, {}
+    for indice, bruta in enumerate(entradas_brutas):
+        try:
+            entrada = _parse_entrada(bruta, indice)
+        except LoteInvalido as e:
+            chave = bruta.get('chave') if isinstance(bruta, dict) else None
+            if not isinstance(chave, str) or not 0 < len(chave) <= 64:
+                raise
+            recusadas.setdefault(chave, str(e))
+            continue
+        entradas.setdefault(entrada['chave'], entrada)
+
+    existentes = {
+        chave for (chave,) in db.session.query(SyncEntrada.chave).filter(
+            SyncEntrada.user_id == user_id, SyncEntrada.chave.in_(list(entradas))
+        )
+    }
+    novas = [e for chave, e in entradas.items() if chave not in existentes]
+
+    # Meses fechados e categorias inexistentes recusam só as entradas que os usam
+    fechado = fechado_ate(user_id) if novas else None
+    ids_categoria = {c['categoria_id'] for e in novas for c in e['custos'] if 'categoria_id' in c}
+    validos = set()
+    if ids_categoria:
+        validos = {i for (i,) in db.session.query(CategoriaCusto.id).filter(CategoriaCusto.id.in_(ids_categoria))}
+    aceitas = []
+    for e in novas:
+        if fechado and e['data'] <= fechado:
+            recusadas[e['chave']] = f'O mês de {e["data"]:%m/%Y} já foi fechado e não aceita mais alterações.'
+        elif any('categoria_id' in c and c['categoria_id'] not in validos for c in e['custos']):
+            recusadas[e['chave']] = 'Categoria de custo inexistente.'
+        else:
+            aceitas.append(e)
+    novas = aceitas
+    resultado = {
+        'aplicadas': [e['chave'] for e in novas],
+        'duplicadas': sorted(existentes),
+        'recusadas': [{'chave': chave, 'erro': erro} for chave, erro in recusadas.items() if chave not in existentes],
+    }
+    if not novas:
+        return resultado
+
+    # Categorias: resolve/cria os nomes novos, também em lote
+    custos = [c for e in novas for c in e['custos']]
+    nomes = {}
+    for c in custos:
+        if 'categoria_nome' in c:
+            nomes.setdefault(c['categoria_nome'].lower(), c['categoria_nome'])
+    categorias = {}
+    if nomes:
+        categorias = {
+            cat.nome.lower(): cat for cat in CategoriaCusto.query.filter(func.lower(CategoriaCusto.nome).in_(list(nomes)))
+        }
+        for chave_nome, nome in nomes.items():
+            if chave_nome not in categorias:
+                categorias[chave_nome] = CategoriaCusto(nome=nome)
+                db.session.add(categorias[chave_nome])
+
+    db.session.flush()
+
+    # Lançamentos diários de todas as datas do lote num único upsert, já somando os km
+    km_por_data = {}
+    for e in novas:
+        km_por_data[e['data']] = km_por_data.get(e['data'], 0) + e['km_rodado']
+    try:
+        lancamentos = registrar_dias(user_id, km_por_data)
+    except MesFechado as e:
+        # Mês fechado entre a conferência acima e aqui: reenviar não adianta
+        raise LoteInvalido(str(e))
+
+    for entrada in novas:
+        lancamento_id = lancamentos[entrada['data']]
+        db.session.add_all([
+            Faturamento(
+                valor=f['valor'], tipo=f['tipo'], fonte=f['fonte'], data=entrada['data'],
+                user_id=user_id, lancamento_id=lancamento_id
+            ) for f in entrada['faturamentos']
+        ])
+        db.session.add_all([
+            CustoVariavel(
+                descricao=c['descricao'], valor=c['valor'], data=entrada['data'], user_id=user_id,
+                categoria_id=c.get('categoria_id') or categorias[c['categoria_nome'].lower()].id,
+                lancamento_id=lancamento_id
+            ) for c in entrada['custos']
+        ])
+        db.session.add(SyncEntrada(user_id=user_id, chave=entrada['chave'], data=entrada['data']))
+
+    db.session.commit()
+    return resultado
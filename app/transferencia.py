@@ -0,0 +1,97 @@
+"""
+Cópia dos dados de um usuário para outro banco, com ids novos.
+
+Os ids são sequenciais em cada banco, então as linhas levadas para outro
+banco (mudança de shard, importação de um export) não podem manter os ids de
+origem. O Importador recebe as linhas tabela a tabela, das referenciadas para
+as que referenciam, grava cada lote num INSERT de várias linhas com
+RETURNING id na ordem dos parâmetros e guarda o mapa id antigo -> id novo de
+cada tabela para traduzir as chaves estrangeiras das tabelas seguintes.
+"""
+from collections import Counter, defaultdict
+
+from sqlalchemy import select
+
+from . import exclusao
+
+TAMANHO_LOTE = 1000
+# Tabela -> (coluna com o nome da tabela referida, coluna com o id) para referências sem chave estrangeira
+REFERENCIAS_POR_TIPO = {'busca_documento': ('tipo', 'ref_id')}
+
+
+def tabelas_em_ordem():
+    """Tabelas de dados do usuário, das referenciadas para as que referenciam."""
+    tabelas = list(reversed(exclusao.tabelas_do_usuario()))
+    # As referências por tipo não entram na ordenação do metadata: essas tabelas vão por último
+    return [t for t in tabelas if t.name not in REFERENCIAS_POR_TIPO] + \
+        [t for t in tabelas if t.name in REFERENCIAS_POR_TIPO]
+
+
+class Importador:
+    """
+    Insere linhas de um usuário em `conexao` trocando ids e chaves estrangeiras.
+    `mapas` traz os ids já conhecidos de outras tabelas ({tabela: {antigo: novo}}),
+    como as compartilhadas de um export de outra instalação.
+    """
+
+    def __init__(self, conexao, user_id, mapas=None):
+        self.conexao = conexao
+        self.user_id = user_id
+        self.mapas = defaultdict(dict, mapas or {})
+        self.linhas = Counter()
+        self._tabelas = {tabela.name for tabela in exclusao.tabelas_do_usuario()} | set(mapas or ())
+        self._returning = conexao.dialect.insert_executemany_returning_sort_by_parameter_order
+
+    def _chaves(self, tabela):
+        return [
+            (coluna.name, chave.column.table.name)
+            for coluna in tabela.c for chave in coluna.foreign_keys
+            if chave.column.table.name in self._tabelas
+        ]
+
+    def inserir(self, tabela, linhas):
+        """Grava o lote; `linhas` são dicts com o id e as chaves do banco de origem."""
+        chaves = self._chaves(tabela)
+        por_tipo = REFERENCIAS_POR_TIPO.get(tabela.name)
+        antigos, novas = [], []
+        for linha in linhas:
+            linha = dict(linha)
+            antigo = linha.pop('id')
+            linha['user_id'] = self.user_id
+            for coluna, referida in chaves:
+                if linha.get(coluna) is not None:
+                    try:
+                        linha[coluna] = self.mapas[referida][linha[coluna]]
+                    except KeyError:
+                        raise ValueError(f'{tabela.name} {antigo}: {coluna}={linha[coluna]} não existe em {referida}.')
+            if por_tipo:
+                coluna_tipo, coluna_id = por_tipo
+                linha[coluna_id] = self.mapas[linha[coluna_tipo]].get(linha[coluna_id])
+                if linha[coluna_id] is None:
+                    # Documento de uma linha que não veio: é derivado, o índice se refaz depois
+                    continue
+            antigos.append(antigo)
+            novas.append(linha)
+        if not novas:
+            return
+        if self._returning:
+            novos = self.conexao.execute(
+                tabela.insert().returning(tabela.c.id, sort_by_parameter_order=True), novas
+            ).scalars().all()
+        else:
+            novos = [self.conexao.execute(tabela.insert().values(**linha)).inserted_primary_key[0] for linha in novas]
+        self.mapas[tabela.name].update(zip(antigos, novos))
+        self.linhas[tabela.name] += len(novos)
+
+
+def copiar_dados(origem, destino, user_id, user_destino=None, tamanho_lote=TAMANHO_LOTE):
+    """Copia os dados de `user_id` da conexão `origem` para `destino`; devolve {tabela: linhas}."""
+    importador = Importador(destino, user_destino or user_id)
+    for tabela in tabelas_em_ordem():
+        resultado = origem.execute(
+            select(tabela).where(tabela.c.user_id == user_id).order_by(tabela.c.id)
+            .execution_options(yield_per=tamanho_lote)
+        )
+        for lote in resultado.mappings().partitions():
+            importador.inserir(tabela, lote)
+    return importador.linhas
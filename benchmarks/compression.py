@@ -0,0 +1,73 @@
+"""
+Benchmark da compressão de respostas: bytes trafegados e custo de CPU por página.
+
+    python -m benchmarks.compression [--days 365] [--repeat 50]
+
+Renderiza as páginas principais sobre a base sintética (benchmarks/seed.py)
+e mede, para identity/gzip/brotli, o tamanho no fio e o tempo de CPU gasto
+só na compressão (com os mesmos níveis configurados no app).
+"""
+import argparse
+import time
+
+from benchmarks.seed import create_bench_app, seed_driver, login
+
+PAGES = (
+    '/',
+    '/dashboard',
+    '/cadastro',
+    '/abastecimento',
+    '/relatorios',
+    '/relatorios?periodo=personalizado&start_date=2000-01-01&end_date=2100-12-31',
+)
+
+
+def _find_middleware(app):
+    from app.compression import CompressionMiddleware
+    wsgi_app = app.wsgi_app
+    while not isinstance(wsgi_app, CompressionMiddleware):
+        wsgi_app = wsgi_app.app
+    return wsgi_app
+
+
+def _cpu_ms(middleware, encoding, body, repeat):
+    start = time.process_time()
+    for _ in range(repeat):
+        compressor = middleware.new_compressor(encoding)
+        compressed = compressor.compress(body) + compressor.finish()
+    return (time.process_time() - start) * 1000 / repeat, len(compressed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    app = create_bench_app()
+    seed_driver(app, days=args.days)
+    middleware = _find_middleware(app)
+    encodings = ['gzip', 'br'] if middleware.negotiate('br') == 'br' else ['gzip']
+
+    client = app.test_client()
+    login(client)
+
+    header = f"{'página':<40} {'identity':>10}"
+    for encoding in encodings:
+        header += f" {encoding + ' B':>10} {encoding + ' ms':>9}"
+    print(header)
+
+    for page in PAGES:
+        response = client.get(page, headers={'Accept-Encoding': 'identity'})
+        body = response.get_data()
+        line = f'{page[:40]:<40} {len(body):>10}'
+        for encoding in encodings:
+            wire = client.get(page, headers={'Accept-Encoding': encoding})
+            assert wire.headers.get('Content-Encoding') == encoding, page
+            cpu_ms, _ = _cpu_ms(middleware, encoding, body, args.repeat)
+            line += f' {len(wire.get_data()):>10} {cpu_ms:>9.3f}'
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Benchmark do login Google: latência por login e requisições ao provedor.
+
+    python -m benchmarks.oidc [--logins 50] [--latencia 100] [--max-age 2]
+
+Sobe um provedor OpenID Connect local (descoberta com Cache-Control, JWKS,
+token e userinfo, com latência artificial opcional), aponta o app para ele
+via GOOGLE_DISCOVERY_URL e faz o fluxo completo (/login/google -> /authorize)
+várias vezes. Mostra a latência do login e quantas vezes cada endpoint do
+provedor foi chamado: descoberta e JWKS só voltam a ser buscadas (em segundo
+plano) quando o max-age vence, e o userinfo não é chamado.
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import statistics
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from joserfc import jwt
+from joserfc.jwk import KeySet, RSAKey
+
+CLIENT_ID = 'benchmark-client'
+
+
+class ProvedorLocal:
+    """Provedor OIDC mínimo em 127.0.0.1 numa porta livre."""
+
+    def __init__(self, latencia=0.0, max_age=3600):
+        self.latencia = latencia
+        self.max_age = max_age
+        self.chave = RSAKey.generate_key(2048, parameters={'kid': 'bench-1', 'use': 'sig'})
+        self.chamadas = Counter()
+        self.codigos = {}
+        self.fora_do_ar = False
+        self.servidor = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f'http://127.0.0.1:{self.servidor.server_address[1]}'
+
+    @property
+    def descoberta(self):
+        return {
+            'issuer': self.url,
+            'authorization_endpoint': f'{self.url}/authorize',
+            'token_endpoint': f'{self.url}/token',
+            'userinfo_endpoint': f'{self.url}/userinfo',
+            'jwks_uri': f'{self.url}/jwks',
+            'id_token_signing_alg_values_supported': ['RS256'],
+        }
+
+    def emitir_codigo(self, nonce, sub, email):
+        codigo = base64.urlsafe_b64encode(os.urandom(12)).decode()
+        self.codigos[codigo] = {'nonce': nonce, 'sub': sub, 'email': email}
+        return codigo
+
+    def _id_token(self, dados):
+        agora = int(time.time())
+        claims = {
+            'iss': self.url, 'aud': CLIENT_ID, 'iat': agora, 'exp': agora + 300,
+            'sub': dados['sub'], 'email': dados['email'], 'email_verified': True,
+            'name': dados['email'].split('@')[0], 'nonce': dados['nonce'],
+        }
+        return jwt.encode({'alg': 'RS256', 'kid': 'bench-1'}, claims, self.chave)
+
+    def _handler(self):
+        provedor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, corpo, cache=False):
+                dados = json.dumps(corpo).encode()
+                etag = '"' + hashlib.sha1(dados).hexdigest() + '"'
+                if cache and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('Cache-Control', f'public, max-age={provedor.max_age}')
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                if cache:
+                    self.send_header('Cache-Control', f'public, max-age={provedor.max_age}')
+                    self.send_header('ETag', etag)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _atender(self):
+                caminho = urlparse(self.path).path
+                provedor.chamadas[caminho] += 1
+                time.sleep(provedor.latencia)
+                if provedor.fora_do_ar:
+                    self.send_error(503)
+                    return None
+                return caminho
+
+            def do_GET(self):
+                caminho = self._atender()
+                if caminho == '/.well-known/openid-configuration':
+                    self._json(provedor.descoberta, cache=True)
+                elif caminho == '/jwks':
+                    self._json(KeySet([provedor.chave]).as_dict(private=False), cache=True)
+                elif caminho == '/userinfo':
+                    self._json({})
+                elif caminho is not None:
+                    self.send_error(404)
+
+            def do_POST(self):
+                caminho = self._atender()
+                if caminho is None:
+                    return
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                form = parse_qs(self.rfile.read(tamanho).decode())
+                dados = provedor.codigos.pop(form.get('code', [''])[0], None)
+                if caminho != '/token' or dados is None:
+                    self.send_error(400)
+                    return
+                self._json({
+                    'access_token': base64.urlsafe_b64encode(os.urandom(16)).decode(),
+                    'token_type': 'Bearer', 'expires_in': 3600,
+                    'id_token': provedor._id_token(dados),
+                })
+
+        return Handler
+
+    def iniciar(self):
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self
+
+    def parar(self):
+        self.servidor.shutdown()
+
+
+def login_google(app, provedor, email):
+    """Faz o fluxo completo de login; devolve o cliente de teste já autenticado."""
+    client = app.test_client()
+    redirecionamento = urlparse(client.get('/login/google').headers['Location'])
+    parametros = {k: v[0] for k, v in parse_qs(redirecionamento.query).items()}
+    sub = hashlib.sha1(email.encode()).hexdigest()
+    codigo = provedor.emitir_codigo(parametros['nonce'], sub, email)
+    resposta = client.get(f"/authorize?code={codigo}&state={parametros['state']}")
+    if resposta.status_code != 302 or urlparse(resposta.headers['Location']).path != '/':
+        raise RuntimeError(f'login falhou: {resposta.status_code} {resposta.headers.get("Location")}')
+    return client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--logins', type=int, default=50)
+    parser.add_argument('--latencia', type=float, default=100, help='Latência artificial do provedor, em ms.')
+    parser.add_argument('--max-age', type=int, default=3600, help='max-age da descoberta e da JWKS.')
+    args = parser.parse_args()
+
+    provedor = ProvedorLocal(latencia=args.latencia / 1000, max_age=args.max_age).iniciar()
+    os.environ.update(
+        GOOGLE_DISCOVERY_URL=f'{provedor.url}/.well-known/openid-configuration',
+        GOOGLE_CLIENT_ID=CLIENT_ID, GOOGLE_CLIENT_SECRET='benchmark-secret',
+    )
+    from benchmarks.seed import create_bench_app
+    app = create_bench_app()
+
+    tempos = []
+    for i in range(args.logins):
+        inicio = time.perf_counter()
+        login_google(app, provedor, f'google{i % 10}@example.com')
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    provedor.parar()
+
+    print(f'latência do provedor: {args.latencia:.0f} ms por requisição')
+    print(f'primeiro login: {tempos[0]:8.1f} ms')
+    if len(tempos) > 1:
+        print(f'demais (mediana): {statistics.median(tempos[1:]):8.1f} ms   p95: '
+              f'{sorted(tempos[1:])[int(0.95 * (len(tempos) - 2))]:8.1f} ms')
+    print('requisições ao provedor:')
+    for caminho in ('/.well-known/openid-configuration', '/jwks', '/token', '/userinfo'):
+        print(f'  {caminho:<36} {provedor.chamadas[caminho]:>5}')
+
+
+if __name__ == '__main__':
+    main()
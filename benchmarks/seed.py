@@ -0,0 +1,97 @@
+"""
+Base de dados sintética para os benchmarks.
+
+Cria um app apontando para um SQLite temporário e popula um motorista com
+um histórico realista (lançamentos diários, abastecimentos, custos e
+receitas recorrentes).
+"""
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+
+BENCH_PASSWORD = 'benchmark'
+
+
+def create_bench_app():
+    db_path = os.path.join(tempfile.mkdtemp(prefix='meupossante-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+
+    from app import create_app, db
+    app = create_app()
+    app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_driver(app, email='motorista@example.com', days=365, seed=42):
+    """Popula `days` dias de histórico para um motorista e retorna o id do usuário."""
+    from app import db
+    from app.models import (
+        User, Parametros, CategoriaCusto, TipoCombustivel, LancamentoDiario,
+        Faturamento, CustoVariavel, Abastecimento, Custo, Receita
+    )
+
+    rng = random.Random(seed)
+    with app.app_context():
+        user = User(email=email, name=email.split('@')[0])
+        user.set_password(BENCH_PASSWORD)
+        db.session.add(user)
+
+        categorias = []
+        for nome in ('Alimentação', 'Lavagem', 'Manutenção', 'Pedágio'):
+            categoria = CategoriaCusto.query.filter_by(nome=nome).first() or CategoriaCusto(nome=nome)
+            db.session.add(categoria)
+            categorias.append(categoria)
+        combustivel = TipoCombustivel.query.filter_by(nome='Gasolina').first() or TipoCombustivel(nome='Gasolina')
+        db.session.add(combustivel)
+        db.session.flush()
+
+        start = date.today() - timedelta(days=days)
+        db.session.add(Parametros(
+            user_id=user.id, start_date=start, modelo_carro='Onix', placa_carro='ABC1D23',
+            km_atual=50000, media_consumo=11.5, meta_faturamento=300, periodicidade_meta='diaria',
+            tipo_meta='bruta', dias_trabalho_semana=6, valor_km_minimo=1.5, valor_km_meta=2.0
+        ))
+
+        km = 50000
+        for offset in range(days + 1):
+            dia = start + timedelta(days=offset)
+            if dia.weekday() == 6:
+                continue
+            km_rodado = rng.randint(120, 280)
+            lancamento = LancamentoDiario(user_id=user.id, data=dia, km_rodado=km_rodado)
+            db.session.add(lancamento)
+            db.session.flush()
+            for _ in range(rng.randint(2, 5)):
+                tipo = rng.choice(('App', 'App', 'App', 'Especie'))
+                fonte = rng.choice(('Uber', '99', 'InDrive')) if tipo == 'App' else 'Dinheiro'
+                db.session.add(Faturamento(
+                    user_id=user.id, lancamento_id=lancamento.id, data=dia,
+                    valor=round(rng.uniform(30, 160), 2), tipo=tipo, fonte=fonte
+                ))
+            for _ in range(rng.randint(0, 2)):
+                categoria = rng.choice(categorias)
+                db.session.add(CustoVariavel(
+                    user_id=user.id, lancamento_id=lancamento.id, categoria_id=categoria.id, data=dia,
+                    descricao=f'{categoria.nome} {rng.randint(1, 20)}', valor=round(rng.uniform(10, 80), 2)
+                ))
+            km += km_rodado
+            if offset % 3 == 0:
+                litros = round(rng.uniform(25, 45), 2)
+                db.session.add(Abastecimento(
+                    user_id=user.id, data=dia, km_atual=km, litros=litros, valor_litro=5.89,
+                    valor_total=round(litros * 5.89, 2), tanque_cheio=rng.random() < 0.6,
+                    tipo_combustivel_id=combustivel.id
+                ))
+
+        for nome, valor, dia_vencimento in (('Aluguel do carro', 1800, 5), ('Seguro', 250, 15), ('Celular', 60, 20)):
+            db.session.add(Custo(user_id=user.id, nome=nome, valor=valor, dia_vencimento=dia_vencimento))
+        db.session.add(Receita(user_id=user.id, nome='Bônus plataforma', valor=300, dia_recebimento=10))
+        db.session.commit()
+        return user.id
+
+
+def login(client, email='motorista@example.com'):
+    client.post('/login', data={'email': email, 'password': BENCH_PASSWORD})
@@ -0,0 +1,78 @@
+"""
+Benchmark do hash de senhas: hashes por segundo por núcleo e efeito do limite.
+
+    python -m benchmarks.senhas [--metodo scrypt:32768:8:1 ...] [--segundos 2] [--processos N]
+
+Para cada método (padrão: o SENHA_METODO configurado) mede o tempo de um
+hash e quantos hashes por segundo um núcleo e `--processos` núcleos juntos
+aguentam. Depois simula uma rajada de logins errados no mesmo app e conta
+quantos chegaram a calcular hash com o limite de tentativas ligado.
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+def _hashes_por_segundo(argumentos):
+    metodo, segundos = argumentos
+    senha_hash = generate_password_hash('benchmark', metodo)
+    feitos = 0
+    fim = time.perf_counter() + segundos
+    while time.perf_counter() < fim:
+        check_password_hash(senha_hash, 'errada')
+        feitos += 1
+    return feitos / segundos
+
+
+def _rajada(tentativas):
+    """Logins errados seguidos do mesmo IP contra a mesma conta; devolve (hashes, 429s, segundos)."""
+    from app import senhas
+    from benchmarks.seed import create_bench_app, seed_driver
+
+    app = create_bench_app()
+    seed_driver(app, days=7)
+    client = app.test_client()
+    conferidos = 0
+    original = senhas.conferir
+
+    def conferir(senha_hash, senha):
+        nonlocal conferidos
+        conferidos += 1
+        return original(senha_hash, senha)
+
+    senhas.conferir = conferir
+    recusadas = 0
+    inicio = time.perf_counter()
+    for _ in range(tentativas):
+        resposta = client.post('/login', data={'email': 'motorista@example.com', 'password': 'errada'})
+        recusadas += resposta.status_code == 429
+    senhas.conferir = original
+    return conferidos, recusadas, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--metodo', action='append', help='Método no formato do werkzeug (repetível).')
+    parser.add_argument('--segundos', type=float, default=2)
+    parser.add_argument('--processos', type=int, default=os.cpu_count())
+    parser.add_argument('--tentativas', type=int, default=200, help='Tamanho da rajada de logins errados.')
+    args = parser.parse_args()
+    metodos = args.metodo or [os.getenv('SENHA_METODO', 'scrypt:32768:8:1')]
+
+    print(f"{'método':<28} {'ms/hash':>8} {'hash/s/núcleo':>14} {f'hash/s ({args.processos} proc.)':>18}")
+    for metodo in metodos:
+        por_nucleo = _hashes_por_segundo((metodo, args.segundos))
+        with Pool(args.processos) as pool:
+            total = sum(pool.map(_hashes_por_segundo, [(metodo, args.segundos)] * args.processos))
+        print(f'{metodo:<28} {1000 / por_nucleo:>8.1f} {por_nucleo:>14.1f} {total:>18.1f}')
+
+    conferidos, recusadas, segundos = _rajada(args.tentativas)
+    print(f'\nrajada de {args.tentativas} logins errados: {conferidos} hashes calculados, '
+          f'{recusadas} recusados com 429, {segundos:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
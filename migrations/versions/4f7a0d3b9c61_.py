@@ -0,0 +1,78 @@
+"""empty message
+
+Revision ID: 4f7a0d3b9c61
+Revises: 1037329a4e3e
+Create Date: 2026-10-19 17:24:05.913377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7a0d3b9c61'
+down_revision = '1037329a4e3e'
+branch_labels = None
+depends_on = None
+
+# (tabela, coluna, tabela referida): chaves que passam a ter ON DELETE CASCADE
+CHAVES = [
+    ('parametros', 'user_id', 'user'),
+    ('lancamento_diario', 'user_id', 'user'),
+    ('faturamento', 'user_id', 'user'),
+    ('faturamento', 'lancamento_id', 'lancamento_diario'),
+    ('custo_variavel', 'user_id', 'user'),
+    ('custo_variavel', 'lancamento_id', 'lancamento_diario'),
+    ('abastecimento', 'user_id', 'user'),
+    ('custo', 'user_id', 'user'),
+    ('registro_custo', 'user_id', 'user'),
+    ('registro_custo', 'custo_id', 'custo'),
+    ('receita', 'user_id', 'user'),
+    ('registro_receita', 'user_id', 'user'),
+    ('registro_receita', 'receita_id', 'receita'),
+    ('sync_entrada', 'user_id', 'user'),
+    ('meta_diaria', 'user_id', 'user'),
+    ('alerta_vencimento', 'user_id', 'user'),
+    ('previsao_mensal', 'user_id', 'user'),
+    ('autocompletar_termo', 'user_id', 'user'),
+    ('busca_documento', 'user_id', 'user'),
+]
+
+# No SQLite as chaves não têm nome: a convenção dá nome às refletidas para poder removê-las
+CONVENCAO = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _nome(tabela, coluna, referida):
+    if op.get_bind().dialect.name == 'sqlite':
+        return CONVENCAO['fk'] % {'table_name': tabela, 'column_0_name': coluna, 'referred_table_name': referida}
+    return f'{tabela}_{coluna}_fkey'
+
+
+# O SQLite recria a tabela para trocar a chave e os gatilhos do índice full-text vão junto
+GATILHOS_BUSCA = [
+    "CREATE TRIGGER busca_documento_ai AFTER INSERT ON busca_documento BEGIN "
+    "INSERT INTO busca_fts(rowid, texto, usuario) VALUES (new.id, new.texto, 'u' || new.user_id); END",
+    "CREATE TRIGGER busca_documento_ad AFTER DELETE ON busca_documento BEGIN "
+    "DELETE FROM busca_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER busca_documento_au AFTER UPDATE ON busca_documento BEGIN "
+    "UPDATE busca_fts SET texto = new.texto, usuario = 'u' || new.user_id WHERE rowid = old.id; END",
+]
+
+
+def _recriar(ondelete):
+    for tabela, coluna, referida in CHAVES:
+        nome = _nome(tabela, coluna, referida)
+        with op.batch_alter_table(tabela, schema=None, naming_convention=CONVENCAO) as batch_op:
+            batch_op.drop_constraint(nome, type_='foreignkey')
+            batch_op.create_foreign_key(nome, referida, [coluna], ['id'], ondelete=ondelete)
+    if op.get_bind().dialect.name == 'sqlite':
+        for gatilho in GATILHOS_BUSCA:
+            op.execute(gatilho.replace('CREATE TRIGGER', 'CREATE TRIGGER IF NOT EXISTS', 1))
+
+
+def upgrade():
+    _recriar('CASCADE')
+
+
+def downgrade():
+    _recriar(None)